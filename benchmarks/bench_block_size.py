@@ -0,0 +1,65 @@
+"""ブロックサイズと、最初の途中認識結果までの時間・CPU使用量の関係を計測する。
+
+    $python benchmarks/bench_block_size.py --model model sample.wav
+
+マイク入力と同様にブロック単位で認識器へ渡し、以下を出力する。
+- time_to_first_partial_sec: 発話開始（最初に途中結果が出たブロックの先頭）から途中結果が
+  得られるまでの時間。ブロックが溜まるまでの待ち時間と認識処理時間の和
+- cpu_real_time_factor: 音声1秒あたりのCPU時間
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.vosk_client import VoskClient
+
+
+def measure(vosk: VoskClient, path: str, block_ms: float) -> Dict:
+    f = PcmFile(path, 16000)
+    try:
+        block_size = max(1, int(f.sampling_rate * block_ms / 1000))
+        vosk.initialize_recognizer([], f.sampling_rate)
+        first_partial = None
+        cpu_start = time.process_time()
+        for data in f.iter_chunks(block_size):
+            start = time.perf_counter()
+            vosk.recognize(data)
+            elapsed = time.perf_counter() - start
+            if first_partial is None and vosk.partial_text != "":
+                first_partial = len(data) / 2 / f.sampling_rate + elapsed
+        cpu = time.process_time() - cpu_start
+        vosk.flush()
+        return {
+            "block_ms": block_ms,
+            "block_size": block_size,
+            "time_to_first_partial_sec": first_partial,
+            "cpu_real_time_factor": cpu / (f.n_samples / f.sampling_rate),
+        }
+    finally:
+        f.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="発話を含むWAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument(
+        "--block-ms",
+        type=float,
+        nargs="+",
+        default=[20, 50, 100, 250, 500],
+        help="計測するブロック長[msec]",
+    )
+    args = parser.parse_args()
+
+    vosk = VoskClient()
+    vosk.load_model(args.model)
+    results: List[Dict] = [measure(vosk, args.file, ms) for ms in args.block_ms]
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""従来のポーリング（SessionManager + GUIのtimeout付きread）とAsyncCoreの、
+待機中のCPU使用率とブロック到着から認識完了までの時間を比較する。
+
+    $python benchmarks/bench_core.py --model model sample.wav
+
+録音済みのファイルを実時間で流して認識し、その後idle_sec秒間入力なしで待機する。
+- latency_*: ブロックがキューに入ってから認識処理を終えるまでの時間（キュー滞留 + 認識）
+- result_delivery_*: 認識ワーカーが結果を出してからフロントエンドのコールバックに届くまでの時間
+- idle_cpu_percent: 入力がない間のプロセスのCPU使用率
+GUIはディスプレイを必要とするため、threadsではViwer.get_eventと同じ10msのポーリングを模擬する。
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+from vosk_example_gui.core import AsyncCore, Consumer
+from vosk_example_gui.metrics import registry
+from vosk_example_gui.replay import ReplaySource
+from vosk_example_gui.session import SessionManager
+from vosk_example_gui.vosk_client import VoskClient
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+class _TimedVoskClient(VoskClient):
+    """認識結果を返した時刻を記録する"""
+
+    def __init__(self) -> None:
+        super().__init__(track_partial_conf=False)
+        self.produced: List[float] = []
+
+    def recognize(self, audio_data: Union[bytes, memoryview]) -> Optional[Dict]:
+        recognized = super().recognize(audio_data)
+        if recognized is not None:
+            self.produced.append(time.perf_counter())
+        return recognized
+
+
+class _DeliveryConsumer(Consumer):
+    def __init__(self, delivered: List[float]) -> None:
+        self._delivered = delivered
+
+    def on_result(self, index: int, recognized: Dict) -> None:
+        self._delivered.append(time.perf_counter())
+
+
+def measure(args: argparse.Namespace, mode: str) -> Dict:
+    vosk = _TimedVoskClient()
+    source = ReplaySource(args.file, realtime=True, block_ms=args.block_ms)
+    source.start_streaming()
+    vosk.initialize_model([], source.get_sampling_rate(), args.model)
+
+    # フロントエンドに認識結果が届いた時刻
+    delivered: List[float] = []
+    stop_polling = threading.Event()
+    if mode == "threads":
+        core = SessionManager(workers=1)
+        core.add_session(
+            mode,
+            source,
+            vosk,
+            on_result=lambda r: delivered.append(time.perf_counter()),
+        )
+
+        def poll() -> None:
+            # Viwer.get_event(timeout=10)と同じ間隔で起床する
+            while not stop_polling.wait(0.01):
+                pass
+
+        threading.Thread(target=poll, daemon=True).start()
+    else:
+        core = AsyncCore(workers=1)
+        core.add_consumer(_DeliveryConsumer(delivered))
+        core.add_session(mode, source, vosk)
+    core.start()
+
+    source.finished.wait()
+    time.sleep(0.5)
+    cpu_start = time.process_time()
+    time.sleep(args.idle_sec)
+    idle_cpu = (time.process_time() - cpu_start) / args.idle_sec
+    stop_polling.set()
+    core.stop()
+    source.stop()
+
+    snapshot = registry.snapshot()["histograms"]
+    queue_delay = snapshot.get(f"{mode}.queue_delay_ms", {})
+    recognize_ms = snapshot.get(f"{mode}.recognize_ms", {})
+    delivery = [(d - p) * 1000 for p, d in zip(vosk.produced, delivered)]
+    return {
+        "core": mode,
+        "block_ms": args.block_ms,
+        "blocks": queue_delay.get("count", 0),
+        "latency_p50_ms": queue_delay.get("p50", 0.0) + recognize_ms.get("p50", 0.0),
+        "latency_p95_ms": queue_delay.get("p95", 0.0) + recognize_ms.get("p95", 0.0),
+        "queue_delay_p95_ms": queue_delay.get("p95", 0.0),
+        "result_delivery_p50_ms": percentile(delivery, 50),
+        "result_delivery_p95_ms": percentile(delivery, 95),
+        "idle_cpu_percent": idle_cpu * 100,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="発話を含むWAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument("--block-ms", type=float, default=100, help="ブロック長[msec]")
+    parser.add_argument("--idle-sec", type=float, default=5.0, help="待機時間[sec]")
+    args = parser.parse_args()
+
+    for mode in ["threads", "asyncio"]:
+        print(json.dumps(measure(args, mode)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""1つの音声を複数の文法で並行して認識し、文法の数に対する1ブロックあたりの処理時間を計測する。
+
+    $python benchmarks/bench_fanout.py --model model --grammars a.txt b.txt --max 4 input.wav
+
+認識器の数を1からmaxまで増やし（--grammarsのワードリストとワードリストなしを順に割り当てる）、
+FanoutClientで各ブロックを全ての認識器へ並列に渡す。以下を出力する。
+- wall_ms_per_block: 1ブロックの投入から全ての認識器の完了までの経過時間
+- serial_ms_per_block: 認識器毎の処理時間の総和（逐次に処理した場合の時間に相当）
+- speedup: serial / wall（1より大きければ、文法の数に対して処理時間の増え方が線形より緩やか）
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Tuple
+
+from vosk_example_gui.fanout import FREE_GRAMMAR, FanoutClient
+from vosk_example_gui.pcm import PcmFile
+
+
+def read_grammar(path: str) -> Tuple[str, List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        words = list(dict.fromkeys(l.strip() for l in f if l.strip() != ""))
+    return os.path.splitext(os.path.basename(path))[0], words
+
+
+def measure(grammars: List[Tuple[str, List[str]]], args: argparse.Namespace) -> Dict:
+    fanout = FanoutClient(grammars, args.workers, free=False)
+    pcm = PcmFile(args.file, 16000)
+    wall = 0.0
+    serial = 0.0
+    blocks = 0
+    results = 0
+    try:
+        fanout.initialize_model(pcm.sampling_rate, args.model)
+        chunk_samples = max(1, int(pcm.sampling_rate * args.block_ms / 1000))
+        for data in pcm.iter_chunks(chunk_samples):
+            results += len(fanout.recognize(data))
+            wall += fanout.timings["wall"]
+            serial += fanout.timings["serial"]
+            blocks += 1
+        results += len(fanout.flush())
+    finally:
+        pcm.close()
+        fanout.close()
+    return {
+        "grammars": len(grammars),
+        "blocks": blocks,
+        "results": results,
+        "wall_ms_per_block": wall / max(1, blocks) * 1000,
+        "serial_ms_per_block": serial / max(1, blocks) * 1000,
+        "speedup": serial / wall if wall > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="WAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument(
+        "--grammars", nargs="*", default=[], help="ワードリストファイル"
+    )
+    parser.add_argument("--max", type=int, default=4, help="最大の認識器の数")
+    parser.add_argument("--workers", type=int, help="スレッド数（省略時は認識器の数）")
+    parser.add_argument(
+        "--block-ms", type=float, default=100.0, help="1ブロックの長さ[msec]"
+    )
+    args = parser.parse_args()
+
+    candidates = [read_grammar(path) for path in args.grammars]
+    candidates.append((FREE_GRAMMAR, []))
+    for n in range(1, args.max + 1):
+        # 同じワードリストを繰り返す場合も、認識器は別々に作る
+        grammars = []
+        for i in range(n):
+            name, words = candidates[i % len(candidates)]
+            grammars.append((f"{name}#{i}", words))
+        print(json.dumps(measure(grammars, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""録音済みの音声を流し、キーワードの発話開始から検出までの時間を計測する。
+
+    $python benchmarks/bench_keyword.py --model model --words keywords.txt commands.wav
+
+以下の2通りを比較する。
+- partial: KeywordSpotterで途中認識結果から検出する（--kws）
+- final: 確定結果にキーワードが含まれるかで判定する（発話終端の無音を待つ従来の方法）
+時刻は認識器へ渡した音声上の時間で計るため、流す速さや計算機の負荷には依存しない。
+（latency = 検出時点までに渡した音声の長さ - キーワードの開始時刻）
+あわせて、1ブロックあたりの途中認識結果の取得（JSON解析）と索引の検索にかかる時間を出力する。
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.spotter import KeywordSpotter
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.word_timing import UtteranceWords
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def summarize(name: str, latencies: List[float]) -> Dict:
+    return {
+        "mode": name,
+        "hits": len(latencies),
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p95": percentile(latencies, 95),
+        "latency_ms_max": max(latencies, default=0.0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="キーワードを含むWAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument(
+        "--words", required=True, help="キーワードを1行1語で記載したファイル"
+    )
+    parser.add_argument(
+        "--grammar",
+        action="store_true",
+        help="キーワードのみを文法とした認識器を使う（省略時は通常のモデル）",
+    )
+    parser.add_argument("--threshold", type=float, default=0.7, help="検出の閾値")
+    parser.add_argument(
+        "--block-ms", type=float, default=100.0, help="1ブロックの長さ[msec]"
+    )
+    args = parser.parse_args()
+
+    with open(args.words, "r", encoding="utf-8") as f:
+        keywords = list(dict.fromkeys(l.strip() for l in f if l.strip() != ""))
+    spotter = KeywordSpotter(keywords, args.threshold)
+    # 確定結果での判定は、発話毎に同じ索引で確定結果の単語列のみを調べる
+    final_spotter = KeywordSpotter(keywords, args.threshold, min_interval_ms=0)
+    vosk = VoskClient(track_partial_conf=False, word_timings=True)
+    pcm = PcmFile(args.file, 16000)
+    vosk.initialize_model(
+        keywords if args.grammar else [], pcm.sampling_rate, args.model
+    )
+
+    partial_latency: List[float] = []
+    final_latency: List[float] = []
+    partial_sec = 0.0
+    spot_sec = 0.0
+    blocks = 0
+    chunk_samples = max(1, int(pcm.sampling_rate * args.block_ms / 1000))
+    try:
+        for data in pcm.iter_chunks(chunk_samples):
+            blocks += 1
+            recognized = vosk.recognize(data)
+            stream_time = vosk.stream_time
+            if recognized is None:
+                start = time.perf_counter()
+                words = vosk.partial_words
+                partial_sec += time.perf_counter() - start
+                start = time.perf_counter()
+                hits = spotter.update(words, stream_time)
+                spot_sec += time.perf_counter() - start
+                partial_latency.extend(hit.latency_ms for hit in hits)
+                continue
+            final_words = recognized.get("words")
+            if isinstance(final_words, UtteranceWords):
+                words = final_words.to_list()
+                hits = spotter.update(words, stream_time)
+                partial_latency.extend(hit.latency_ms for hit in hits)
+                final_spotter.reset()
+                final_latency.extend(
+                    hit.latency_ms for hit in final_spotter.update(words, stream_time)
+                )
+            spotter.reset()
+    finally:
+        pcm.close()
+
+    print(json.dumps(summarize("partial", partial_latency)))
+    print(json.dumps(summarize("final", final_latency)))
+    print(
+        json.dumps(
+            {
+                "blocks": blocks,
+                "keywords": len(spotter),
+                "partial_ms_per_block": partial_sec / max(1, blocks) * 1000,
+                "spot_ms_per_block": spot_sec / max(1, blocks) * 1000,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""途中認識結果の取得方法による、1発話あたりのJSON解析時間とconfidence保持量を計測する。
+
+    $python benchmarks/bench_partial.py --model model long_speech.wav
+
+以下の3通りを比較する。
+- legacy: 毎ブロックPartialResultを解析し、単語毎にconfidenceをリストへ追記する（旧実装）
+- tracked: 毎ブロックPartialResultを解析し、単語毎の集計値（count/mean/min/last）を保持する
+- lazy: 途中認識結果を参照しない（GUIで途中結果を表示しない場合）
+
+長い発話ほど旧実装のリストが伸びるため、連続した発話を含むファイルで計測する。
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.vosk_client import VoskClient
+
+
+def deep_size(obj: object) -> int:
+    """confidenceの保持に使われているおおよそのバイト数を返す。"""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            deep_size(k) + deep_size(v) for k, v in obj.items()
+        )
+    if isinstance(obj, list):
+        return sys.getsizeof(obj) + sum(deep_size(v) for v in obj)
+    if hasattr(obj, "__slots__"):
+        return sys.getsizeof(obj) + sum(
+            sys.getsizeof(getattr(obj, name)) for name in obj.__slots__
+        )
+    return sys.getsizeof(obj)
+
+
+def measure(model: str, path: str, mode: str, block_size: int) -> Dict:
+    vosk = VoskClient(track_partial_conf=mode == "tracked")
+    f = PcmFile(path, 16000)
+    try:
+        vosk.initialize_model([], f.sampling_rate, model)
+        legacy: Dict[str, List[float]] = {}
+        parse_sec = 0.0
+        blocks = 0
+        utterance_blocks: List[int] = []
+        conf_bytes: List[int] = []
+        current_blocks = 0
+        current_bytes = 0
+        cpu_start = time.process_time()
+        for data in f.iter_chunks(block_size):
+            recognized = vosk.recognize(data)
+            blocks += 1
+            current_blocks += 1
+            parse_sec += vosk.timings["partial"]
+            if recognized is None and mode == "legacy":
+                start = time.perf_counter()
+                response = json.loads(vosk._rec.PartialResult())
+                for r in response.get("partial_result", []):
+                    legacy.setdefault(r["word"], []).append(r["conf"])
+                parse_sec += time.perf_counter() - start
+            if recognized is None:
+                # 発話の確定直前の保持量を記録するため毎ブロック測る（計測時間には含めない）
+                cpu_pause = time.process_time()
+                current_bytes = deep_size(
+                    legacy if mode == "legacy" else vosk._partial_conf
+                )
+                cpu_start += time.process_time() - cpu_pause
+            else:
+                utterance_blocks.append(current_blocks)
+                conf_bytes.append(current_bytes)
+                current_blocks = 0
+                current_bytes = 0
+                legacy = {}
+        cpu = time.process_time() - cpu_start
+        audio_sec = f.n_samples / f.sampling_rate
+    finally:
+        f.close()
+    n = max(1, len(utterance_blocks))
+    return {
+        "mode": mode,
+        "block_size": block_size,
+        "utterances": len(utterance_blocks),
+        "max_blocks_per_utterance": max(utterance_blocks, default=0),
+        "parse_ms_per_block": parse_sec / max(1, blocks) * 1000,
+        "parse_ms_per_utterance": parse_sec / n * 1000,
+        "conf_bytes_per_utterance_mean": sum(conf_bytes) / n,
+        "conf_bytes_per_utterance_max": max(conf_bytes, default=0),
+        "cpu_real_time_factor": cpu / audio_sec,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="長い発話を含むWAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument("--block-size", type=int, default=1600, help="1ブロックのサンプル数")
+    args = parser.parse_args()
+
+    for mode in ["legacy", "tracked", "lazy"]:
+        print(json.dumps(measure(args.model, args.file, mode, args.block_size)))
+
+
+if __name__ == "__main__":
+    main()
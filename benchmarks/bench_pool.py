@@ -0,0 +1,43 @@
+"""TranscribePoolのワーカー数に対するスケーリングを計測する。
+
+    $python benchmarks/bench_pool.py --model model data/*.wav
+"""
+import argparse
+import io
+import json
+import os
+from typing import List
+
+from vosk_example_gui.pool import TranscribePool
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", help="対象のWAV/raw PCMファイル")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument(
+        "--max-workers", type=int, default=os.cpu_count() or 1, help="最大ワーカー数"
+    )
+    args = parser.parse_args()
+
+    worker_counts: List[int] = []
+    n = 1
+    while n < args.max_workers:
+        worker_counts.append(n)
+        n *= 2
+    worker_counts.append(args.max_workers)
+
+    base = None
+    for workers in worker_counts:
+        with TranscribePool(args.model, workers=workers) as pool:
+            stats = pool.run(args.files, io.StringIO())
+        if base is None:
+            base = stats["files_per_sec"]
+        speedup = stats["files_per_sec"] / base if base > 0 else 0.0
+        stats["speedup"] = speedup
+        stats["efficiency"] = speedup / workers
+        print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
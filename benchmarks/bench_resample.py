@@ -0,0 +1,89 @@
+"""リサンプラの有無による認識処理のCPU時間と認識結果を比較する。
+
+    $python benchmarks/bench_resample.py --model model input_48k.wav reference_16k.wav
+
+input_48k.wavはデバイスと同じ高いサンプリングレートの音声、reference_16k.wavは同じ音声を
+オフラインで（sox等により）モデルのサンプリングレートへ変換したもの。以下の3通りを実行する。
+- direct: 高いサンプリングレートのまま認識器へ渡す（従来の動作）
+- streaming: Resamplerでブロック毎に変換して認識器へ渡す
+- reference: オフライン変換済みの音声を認識器へ渡す
+"""
+import argparse
+import json
+import time
+from typing import Dict, Optional
+
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.resampler import Resampler
+from vosk_example_gui.vosk_client import VoskClient, get_model_sampling_rate
+
+
+def run(
+    vosk: VoskClient, path: str, block_ms: float, target_rate: Optional[int]
+) -> Dict:
+    f = PcmFile(path, 16000)
+    try:
+        block_size = max(1, int(f.sampling_rate * block_ms / 1000))
+        resampler = None
+        rate = f.sampling_rate
+        if target_rate is not None and target_rate != f.sampling_rate:
+            resampler = Resampler(f.sampling_rate, target_rate)
+            rate = target_rate
+        vosk.initialize_recognizer([], rate)
+
+        texts = []
+        cpu_start = time.process_time()
+        for data in f.iter_chunks(block_size):
+            if resampler is not None:
+                data = resampler.process(data).tobytes()
+            recognized = vosk.recognize(data)
+            if recognized is not None:
+                texts.append(recognized["result"])
+        recognized = vosk.flush()
+        if recognized is not None:
+            texts.append(recognized["result"])
+        cpu = time.process_time() - cpu_start
+        return {
+            "cpu_sec": cpu,
+            "cpu_real_time_factor": cpu / (f.n_samples / f.sampling_rate),
+            "transcript": " ".join(t for t in texts if t != ""),
+        }
+    finally:
+        f.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="高いサンプリングレートのWAVファイル")
+    parser.add_argument(
+        "reference", help="オフラインでモデルのレートへ変換したWAVファイル"
+    )
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument("--block-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    vosk = VoskClient()
+    vosk.load_model(args.model)
+    model_rate = get_model_sampling_rate(args.model) or 16000
+
+    results = {
+        "direct": run(vosk, args.input, args.block_ms, None),
+        "streaming": run(vosk, args.input, args.block_ms, model_rate),
+        "reference": run(vosk, args.reference, args.block_ms, None),
+    }
+    for name, result in results.items():
+        print(json.dumps({"mode": name, **result}, ensure_ascii=False))
+    print(
+        json.dumps(
+            {
+                "streaming_matches_reference": results["streaming"]["transcript"]
+                == results["reference"]["transcript"],
+                "cpu_saving": 1.0
+                - results["streaming"]["cpu_sec"] / results["direct"]["cpu_sec"],
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""認識・音声入力・描画のホットパスをまとめて計測し、結果をJSONファイルに保存する。
+
+    $python benchmarks/bench_suite.py --model model sample.wav -o results/v1.json
+    $python benchmarks/bench_suite.py --model model sample.wav --only recognize queue
+
+ローカルのモデルと録音済みのファイルのみで動作する。計測項目は以下の通り。
+- recognize: ブロックサイズ毎のVoskClient.recognizeのスループット（RTF・1ブロックの処理時間）
+- model_load: initialize_modelのコールド（モデルキャッシュなし）・ウォーム（キャッシュあり）時間
+- grammar_switch: ワードリストの切り替え時間（認識器の作成・LRUからの再利用・発話区切りでの切り替え）
+- waveform: Viwer.update_waveformの1フレームの処理時間（ディスプレイがない場合はスキップ）
+- queue: BlockQueueのput/get 1回あたりの処理時間（queue.Queueとの比較）
+
+バージョン間の比較には benchmarks/compare.py を利用する。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import queue
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vosk_example_gui.block_queue import BlockQueue
+from vosk_example_gui.pcm import SAMPLE_WIDTH, PcmFile
+
+CASES = ["recognize", "model_load", "grammar_switch", "waveform", "queue"]
+
+
+def summarize(samples: List[float]) -> Dict:
+    """処理時間[sec]のリストを集計する。（結果はmsec）"""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[len(ms) // 2],
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+
+
+def load_pcm(path: str) -> Tuple[bytes, int]:
+    """ファイル全体を読み込み、(PCM, サンプリングレート)を返す。"""
+    f = PcmFile(path, 16000)
+    try:
+        return f.read(f.n_samples), f.sampling_rate
+    finally:
+        f.close()
+
+
+def read_model_words(model_path: str, limit: int) -> List[str]:
+    """モデルの語彙（graph/words.txt）からワードリストを作る。"""
+    path = os.path.join(model_path, "graph", "words.txt")
+    words: List[str] = []
+    if not os.path.exists(path):
+        return words
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            word = line.split(maxsplit=1)[0] if line.strip() else ""
+            if word == "" or word.startswith(("<", "#", "!")):
+                continue
+            words.append(word)
+            if len(words) >= limit:
+                break
+    return words
+
+
+def bench_recognize(args: argparse.Namespace) -> List[Dict]:
+    from vosk_example_gui.vosk_client import VoskClient
+
+    pcm, rate = load_pcm(args.file)
+    audio_sec = len(pcm) / SAMPLE_WIDTH / rate
+    vosk = VoskClient()
+    vosk.load_model(args.model)
+    view = memoryview(pcm)
+    results = []
+    for block_size in args.block_sizes:
+        block_bytes = block_size * SAMPLE_WIDTH
+        vosk.initialize_recognizer([], rate)
+        samples = []
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for offset in range(0, len(view), block_bytes):
+            start = time.perf_counter()
+            vosk.recognize(view[offset : offset + block_bytes])
+            samples.append(time.perf_counter() - start)
+        vosk.flush()
+        wall = time.perf_counter() - wall_start
+        results.append(
+            {
+                "case": "recognize",
+                "block_size": block_size,
+                "block_ms": block_size / rate * 1000,
+                "audio_sec": audio_sec,
+                "rtf": wall / audio_sec,
+                "cpu_rtf": (time.process_time() - cpu_start) / audio_sec,
+                "blocks_per_sec": len(samples) / wall,
+                **summarize(samples),
+            }
+        )
+    return results
+
+
+def bench_model_load(args: argparse.Namespace) -> List[Dict]:
+    from vosk_example_gui.vosk_client import VoskClient, clear_model_cache
+
+    cold, warm = [], []
+    for _ in range(args.repeat):
+        clear_model_cache()
+        start = time.perf_counter()
+        VoskClient().initialize_model([], 16000, args.model)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        VoskClient().initialize_model([], 16000, args.model)
+        warm.append(time.perf_counter() - start)
+    # 1回目のコールドはディスクからの読み込みを含むため別に記録する
+    return [
+        {"case": "model_load", "kind": "first", **summarize(cold[:1])},
+        {"case": "model_load", "kind": "cold", **summarize(cold)},
+        {"case": "model_load", "kind": "warm", **summarize(warm)},
+    ]
+
+
+def bench_grammar_switch(args: argparse.Namespace) -> List[Dict]:
+    from vosk_example_gui.vosk_client import VoskClient
+
+    vocabulary = read_model_words(args.model, max(args.grammar_sizes) * 2)
+    if len(vocabulary) == 0:
+        return [{"case": "grammar_switch", "skipped": "graph/words.txt not found"}]
+    pcm, rate = load_pcm(args.file)
+    view = memoryview(pcm)
+    block_bytes = args.block_sizes[0] * SAMPLE_WIDTH
+    vosk = VoskClient(recognizer_cache_size=2)
+    vosk.load_model(args.model)
+
+    results = []
+    for size in args.grammar_sizes:
+        lists = [vocabulary[:size], vocabulary[size : size * 2]]
+        build, reuse, switch = [], [], []
+        for i in range(args.repeat):
+            # 初回は作成、2回目以降はLRUからの再利用
+            target = build if i == 0 else reuse
+            for words in lists:
+                start = time.perf_counter()
+                vosk.initialize_recognizer(words, rate)
+                target.append(time.perf_counter() - start)
+
+            # 認識しながら切り替えを予約し、発話の区切りで切り替わるまでの時間
+            reports: List[Dict] = []
+            vosk.prepare_recognizer(lists[0], rate, reports.append)
+            for offset in range(0, len(view), block_bytes):
+                vosk.recognize(view[offset : offset + block_bytes])
+                if reports:
+                    switch.append(reports[0]["switch_sec"])
+                    break
+            vosk.flush()
+        measured = {"build": build, "reuse": reuse, "switch_at_boundary": switch}
+        for kind, samples in measured.items():
+            if samples:
+                results.append(
+                    {
+                        "case": "grammar_switch",
+                        "kind": kind,
+                        "words": size,
+                        **summarize(samples),
+                    }
+                )
+    return results
+
+
+def bench_waveform(args: argparse.Namespace) -> List[Dict]:
+    try:
+        from vosk_example_gui.view import Viwer
+
+        viewer = Viwer(word_list=[], pulldown_list=["benchmark"], max_fps=0)
+    except Exception as e:
+        # ディスプレイ・GUIライブラリがない環境
+        return [{"case": "waveform", "skipped": f"{type(e).__name__}: {e}"}]
+    try:
+        rng = np.random.default_rng(0)
+        results = []
+        for block_size in args.block_sizes:
+            blocks = [
+                rng.integers(-32768, 32767, block_size, dtype=np.int16)
+                for _ in range(8)
+            ]
+            samples = []
+            for i in range(args.frames):
+                start = time.perf_counter()
+                viewer.update_waveform(blocks[i % len(blocks)])
+                viewer.window.refresh()
+                samples.append(time.perf_counter() - start)
+            results.append(
+                {"case": "waveform", "block_size": block_size, **summarize(samples)}
+            )
+        return results
+    finally:
+        viewer.close()
+
+
+def _time_per_op(n: int, op: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        op()
+    return (time.perf_counter() - start) / n
+
+
+def bench_queue(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    n = args.queue_ops
+    for block_size in args.block_sizes:
+        block_bytes = block_size * SAMPLE_WIDTH
+        data = bytes(block_bytes)
+        q = BlockQueue(8, block_bytes)
+
+        def block_queue_op() -> None:
+            q.put(data)
+            q.get()
+
+        reference: "queue.Queue[bytes]" = queue.Queue()
+
+        def queue_op() -> None:
+            # 旧実装と同様にコールバック側でbytesへコピーしてから渡す
+            reference.put(bytes(data))
+            reference.get()
+
+        results.append(
+            {
+                "case": "queue",
+                "block_size": block_size,
+                "block_queue_us": _time_per_op(n, block_queue_op) * 1e6,
+                "queue_queue_us": _time_per_op(n, queue_op) * 1e6,
+            }
+        )
+        q.release()
+    return results
+
+
+def get_metadata() -> Dict:
+    """比較の際に環境の違いを判別するための情報"""
+    try:
+        revision: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="発話を含むWAVファイル（モノラル16bit）")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument("-o", "--output", help="結果のJSONファイル（省略時は標準出力）")
+    parser.add_argument("--only", nargs="+", choices=CASES, help="実行する計測項目")
+    parser.add_argument(
+        "--block-sizes",
+        type=int,
+        nargs="+",
+        default=[800, 1600, 4000, 8000],
+        help="計測するブロックサイズ[サンプル]",
+    )
+    parser.add_argument(
+        "--grammar-sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="切り替えを計測するワードリストの語数",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="読み込み・切り替えの計測回数")
+    parser.add_argument("--frames", type=int, default=200, help="波形描画の計測フレーム数")
+    parser.add_argument("--queue-ops", type=int, default=100000, help="キューの計測回数")
+    args = parser.parse_args()
+
+    benches = {
+        "recognize": bench_recognize,
+        "model_load": bench_model_load,
+        "grammar_switch": bench_grammar_switch,
+        "waveform": bench_waveform,
+        "queue": bench_queue,
+    }
+    results: List[Dict] = []
+    for case in args.only or CASES:
+        start = time.perf_counter()
+        results.extend(benches[case](args))
+        print(f"{case}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    report = {"metadata": get_metadata(), "args": vars(args), "results": results}
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""発話区間ゲートによるCPU時間の削減量と単語誤り率（WER）の変化を計測する。
+
+    $python benchmarks/bench_vad.py --model model testset.tsv
+
+testset.tsvは1行に「WAVファイルのパス<TAB>正解テキスト」を記載したファイル。
+計測の前に、ゲートが開いた際のpre-rollが入力したデータのまま渡されることを確認する。
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.vad import VoiceActivityGate
+from vosk_example_gui.vosk_client import VoskClient
+
+
+def word_errors(ref: List[str], hyp: List[str]) -> int:
+    """単語単位の編集距離を返す。"""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def check_pre_roll(sampling_rate: int, pre_roll_ms: float, block_ms: float) -> None:
+    """無音の後に発話を入力し、直前の入力がpre-rollとしてそのまま返されるか確認する。"""
+    rng = np.random.default_rng(0)
+    gate = VoiceActivityGate(sampling_rate, pre_roll_ms=pre_roll_ms)
+    block_size = max(1, int(sampling_rate * block_ms / 1000))
+    fed = []
+    for _ in range(20):
+        block = rng.normal(0, 30, block_size).astype(np.int16)
+        fed.append(block)
+        assert gate.process(block) == []
+    t = np.arange(block_size) / sampling_rate
+    onset = (np.sin(2 * np.pi * 1000 * t) * 8000).astype(np.int16)
+    chunks = gate.process(onset)
+    assert len(chunks) == 2, "gate did not open on onset"
+    expected = np.concatenate(fed)[-len(chunks[0]) :]
+    assert len(chunks[0]) == int(sampling_rate * pre_roll_ms / 1000)
+    assert np.array_equal(chunks[0], expected), "pre-roll samples were modified"
+    assert np.array_equal(chunks[1], onset)
+
+
+def transcribe(
+    vosk: VoskClient, path: str, block_ms: float, use_gate: bool, pre_roll_ms: float
+) -> Tuple[str, float, float]:
+    f = PcmFile(path, 16000)
+    try:
+        block_size = max(1, int(f.sampling_rate * block_ms / 1000))
+        gate = VoiceActivityGate(f.sampling_rate, pre_roll_ms=pre_roll_ms)
+        vosk.initialize_recognizer([], f.sampling_rate)
+        texts = []
+        cpu_start = time.process_time()
+        for data in f.iter_chunks(block_size):
+            chunks = [np.frombuffer(data, dtype=np.int16)]
+            if use_gate:
+                chunks = gate.process(chunks[0])
+                if len(chunks) == 0 and vosk.in_utterance:
+                    recognized = vosk.flush()
+                    if recognized is not None:
+                        texts.append(recognized["result"])
+            for chunk in chunks:
+                recognized = vosk.recognize(chunk.tobytes())
+                if recognized is not None:
+                    texts.append(recognized["result"])
+        recognized = vosk.flush()
+        if recognized is not None:
+            texts.append(recognized["result"])
+        cpu = time.process_time() - cpu_start
+        skipped = gate.skipped_ratio if use_gate else 0.0
+        return " ".join(t for t in texts if t != ""), cpu, skipped
+    finally:
+        f.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("testset", help="「WAVのパス<TAB>正解テキスト」のTSV")
+    parser.add_argument("--model", default="model", help="モデルのパス")
+    parser.add_argument("--block-ms", type=float, default=100.0)
+    parser.add_argument("--pre-roll-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    with open(args.testset, "r", encoding="utf-8") as f:
+        testset = [line.rstrip("\n").split("\t", 1) for line in f if "\t" in line]
+
+    check_pre_roll(16000, args.pre_roll_ms, args.block_ms)
+    vosk = VoskClient()
+    vosk.load_model(args.model)
+    summary: Dict[str, Dict] = {}
+    for use_gate in (False, True):
+        errors = 0
+        n_words = 0
+        cpu = 0.0
+        skipped = []
+        for path, ref in testset:
+            hyp, sec, ratio = transcribe(
+                vosk, path, args.block_ms, use_gate, args.pre_roll_ms
+            )
+            errors += word_errors(ref.lower().split(), hyp.lower().split())
+            n_words += len(ref.split())
+            cpu += sec
+            skipped.append(ratio)
+        summary["gate" if use_gate else "no_gate"] = {
+            "wer": errors / n_words if n_words > 0 else 0.0,
+            "cpu_sec": cpu,
+            "mean_skipped_ratio": float(np.mean(skipped)) if skipped else 0.0,
+        }
+    summary["cpu_saving"] = (
+        1.0 - summary["gate"]["cpu_sec"] / summary["no_gate"]["cpu_sec"]
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
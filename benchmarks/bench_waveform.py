@@ -0,0 +1,83 @@
+"""波形描画1フレームあたりの処理時間を、旧実装（draw_lineを最大511回）と比較する。
+
+    $python benchmarks/bench_waveform.py --block-size 8000 --frames 200
+
+Tkのキャンバスを利用するため、ディスプレイのある環境で実行する。
+"""
+import argparse
+import json
+import time
+import tkinter as tk
+from typing import Callable
+
+import numpy as np
+
+from vosk_example_gui.waveform import WaveformRenderer
+
+WIDTH, HEIGHT = 232, 125
+
+
+def legacy_render(canvas: tk.Canvas, data: np.ndarray) -> None:
+    """旧実装（Viwer.update_waveform）と同等の描画を行う。"""
+    canvas.delete("all")
+    canvas.create_line(0, HEIGHT / 2, WIDTH, HEIGHT / 2)
+    sx = WIDTH / 512
+    prev_x = None
+    for i, x in enumerate(data[:: len(data) // 512]):
+        if i == 512:
+            break
+        if prev_x is not None:
+            canvas.create_line(
+                (i - 1) * sx,
+                HEIGHT / 2 - prev_x * HEIGHT / 2,
+                i * sx,
+                HEIGHT / 2 - x * HEIGHT / 2,
+                fill="red",
+            )
+        prev_x = x
+
+
+def measure(
+    root: tk.Tk, render: Callable[[np.ndarray], None], frames: int, block_size: int
+) -> float:
+    """1フレームあたりの平均処理時間[ms]を返す。"""
+    rng = np.random.default_rng(0)
+    blocks = [rng.uniform(-1.0, 1.0, block_size) for _ in range(8)]
+    start = time.perf_counter()
+    for i in range(frames):
+        render(blocks[i % len(blocks)])
+        root.update_idletasks()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--block-size", type=int, default=8000)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    legacy_canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT)
+    legacy_canvas.pack()
+    canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT)
+    canvas.pack()
+    renderer = WaveformRenderer(canvas, (WIDTH, HEIGHT), max_fps=0)
+
+    result = {
+        "block_size": args.block_size,
+        "legacy_ms_per_frame": measure(
+            root,
+            lambda d: legacy_render(legacy_canvas, d),
+            args.frames,
+            args.block_size,
+        ),
+        "envelope_ms_per_frame": measure(
+            root, renderer.render, args.frames, args.block_size
+        ),
+    }
+    root.destroy()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
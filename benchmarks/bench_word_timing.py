@@ -0,0 +1,135 @@
+"""単語毎の時刻情報の保持方法による、1,000発話あたりのメモリ量と変換・書き出し時間を計測する。
+
+    $python benchmarks/bench_word_timing.py --utterances 1000 --words 12
+
+Voskの確定結果（SetWords有効時）と同じ形式のJSONを生成し、以下の3通りを比較する。
+- dict: json.loadsした"result"（単語毎のDictのリスト）をそのまま保持する
+- compact: 発話毎にUtteranceWords（単語IDと数値の構造化配列）として保持する
+- timeline: WordTimelineに全発話の単語を1つの配列としてまとめて保持する
+各方式で、JSON文字列からの変換時間（parse_ms）、保持しているメモリ量（retained_bytes、
+tracemallocで計測）、JSONL・npzへの書き出し時間とファイルサイズを1,000発話あたりに換算して出力する。
+単語の対応表はプロセス内で共有するため、その分は最初に計測するcompactのみに含まれる。
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from vosk_example_gui.word_timing import UtteranceWords, WordTimeline, json_default
+
+
+def make_responses(n_utterances: int, n_words: int, n_vocab: int) -> List[str]:
+    """Voskの確定結果と同じ形式のJSON文字列を生成する。"""
+    rng = random.Random(0)
+    vocab = [f"word{i}" for i in range(n_vocab)]
+    responses = []
+    t = 0.0
+    for _ in range(n_utterances):
+        result = []
+        for _ in range(n_words):
+            duration = rng.uniform(0.1, 0.6)
+            result.append(
+                {
+                    "conf": round(rng.uniform(0.3, 1.0), 6),
+                    "end": round(t + duration, 6),
+                    "start": round(t, 6),
+                    "word": rng.choice(vocab),
+                }
+            )
+            t += duration
+        text = " ".join(r["word"] for r in result)
+        responses.append(json.dumps({"result": result, "text": text}))
+        t += 1.0
+    return responses
+
+
+def measure_retained(build: Callable[[], object]) -> Tuple[object, int, float]:
+    """buildで作成したオブジェクトが保持し続けるメモリ量と作成時間を返す。"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, retained, elapsed
+
+
+def file_cost(write: Callable[[str], None], suffix: str) -> Tuple[float, int]:
+    """書き出しにかかった時間とファイルサイズを返す。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out" + suffix)
+        start = time.perf_counter()
+        write(path)
+        elapsed = time.perf_counter() - start
+        return elapsed, os.path.getsize(path)
+
+
+def write_jsonl(results: List[Dict]) -> Callable[[str], None]:
+    def write(path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for recognized in results:
+                line = json.dumps(recognized, ensure_ascii=False, default=json_default)
+                f.write(line + "\n")
+
+    return write
+
+
+def measure(mode: str, responses: List[str]) -> Dict:
+    def build() -> object:
+        results = []
+        for raw in responses:
+            response = json.loads(raw)
+            words = response["result"]
+            if mode != "dict":
+                words = UtteranceWords.from_vosk(words)
+            results.append({"result": response["text"], "words": words})
+        if mode != "timeline":
+            return results
+        timeline = WordTimeline()
+        for recognized in results:
+            timeline.add_result(recognized)
+        return timeline
+
+    # 変換の途中で作られる発話毎のDictは、timelineでは作成後に解放される
+    obj, retained, parse_sec = measure_retained(build)
+    per = 1000 / len(responses)
+    stats = {
+        "mode": mode,
+        "utterances": len(responses),
+        "parse_ms": parse_sec * 1000 * per,
+        "retained_bytes": retained * per,
+    }
+    if isinstance(obj, WordTimeline):
+        jsonl_sec, jsonl_bytes = file_cost(obj.export_jsonl, ".jsonl")
+        npz_sec, npz_bytes = file_cost(obj.export_npz, ".npz")
+        stats["npz_ms"] = npz_sec * 1000 * per
+        stats["npz_bytes"] = npz_bytes * per
+    else:
+        assert isinstance(obj, list)
+        jsonl_sec, jsonl_bytes = file_cost(write_jsonl(obj), ".jsonl")
+    stats["jsonl_ms"] = jsonl_sec * 1000 * per
+    stats["jsonl_bytes"] = jsonl_bytes * per
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=1000, help="発話数")
+    parser.add_argument("--words", type=int, default=12, help="1発話あたりの単語数")
+    parser.add_argument("--vocab", type=int, default=5000, help="語彙数")
+    args = parser.parse_args()
+
+    responses = make_responses(args.utterances, args.words, args.vocab)
+    for mode in ["dict", "compact", "timeline"]:
+        print(json.dumps(measure(mode, responses)))
+
+
+if __name__ == "__main__":
+    main()
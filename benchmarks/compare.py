@@ -0,0 +1,72 @@
+"""bench_suite.pyの結果を2つ比較し、悪化した項目を出力する。
+
+    $python benchmarks/compare.py results/v1.json results/v2.json --threshold 10
+
+処理時間・RTFが閾値[%]以上増えた項目があれば終了コード1を返す。
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+# 結果を識別するキー（それ以外の数値は計測値として比較する）
+KEY_FIELDS = ("case", "kind", "block_size", "words")
+# 値が小さいほど良い計測値
+METRIC_FIELDS = (
+    "mean_ms",
+    "p50_ms",
+    "p95_ms",
+    "rtf",
+    "cpu_rtf",
+    "block_queue_us",
+)
+
+
+def load(path: str) -> Dict[Tuple, Dict]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {
+        tuple(r.get(k) for k in KEY_FIELDS): r
+        for r in report["results"]
+        if "skipped" not in r
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base", help="基準の結果JSON")
+    parser.add_argument("target", help="比較対象の結果JSON")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="悪化とみなす増加率[%%]"
+    )
+    args = parser.parse_args()
+
+    base = load(args.base)
+    target = load(args.target)
+    regressed = False
+    for key, result in target.items():
+        if key not in base:
+            continue
+        for field in METRIC_FIELDS:
+            if field not in result or not base[key].get(field):
+                continue
+            change = (result[field] / base[key][field] - 1) * 100
+            status = "REGRESSED" if change >= args.threshold else "ok"
+            regressed |= status == "REGRESSED"
+            print(
+                json.dumps(
+                    {
+                        **{k: v for k, v in zip(KEY_FIELDS, key) if v is not None},
+                        "metric": field,
+                        "base": base[key][field],
+                        "target": result[field],
+                        "change_percent": change,
+                        "status": status,
+                    }
+                )
+            )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
-import logging
-import os
-import sys
-import traceback
-from logging.handlers import RotatingFileHandler
+import time
 
-from vosk_example_gui.app import App
+# 起動時間の計測の起点（モジュールのimportを含めるため、他のimportより先に記録する）
+_STARTED_AT = time.perf_counter()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import traceback  # noqa: E402
+from logging.handlers import RotatingFileHandler  # noqa: E402
+from typing import Dict, List, Optional, Tuple  # noqa: E402
+
+from vosk_example_gui.config import BLOCK_SIZE, DEFAULT_CHUNK_SAMPLES  # noqa: E402
+from vosk_example_gui.metrics import registry  # noqa: E402
 
 root = logging.getLogger(__name__)
 
@@ -57,9 +68,590 @@ def setup_log() -> None:
     logging.basicConfig(level=LOG_LEVEL, handlers=[stream_handler, file_handler])
 
 
-def main() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する。
+
+    Args:
+        argv (Optional[List[str]], optional): 引数リスト. Defaults to None.
+
+    Returns:
+        argparse.Namespace: 解析結果
+    """
+    parser = argparse.ArgumentParser(prog="vosk_example_gui")
+    parser.add_argument(
+        "--block-size", type=int, default=BLOCK_SIZE, help="1ブロックのサンプル数"
+    )
+    parser.add_argument(
+        "--block-ms", type=float, help="1ブロックの長さ[msec]（--block-sizeより優先）"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=10,
+        help="GUIのevent loopのタイムアウト時間[msec]",
+    )
+    parser.add_argument(
+        "--partial", action="store_true", help="途中認識結果をリアルタイムに表示する"
+    )
+    parser.add_argument(
+        "--channels",
+        type=int,
+        default=1,
+        help="入力チャンネル数（モノラルへミックスダウンして認識する）",
+    )
+    parser.add_argument(
+        "--vad", action="store_true", help="無音区間を認識器へ渡さない"
+    )
+    parser.add_argument(
+        "--vad-threshold-db",
+        type=float,
+        default=12.0,
+        help="推定ノイズレベルに対する発話判定の閾値[dB]",
+    )
+    parser.add_argument(
+        "--vad-pre-roll-ms",
+        type=float,
+        default=300.0,
+        help="発話開始時に遡って認識器へ渡す長さ[msec]",
+    )
+    parser.add_argument(
+        "--kws",
+        action="store_true",
+        help="ワードリストをキーワードとして途中認識結果から検出する（GUI・listen）",
+    )
+    parser.add_argument(
+        "--kws-threshold",
+        type=float,
+        default=0.7,
+        help="キーワードの検出に必要なconfidence",
+    )
+    parser.add_argument(
+        "--kws-thresholds",
+        help="キーワード毎の閾値を1行に「キーワード<TAB>閾値」で記載したファイル",
+    )
+    parser.add_argument(
+        "--grammar",
+        "--grammars",
+        dest="grammars",
+        action="append",
+        metavar="FILE",
+        help="主の入力を並行して認識するワードリストファイル（複数の場合は繰り返し指定する。ファイル名を文法の名前とし、主のワードリストがある場合はワードリストなしの認識器も加える）",
+    )
+    parser.add_argument(
+        "--fanout-workers",
+        type=int,
+        help="--grammarの認識処理のスレッド数（省略時は文法の数）",
+    )
+    parser.add_argument(
+        "--device",
+        "--devices",
+        dest="devices",
+        action="append",
+        metavar="NAME",
+        help="同時に認識する追加の入力デバイス名（複数の場合は繰り返し指定する）",
+    )
+    parser.add_argument(
+        "--recognize-workers",
+        type=int,
+        help="認識処理のスレッド数（省略時はCPUコア数）",
+    )
+    parser.add_argument(
+        "--replay",
+        help="マイクの代わりに入力とするWAV/raw PCMファイル（--deviceもファイルとして扱う）",
+    )
+    parser.add_argument(
+        "--replay-fast", action="store_true", help="replayを可能な限り速く流す"
+    )
+    parser.add_argument("--record", help="入力を保存するWAVファイルのパス")
+    parser.add_argument(
+        "--archive", help="認識した音声と結果を追記するディレクトリ（GUI・listen）"
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=5.0,
+        help="レイテンシ・スループットの計測値をログ出力する間隔[sec]",
+    )
+    parser.add_argument(
+        "--metrics-json", help="計測値を定期的に書き出すJSONファイルのパス"
+    )
+    parser.add_argument(
+        "--core",
+        choices=["asyncio", "threads"],
+        default="asyncio",
+        help="認識の駆動方法（asyncio: イベント駆動、threads: 従来のポーリング）",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    listen = sub.add_parser(
+        "listen",
+        help="GUIを起動せずにマイク（または--replayのファイル）を認識し、結果をJSONLで出力する",
+    )
+    listen.add_argument("--model", default="model", help="モデルのパス")
+    listen.add_argument(
+        "--output", "-o", default="-", help="JSONLの出力先（-は標準出力）"
+    )
+    listen.add_argument("--words", help="認識対象のワードを1行1語で記載したファイル")
+    listen.add_argument(
+        "--word-timings", action="store_true", help="結果に単語毎の時刻を含める"
+    )
+
+    archive = sub.add_parser(
+        "archive", help="--archiveで保存した発話を一覧し、必要に応じて認識し直す"
+    )
+    archive.add_argument("path", help="アーカイブのディレクトリ")
+    archive.add_argument(
+        "--utterances", type=int, nargs="+", help="対象の発話の番号（省略時は全て）"
+    )
+    archive.add_argument(
+        "--redecode", action="store_true", help="保存した音声を認識し直す"
+    )
+    archive.add_argument("--model", default="model", help="認識し直す際のモデルのパス")
+    archive.add_argument("--words", help="認識対象のワードを1行1語で記載したファイル")
+    archive.add_argument(
+        "--output", "-o", default="-", help="JSONLの出力先（-は標準出力）"
+    )
+
+    serve = sub.add_parser(
+        "serve",
+        help="1つのモデルを共有するローカルの認識サーバを起動する（raw PCMを受け取りJSONLで結果を返す）",
+    )
+    serve.add_argument("--model", default="model", help="モデルのパス")
+    serve.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    serve.add_argument("--port", type=int, default=2700, help="待ち受けるポート")
+    serve.add_argument(
+        "--unix", help="TCPの代わりに待ち受けるUnixドメインソケットのパス"
+    )
+    serve.add_argument(
+        "--max-connections", type=int, default=8, help="同時に認識する最大接続数"
+    )
+    serve.add_argument(
+        "--max-pending-blocks",
+        type=int,
+        default=8,
+        help="接続毎に認識待ちで保持する最大ブロック数（超えると受信を止める）",
+    )
+
+    loadtest = sub.add_parser(
+        "loadtest",
+        help="ファイルを複数の接続から同時に流して認識サーバの負荷試験を行う",
+    )
+    loadtest.add_argument("files", nargs="+", help="流すWAV/raw PCMファイル")
+    loadtest.add_argument(
+        "--model",
+        help="指定した場合は同じプロセス内でサーバを起動し、ループバックで試験する",
+    )
+    loadtest.add_argument("--host", default="127.0.0.1", help="サーバのアドレス")
+    loadtest.add_argument("--port", type=int, default=2700, help="サーバのポート")
+    loadtest.add_argument("--unix", help="サーバのUnixドメインソケットのパス")
+    loadtest.add_argument("--connections", type=int, default=4, help="同時接続数")
+    loadtest.add_argument(
+        "--repeat", type=int, default=1, help="filesを繰り返し流す回数"
+    )
+    loadtest.add_argument("--words", help="認識対象のワードを1行1語で記載したファイル")
+    loadtest.add_argument(
+        "--fast", action="store_true", help="実時間を待たずに可能な限り速く流す"
+    )
+    loadtest.add_argument(
+        "--raw-rate", type=int, default=16000, help="raw PCMのサンプリングレート"
+    )
+    loadtest.add_argument(
+        "--output", "-o", default="-", help="集計結果のJSONの出力先（-は標準出力）"
+    )
+
+    transcribe = sub.add_parser(
+        "transcribe", help="GUIを起動せずにWAV/raw PCMファイルを認識する"
+    )
+    transcribe.add_argument("files", nargs="+", help="対象のWAV/raw PCMファイル")
+    transcribe.add_argument("--model", default="model", help="モデルのパス")
+    transcribe.add_argument(
+        "--output", "-o", default="-", help="JSONLの出力先（-は標準出力）"
+    )
+    transcribe.add_argument(
+        "--words", help="認識対象のワードを1行1語で記載したファイル"
+    )
+    transcribe.add_argument(
+        "--chunk-samples",
+        type=int,
+        default=DEFAULT_CHUNK_SAMPLES,
+        help="1回に認識器へ渡すサンプル数",
+    )
+    transcribe.add_argument(
+        "--raw-rate", type=int, default=16000, help="raw PCMのサンプリングレート"
+    )
+    transcribe.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="ワーカープロセス数（0の場合はCPUコア数、1の場合は単一プロセス）",
+    )
+    transcribe.add_argument(
+        "--max-pending", type=int, help="同時に投入する最大ファイル数"
+    )
+    transcribe.add_argument(
+        "--unordered", action="store_true", help="完了した順に結果を書き出す"
+    )
+    transcribe.add_argument(
+        "--word-timings", action="store_true", help="結果に単語毎の時刻を含める"
+    )
+    transcribe.add_argument(
+        "--export-words",
+        help="単語毎の時刻を全ファイル分まとめて書き出す先（.npz/.jsonl、JSONLの結果からは除く）",
+    )
+    return parser.parse_args(argv)
+
+
+def read_word_list(path: Optional[str]) -> List[str]:
+    """ワードリストファイルを読み込む。
+
+    Args:
+        path (Optional[str]): 対象のファイルパス
+
+    Returns:
+        List[str]: ワードリスト（重複と空行は除く）
+    """
+    if path is None:
+        return []
+    with open(path, "r") as f:
+        return list(dict.fromkeys(l.strip() for l in f if l.strip() != ""))
+
+
+def read_kws_thresholds(path: Optional[str]) -> Optional[Dict[str, float]]:
+    """キーワード毎の閾値のファイルを読み込む。
+
+    Args:
+        path (Optional[str]): 対象のファイルパス
+
+    Returns:
+        Optional[Dict[str, float]]: キーワード毎の閾値（ファイルを指定しない場合はNone）
+    """
+    if path is None:
+        return None
+    from vosk_example_gui.spotter import read_thresholds
+
+    return read_thresholds(path)
+
+
+def read_grammars(paths: Optional[List[str]]) -> Optional[List[Tuple[str, List[str]]]]:
+    """並行して認識する文法のワードリストファイルを読み込む。
+
+    Args:
+        paths (Optional[List[str]]): 対象のファイルパスのリスト
+
+    Returns:
+        Optional[List[Tuple[str, List[str]]]]: (文法の名前, ワードリスト)のリスト（ファイルを指定しない場合はNone）
+    """
+    if paths is None:
+        return None
+    return [
+        (os.path.splitext(os.path.basename(path))[0], read_word_list(path))
+        for path in paths
+    ]
+
+
+def transcribe(args: argparse.Namespace) -> None:
+    """ヘッドレスでファイルを認識する。
+
+    Args:
+        args (argparse.Namespace): transcribeサブコマンドの引数
+    """
+    from vosk_example_gui.batch import BatchTranscriber
+    from vosk_example_gui.pool import TranscribePool
+    from vosk_example_gui.word_timing import WordTimeline
+
+    if args.export_words is not None and not args.export_words.endswith(
+        (".npz", ".jsonl")
+    ):
+        # 全ファイルの認識を終えてから書き出すため、形式は先に確かめる
+        raise ValueError(f"unsupported format. {args.export_words}")
+    word_list = read_word_list(args.words)
+    timeline = WordTimeline() if args.export_words is not None else None
+    word_timings = args.word_timings or timeline is not None
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.workers == 1:
+            transcriber = BatchTranscriber(
+                args.model,
+                word_list,
+                chunk_samples=args.chunk_samples,
+                raw_sampling_rate=args.raw_rate,
+                word_timings=word_timings,
+            )
+            transcriber.run(args.files, out, timeline)
+        else:
+            with TranscribePool(
+                args.model,
+                word_list,
+                workers=args.workers if args.workers > 0 else None,
+                max_pending=args.max_pending,
+                chunk_samples=args.chunk_samples,
+                raw_sampling_rate=args.raw_rate,
+                word_timings=word_timings,
+            ) as pool:
+                pool.run(args.files, out, ordered=not args.unordered, timeline=timeline)
+        if timeline is not None:
+            timeline.export(args.export_words)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def listen(args: argparse.Namespace) -> None:
+    """ヘッドレスでマイク・ファイルを実時間で認識する。（AsyncCoreのフロントエンドをJSONL出力に差し替える）
+
+    Args:
+        args (argparse.Namespace): listenサブコマンドの引数
+    """
+    from vosk_example_gui.archive import SessionWriter
+    from vosk_example_gui.core import AsyncCore, JsonlConsumer
+    from vosk_example_gui.fanout import FanoutClient
+    from vosk_example_gui.replay import ReplaySource
+    from vosk_example_gui.resampler import Resampler
+    from vosk_example_gui.source import AudioSource
+    from vosk_example_gui.spotter import KeywordSpotter
+    from vosk_example_gui.vad import VoiceActivityGate
+    from vosk_example_gui.vosk_client import VoskClient, get_model_sampling_rate
+
+    source_config = {
+        "block_size": args.block_size,
+        "block_ms": args.block_ms,
+        "channels": args.channels,
+    }
+    source: AudioSource
+    if args.replay is not None:
+        source = ReplaySource(
+            args.replay, realtime=not args.replay_fast, **source_config
+        )
+    else:
+        from vosk_example_gui.audio import Audio
+
+        source = Audio(**source_config)
+    source.start_streaming()
+
+    rate = get_model_sampling_rate(args.model) or source.get_sampling_rate()
+    vosk = VoskClient(
+        track_partial_conf=False, word_timings=args.word_timings or args.kws
+    )
+    word_list = read_word_list(args.words)
+    vosk.initialize_model(word_list, rate, args.model)
+    grammars = read_grammars(args.grammars)
+    fanout = None
+    if grammars is not None:
+        # 主の認識器がワードリストなしの場合、同じ文法の認識器は加えない
+        fanout = FanoutClient(grammars, args.fanout_workers, free=len(word_list) > 0)
+        fanout.initialize_model(rate, args.model)
+
+    name = args.replay if args.replay is not None else "microphone"
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    # 出力先のパイプが閉じられた場合も、入力の終了と同様に停止する
+    stopped = threading.Event()
+    consumer = JsonlConsumer(out, [name], partial=args.partial, on_closed=stopped.set)
+    core = AsyncCore(workers=1, partial=args.partial)
+    core.add_consumer(consumer)
+    session = core.add_session(name, source, vosk)
+    if source.get_sampling_rate() != rate or source.channels != 1:
+        session.worker.set_resampler(
+            Resampler(source.get_sampling_rate(), rate, source.channels)
+        )
+    if args.vad:
+        session.worker.set_gate(
+            VoiceActivityGate(
+                rate,
+                threshold_db=args.vad_threshold_db,
+                pre_roll_ms=args.vad_pre_roll_ms,
+            )
+        )
+    if args.kws:
+        session.worker.set_spotter(
+            KeywordSpotter(
+                word_list, args.kws_threshold, read_kws_thresholds(args.kws_thresholds)
+            )
+        )
+    if fanout is not None:
+        session.worker.set_fanout(fanout)
+    archive = None
+    if args.archive is not None:
+        archive = SessionWriter(args.archive, rate)
+        session.worker.set_archive(archive)
+    core.start()
     try:
-        app = App()
+        while not stopped.wait(0.1):
+            if isinstance(source, ReplaySource) and source.finished.is_set():
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.stop()
+        # 停止までに届いていたブロックと、発話途中の結果を確定させる
+        core.stop(drain=True)
+        recognized = vosk.flush()
+        if recognized is not None:
+            consumer.on_result(0, recognized)
+        if fanout is not None:
+            for grammar_recognized in fanout.flush():
+                consumer.on_result(0, grammar_recognized)
+            fanout.close()
+        if archive is not None:
+            if recognized is not None:
+                archive.add_result(recognized)
+            archive.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+def show_archive(args: argparse.Namespace) -> None:
+    """アーカイブの発話をJSONLで出力する。
+
+    Args:
+        args (argparse.Namespace): archiveサブコマンドの引数
+    """
+    from vosk_example_gui.archive import SessionArchive
+    from vosk_example_gui.vosk_client import VoskClient
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        with SessionArchive(args.path) as archive:
+            vosk = None
+            if args.redecode:
+                vosk = VoskClient()
+                vosk.initialize_model(
+                    read_word_list(args.words), archive.sampling_rate, args.model
+                )
+            indices = args.utterances if args.utterances else range(len(archive))
+            for i in indices:
+                utterance = archive[i]
+                record = {
+                    "index": utterance.index,
+                    "start_time": utterance.start_time,
+                    "end_time": utterance.end_time,
+                    "duration": (utterance.end - utterance.start)
+                    / archive.sampling_rate,
+                    **utterance.result,
+                }
+                if vosk is not None:
+                    record["redecoded"] = archive.redecode(i, vosk)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def serve(args: argparse.Namespace) -> None:
+    """認識サーバを起動する。
+
+    Args:
+        args (argparse.Namespace): serveサブコマンドの引数
+    """
+    from vosk_example_gui.server import RecognitionServer
+
+    server = RecognitionServer(
+        args.model,
+        host=args.host,
+        port=args.port,
+        unix_path=args.unix,
+        max_connections=args.max_connections,
+        workers=args.recognize_workers,
+        block_ms=args.block_ms if args.block_ms is not None else 100.0,
+        max_pending_blocks=args.max_pending_blocks,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def loadtest(args: argparse.Namespace) -> None:
+    """認識サーバの負荷試験を行い、集計結果をJSONで出力する。
+
+    Args:
+        args (argparse.Namespace): loadtestサブコマンドの引数
+    """
+    from vosk_example_gui.loadtest import run_load_test, run_loopback
+
+    files = args.files * args.repeat
+    options = {
+        "connections": args.connections,
+        "block_ms": args.block_ms if args.block_ms is not None else 100.0,
+        "realtime": not args.fast,
+        "partial": args.partial,
+        "raw_sampling_rate": args.raw_rate,
+    }
+    words = read_word_list(args.words)
+    if args.model is not None:
+        summary = asyncio.run(
+            run_loopback(
+                args.model,
+                files,
+                words,
+                max_connections=args.connections,
+                workers=args.recognize_workers,
+                **options,
+            )
+        )
+    else:
+        address = (args.unix,) if args.unix is not None else (args.host, args.port)
+        summary = asyncio.run(run_load_test(address, files, words, **options))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        json.dump(summary, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    started_at = _STARTED_AT
+    args = parse_args(argv)
+    try:
+        if args.command == "transcribe":
+            transcribe(args)
+            return
+        if args.command == "listen":
+            listen(args)
+            return
+        if args.command == "archive":
+            show_archive(args)
+            return
+        if args.command == "serve":
+            serve(args)
+            return
+        if args.command == "loadtest":
+            loadtest(args)
+            return
+
+        # モジュールの先頭では標準ライブラリと設定・計測値のみをimportし、
+        # GUI関連のモジュール（PySimpleGUI, numpy等）はここで初めてimportする
+        from vosk_example_gui.app import App
+
+        import_ms = (time.perf_counter() - started_at) * 1000
+        registry.set_gauge("startup.import_ms", import_ms)
+        root.info(f"import: {import_ms:.0f}ms")
+        app = App(
+            block_size=args.block_size,
+            block_ms=args.block_ms,
+            timeout=args.timeout,
+            show_partial=args.partial,
+            channels=args.channels,
+            vad=args.vad,
+            vad_threshold_db=args.vad_threshold_db,
+            vad_pre_roll_ms=args.vad_pre_roll_ms,
+            devices=args.devices,
+            recognize_workers=args.recognize_workers,
+            replay=args.replay,
+            replay_realtime=not args.replay_fast,
+            record=args.record,
+            metrics_interval=args.metrics_interval,
+            metrics_json=args.metrics_json,
+            core=args.core,
+            started_at=started_at,
+            archive=args.archive,
+            kws=args.kws,
+            kws_threshold=args.kws_threshold,
+            kws_thresholds=read_kws_thresholds(args.kws_thresholds),
+            grammars=read_grammars(args.grammars),
+            fanout_workers=args.fanout_workers,
+        )
         root.info("app start")
         app.run()
     except Exception as e:
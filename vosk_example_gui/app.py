@@ -1,13 +1,25 @@
 import logging
 import os
 import sys
+import threading
+import time
 import traceback
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-import numpy as np
-from vosk_example_gui.audio import Audio
-from vosk_example_gui.view import Event, Viwer
-from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.archive import SessionWriter
+from vosk_example_gui.config import BLOCK_SIZE
+from vosk_example_gui.core import AsyncCore
+from vosk_example_gui.fanout import FREE_GRAMMAR, FanoutClient
+from vosk_example_gui.metrics import registry
+from vosk_example_gui.replay import Recorder, ReplaySource
+from vosk_example_gui.resampler import Resampler
+from vosk_example_gui.session import Session, SessionManager
+from vosk_example_gui.source import AudioSource
+from vosk_example_gui.spotter import KeywordHit, KeywordSpotter
+from vosk_example_gui.vad import VoiceActivityGate
+from vosk_example_gui.view import Event, ViewerConsumer, Viwer
+from vosk_example_gui.vosk_client import VoskClient, get_model_sampling_rate
+from vosk_example_gui.word_store import WordStore, iter_word_file
 
 
 def get_path() -> str:
@@ -23,14 +35,91 @@ def get_path() -> str:
 
 
 class App:
-    def __init__(self) -> None:
-        """Initialize"""
+    def __init__(
+        self,
+        block_size: int = BLOCK_SIZE,
+        block_ms: Optional[float] = None,
+        timeout: int = 10,
+        show_partial: bool = False,
+        channels: int = 1,
+        vad: bool = False,
+        vad_threshold_db: float = 12.0,
+        vad_pre_roll_ms: float = 300.0,
+        devices: Optional[List[str]] = None,
+        recognize_workers: Optional[int] = None,
+        replay: Optional[str] = None,
+        replay_realtime: bool = True,
+        record: Optional[str] = None,
+        metrics_interval: float = 5.0,
+        metrics_json: Optional[str] = None,
+        core: str = "asyncio",
+        started_at: Optional[float] = None,
+        archive: Optional[str] = None,
+        kws: bool = False,
+        kws_threshold: float = 0.7,
+        kws_thresholds: Optional[Dict[str, float]] = None,
+        grammars: Optional[List[Tuple[str, List[str]]]] = None,
+        fanout_workers: Optional[int] = None,
+    ) -> None:
+        """Initialize
+
+        Args:
+            block_size (int, optional): 1ブロックのサンプル数. Defaults to BLOCK_SIZE.
+            block_ms (Optional[float], optional): 1ブロックの長さ[msec]（指定した場合はblock_sizeより優先）. Defaults to None.
+            timeout (int, optional): GUIのevent loopのタイムアウト時間[msec]. Defaults to 10.
+            show_partial (bool, optional): 途中認識結果を表示するかどうか. Defaults to False.
+            channels (int, optional): 入力チャンネル数（モノラルへミックスダウンして認識する）. Defaults to 1.
+            vad (bool, optional): 無音区間を認識器へ渡さないかどうか. Defaults to False.
+            vad_threshold_db (float, optional): 推定ノイズレベルに対する発話判定の閾値[dB]. Defaults to 12.0.
+            vad_pre_roll_ms (float, optional): 発話開始時に遡って認識器へ渡す長さ[msec]. Defaults to 300.0.
+            devices (Optional[List[str]], optional): 同時に認識する追加の入力デバイス名. Defaults to None.
+            recognize_workers (Optional[int], optional): 認識処理のスレッド数（Noneの場合はCPUコア数）. Defaults to None.
+            replay (Optional[str], optional): マイクの代わりに入力とするWAV/raw PCMファイル（devicesもファイルパスとして扱う）. Defaults to None.
+            replay_realtime (bool, optional): replayを実時間の速度で流すかどうか（Falseの場合は可能な限り速く流す）. Defaults to True.
+            record (Optional[str], optional): 入力を保存するWAVファイルのパス. Defaults to None.
+            metrics_interval (float, optional): 計測値をログ出力する間隔[sec]. Defaults to 5.0.
+            metrics_json (Optional[str], optional): 計測値を定期的に書き出すJSONファイルのパス. Defaults to None.
+            core (str, optional): 認識の駆動方法（"asyncio"はイベント駆動、"threads"は従来のポーリング）. Defaults to "asyncio".
+            started_at (Optional[float], optional): 起動処理を開始した時刻（time.perf_counter、最初の操作可能なフレームまでの時間の計測に用いる）. Defaults to None.
+            archive (Optional[str], optional): 認識した音声と結果を保存するディレクトリ. Defaults to None.
+            kws (bool, optional): ワードリストをキーワードとして途中認識結果から検出するかどうか. Defaults to False.
+            kws_threshold (float, optional): キーワードの検出に必要なconfidence. Defaults to 0.7.
+            kws_thresholds (Optional[Dict[str, float]], optional): キーワード毎の閾値. Defaults to None.
+            grammars (Optional[List[Tuple[str, List[str]]]], optional): 主の入力を並行して認識する(文法の名前, ワードリスト)のリスト（ワードリストなしの認識器も加え、主のワードリストがある間のみ動かす）. Defaults to None.
+            fanout_workers (Optional[int], optional): grammarsの認識処理のスレッド数（Noneの場合は文法の数）. Defaults to None.
+        """
         self._logger = logging.getLogger("vosk_example_gui.app")
-        self.word_list: List[str] = []
+        self.word_list = WordStore()
+        self._loaded_words = 0
+        self._loaded_duplicates = 0
+        self._drawn_samples = 0
+
+        self._source_config = {
+            "block_size": block_size,
+            "block_ms": block_ms,
+            "channels": channels,
+        }
+        self._replay_realtime = replay_realtime
+        self._metrics_interval = metrics_interval
+        self._metrics_json = metrics_json
+        self._frame_time = registry.histogram("gui.frame_ms")
+        self._started_at = started_at if started_at is not None else time.perf_counter()
+        self._last_status = time.perf_counter()
+        self._last_metrics_report = self._last_status
 
         # initialize instance
-        self.audio = Audio()
-        self.vosk = VoskClient()
+        self.audio = self._create_source(replay)
+        # GUIではconfidenceを表示しないため、途中認識結果は必要な時のみ取得する
+        # （キーワード検出では確定結果の最後の単語も調べるため、単語毎の時刻を含める）
+        self.vosk = VoskClient(track_partial_conf=False, word_timings=kws)
+        self._model_path = os.path.join(get_path(), "model")
+        # 複数の文法での認識は主の入力のみを対象とし、結果は文法毎の列に並べて表示する
+        # （ワードリストなしの認識器は、主の認識器にワードリストがある間のみ動かす）
+        self._fanout = (
+            FanoutClient(grammars, fanout_workers, free=True)
+            if grammars is not None
+            else None
+        )
 
         pulldown_list = []
         pulldown_default_idx = 0
@@ -41,28 +130,147 @@ class App:
                 pulldown_default_idx = i
         self._current_audio = pulldown_list[pulldown_default_idx]
 
+        devices = devices if devices is not None else []
         self.viewer = Viwer(
-            word_list=self.word_list,
+            word_list=self.word_list.items(),
             pulldown_list=pulldown_list,
             pulldown_list_default_idx=pulldown_default_idx,
+            # asyncioの場合は描画・ステータス更新もイベントとして届くため、GUIはポーリングしない
+            timeout=None if core == "asyncio" else timeout,
+            session_names=devices,
+            grammar_names=self._fanout.names if self._fanout is not None else None,
         )
-        self.audio.start_streaming()
-        self.vosk.initialize_model(
-            self.word_list,
-            self.audio.get_sampling_rate(),
-            os.path.join(get_path(), "model"),
+        self.viewer.set_model_loading(True)
+        self._model_ready = False
+        # モデルの読み込み後に決まる（それまでは0）
+        self.recognize_rate = 0
+        self._record = record
+        self._archive_path = archive
+        self._archive: Optional[SessionWriter] = None
+        self._gate_config = (
+            {"threshold_db": vad_threshold_db, "pre_roll_ms": vad_pre_roll_ms}
+            if vad
+            else None
         )
 
+        # 認識はGUIのイベントループとは別に、全入力で共有するスレッドプール上で行う
+        self.sessions: Union[AsyncCore, SessionManager]
+        if core == "asyncio":
+            # Viwerはイベントループから結果を受け取るフロントエンドの1つとして登録する
+            self.sessions = AsyncCore(workers=recognize_workers, partial=show_partial)
+            self.sessions.add_consumer(ViewerConsumer(self.viewer))
+        else:
+            self.sessions = SessionManager(workers=recognize_workers)
+        self.session = self._add_session(
+            self._current_audio,
+            self.audio,
+            self.vosk,
+            on_result=self.viewer.post_recognized,
+            on_partial=self.viewer.post_partial if show_partial else None,
+            on_keyword=lambda hit: self.viewer.post_keyword(0, hit),
+        )
+        self.worker = self.session.worker
+
+        # 追加の入力デバイスはモデルを共有し、認識器のみを個別に持つ
+        self.extra_sessions: List[Session] = []
+        self._extra_device_ids: List[Optional[int]] = []
+        for i, name in enumerate(devices):
+            audio = self._create_source(name if replay is not None else None)
+            self._extra_device_ids.append(
+                self.input_device_config[name] if replay is None else None
+            )
+            self.extra_sessions.append(
+                self._add_session(
+                    name,
+                    audio,
+                    VoskClient(track_partial_conf=False, word_timings=kws),
+                    on_result=lambda r, i=i: self.viewer.post_session_recognized(i, r),
+                    on_keyword=lambda hit, i=i: self.viewer.post_keyword(i + 1, hit),
+                )
+            )
+        self._drawn_session_samples = [0] * len(self.extra_sessions)
+
+        # 検出済みの状態は入力毎に持つため、セッション毎に検出器を作る
+        self._spotters: List[KeywordSpotter] = []
+        if kws:
+            for session in self.sessions.sessions:
+                spotter = KeywordSpotter(
+                    self.word_list.to_list(), kws_threshold, kws_thresholds
+                )
+                session.worker.set_spotter(spotter)
+                self._spotters.append(spotter)
+
+        # モデルの読み込みは数秒～数十秒かかるため、ウィンドウを先に表示して別スレッドで行う
+        threading.Thread(
+            target=self._load_model,
+            args=(self.word_list.to_list(),),
+            name="ModelLoader",
+            daemon=True,
+        ).start()
+
+    def _load_model(self, words: List[str]) -> None:
+        """モデルを読み込み、入力と認識を開始する。（別スレッドで実行し、完了はMODEL_LOADEDで通知する）
+
+        Args:
+            words (List[str]): 認識対象のワードリスト
+        """
+        start = time.perf_counter()
+        try:
+            self.audio.start_streaming()
+            if self._record is not None:
+                self.audio.recorder = Recorder(
+                    self._record,
+                    self.audio.get_sampling_rate(),
+                    self.audio.channels,
+                    self.audio.block_size,
+                )
+            # 認識はモデル本来のサンプリングレートで行い、入力はリサンプルして合わせる
+            self.recognize_rate = (
+                get_model_sampling_rate(self._model_path)
+                or self.audio.get_sampling_rate()
+            )
+            self.vosk.initialize_model(words, self.recognize_rate, self._model_path)
+            if self._archive_path is not None:
+                self._archive = SessionWriter(self._archive_path, self.recognize_rate)
+                self.worker.set_archive(self._archive)
+            if self._fanout is not None:
+                self._fanout.initialize_model(self.recognize_rate, self._model_path)
+                self._fanout.set_active(FREE_GRAMMAR, len(words) > 0)
+                self.worker.set_fanout(self._fanout)
+            for session, dev_id in zip(self.extra_sessions, self._extra_device_ids):
+                session.audio.start_streaming(dev_id)
+                session.vosk.initialize_model(
+                    words, self.recognize_rate, self._model_path
+                )
+
+            for session in self.sessions.sessions:
+                self._update_resampler(session)
+                if self._gate_config is not None:
+                    session.worker.set_gate(
+                        VoiceActivityGate(self.recognize_rate, **self._gate_config)
+                    )
+            self.sessions.start()
+        except Exception as e:
+            self._logger.error(f"failed to load model. {e}")
+            self._logger.error(f"{traceback.format_exc()}")
+            self.viewer.post_model_loaded(f"failed to load model. {e}", 0.0)
+            return
+        self.viewer.post_model_loaded(None, (time.perf_counter() - start) * 1000)
+
     def run(self) -> None:
         """起動"""
         try:
             while True:
                 event, content = self.viewer.get_event()
-                audio_data = self.audio.get()
+                frame_start = time.perf_counter()
                 # print(event, content)
                 if event == Event.FINISH:
                     self._logger.info("close window.")
                     break
+                if event == Event.STARTED:
+                    self.report_startup()
+                if event == Event.MODEL_LOADED:
+                    self.on_model_loaded(*content)
                 if event == Event.ADD_WORD:
                     self.add_word(content)
                 if event == Event.DELETE_WORD:
@@ -73,9 +281,23 @@ class App:
                     self.change_audio_source(content)
                 if event == Event.LOAD_FILE:
                     self.load_words_from_file(content)
+                if event == Event.WORDS_LOADED:
+                    self.add_loaded_words(*content)
+                if event == Event.RECOGNIZED:
+                    self.show_recognized(content)
+                if event == Event.PARTIAL:
+                    self.viewer.update_partial_text(content)
+                if event == Event.SESSION_RECOGNIZED:
+                    index, recognized = content
+                    self.viewer.update_session_text(index, recognized["result"])
+                if event == Event.KEYWORD:
+                    self.show_keyword(*content)
 
-                self.recognize(audio_data)
-                self.update_waveform(audio_data)
+                self.update_waveform()
+                self.update_session_waveforms()
+                now = time.perf_counter()
+                self._frame_time.record((now - frame_start) * 1000)
+                self.report_metrics(now)
 
         except Exception as e:
             self._logger.error(f"{e}")
@@ -85,41 +307,163 @@ class App:
             pass
         finally:
             self._logger.info("close instance")
+            for session in self.sessions.sessions:
+                session.audio.stop()
+            self.sessions.stop()
+            if self._fanout is not None:
+                self._fanout.close()
+            if self._archive is not None:
+                self._archive.close()
+            if self.audio.recorder is not None:
+                self.audio.recorder.close()
             self.viewer.close()
-            self.audio.stop()
 
-    def recognize(self, audio_data: Optional[bytes]) -> None:
-        """voskによる音声認識を行い、認識結果をGUIに反映する。
+    def report_startup(self) -> None:
+        """起動から最初の操作可能なフレームまでの時間を記録する。"""
+        first_frame_ms = (time.perf_counter() - self._started_at) * 1000
+        registry.set_gauge("startup.first_frame_ms", first_frame_ms)
+        self._logger.info(f"first interactive frame: {first_frame_ms:.0f}ms")
+
+    def on_model_loaded(self, error: Optional[str], elapsed_ms: float) -> None:
+        """モデルの読み込み完了をGUIに反映する。
 
         Args:
-            audio_data (Optional[bytes]): マイクからの入力信号
+            error (Optional[str]): 読み込みに失敗した場合のエラー内容
+            elapsed_ms (float): 読み込みにかかった時間[msec]
         """
-        if audio_data is None:
+        if error is not None:
+            self.viewer.update_status(error)
+            self.viewer.show_error_popup(error)
             return
-        recognized = self.vosk.recognize(audio_data)
-        if recognized is None:
+        self._model_ready = True
+        self._last_status = time.perf_counter()
+        registry.set_gauge("startup.model_load_ms", elapsed_ms)
+        self._logger.info(f"model loaded: {elapsed_ms:.0f}ms")
+        self.viewer.set_model_loading(False)
+        self.viewer.update_status(f"model loaded in {elapsed_ms / 1000:.1f}s")
+
+    def _add_session(
+        self,
+        name: str,
+        audio: AudioSource,
+        vosk: VoskClient,
+        on_result: Callable[[Dict], None],
+        on_partial: Optional[Callable[[str], None]] = None,
+        on_keyword: Optional[Callable[[KeywordHit], None]] = None,
+    ) -> Session:
+        """認識セッションを追加する。
+
+        Args:
+            name (str): セッション名（入力デバイス名）
+            audio (AudioSource): 入力元のAudioSourceインスタンス
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス
+            on_result (Callable[[Dict], None]): 認識結果を受け取るコールバック（threadsの場合のみ利用）
+            on_partial (Optional[Callable[[str], None]], optional): 途中認識結果を受け取るコールバック（threadsの場合のみ利用）. Defaults to None.
+            on_keyword (Optional[Callable[[KeywordHit], None]], optional): キーワードの検出結果を受け取るコールバック（threadsの場合のみ利用）. Defaults to None.
+
+        Returns:
+            Session: 追加したセッション
+        """
+        if isinstance(self.sessions, AsyncCore):
+            return self.sessions.add_session(name, audio, vosk)
+        return self.sessions.add_session(
+            name,
+            audio,
+            vosk,
+            on_result=on_result,
+            on_partial=on_partial,
+            on_keyword=on_keyword,
+        )
+
+    def report_metrics(self, now: float) -> None:
+        """計測値をステータスバーへ表示し、一定間隔でログ・JSONへ出力する。
+
+        Args:
+            now (float): 現在時刻（time.perf_counter）
+        """
+        if not self._model_ready or now - self._last_status < 1.0:
+            return
+        self._last_status = now
+        snapshot = registry.snapshot()
+        histograms = snapshot["histograms"]
+        name = self.session.name
+
+        def p(key: str, q: str) -> float:
+            return histograms.get(key, {}).get(q, 0.0)
+
+        self.viewer.update_status(
+            f"queue {p(f'{name}.queue_delay_ms', 'p95'):.0f}ms "
+            f"(depth {p(f'{name}.queue_depth', 'max'):.0f}) | "
+            f"recognize {p(f'{name}.recognize_ms', 'p95'):.0f}ms "
+            f"RTF {snapshot['gauges'].get(f'{name}.rtf', 0.0):.2f} | "
+            f"final {p(f'{name}.final_latency_ms', 'p50'):.0f}/"
+            f"{p(f'{name}.final_latency_ms', 'p95'):.0f}ms | "
+            f"frame {p('gui.frame_ms', 'p95'):.1f}ms"
+        )
+
+        if now - self._last_metrics_report < self._metrics_interval:
+            return
+        self._last_metrics_report = now
+        self._logger.info(
+            "metrics (p50/p95/max): "
+            + ", ".join(
+                f"{k}: {v['p50']:.1f}/{v['p95']:.1f}/{v['max']:.1f}"
+                for k, v in histograms.items()
+            )
+        )
+        if self._metrics_json is not None:
+            try:
+                registry.dump_json(self._metrics_json)
+            except OSError as e:
+                self._logger.error(f"failed to write metrics: {e}")
+
+    def show_recognized(self, recognized: Dict) -> None:
+        """認識ワーカーから届いた認識結果をGUIに反映する。
+
+        Args:
+            recognized (Dict): VoskClient.recognizeの結果（FanoutClientの結果は"grammar"を含む）
+        """
+        grammar = recognized.get("grammar")
+        if grammar is not None and self._fanout is not None:
+            index = self._fanout.names.index(grammar)
+            self.viewer.update_grammar_text(index, recognized["result"])
             return
         self.viewer.update_text(recognized["result"])
 
+    def show_keyword(self, index: int, hit: KeywordHit) -> None:
+        """認識ワーカーから届いたキーワードの検出結果をステータスバーに表示する。
+
+        Args:
+            index (int): セッション番号（0が主の入力）
+            hit (KeywordHit): 検出結果
+        """
+        name = self.sessions.sessions[index].name
+        self.viewer.update_status(
+            f"keyword [{name}]: {hit.keyword} "
+            f"(conf {hit.conf:.2f}, {hit.latency_ms:.0f}ms after onset)"
+        )
+        # 計測値の表示で直ちに上書きされないようにする
+        self._last_status = time.perf_counter()
+
     def add_word(self, word: str) -> None:
         """GUIで入力されたワードをword_listに追加する。（重複は弾く）
 
         Args:
             word (str): 入力ワード
         """
-        if word not in self.word_list:
-            self.word_list.append(word)
-            self.viewer.update_table(self.word_list)
+        word_id = self.word_list.add(word)
+        if word_id >= 0:
+            self.viewer.append_table_rows([(word_id, word.strip())])
 
-    def delete_word(self, target_word_idx_list: List) -> None:
+    def delete_word(self, target_word_id_list: List[int]) -> None:
         """GUIで選択されたワードをword_listから削除する。
 
         Args:
-            target_word_idx_list (List): 削除対象のワードのインデックスリスト
+            target_word_id_list (List[int]): 削除対象のワードのIDリスト
         """
-        for i in sorted(target_word_idx_list, reverse=True):
-            self.word_list.pop(i)
-        self.viewer.update_table(self.word_list)
+        for word_id in target_word_id_list:
+            self.word_list.remove(word_id)
+        self.viewer.delete_table_rows(target_word_id_list)
 
     def change_audio_source(self, audio_source: str) -> None:
         """入力ソースを変更する。
@@ -132,72 +476,171 @@ class App:
 
         self._current_audio = audio_source
         self.audio.start_streaming(self.input_device_config[self._current_audio])
+        recorder = self.audio.recorder
+        if recorder is not None and (
+            recorder.sampling_rate != self.audio.get_sampling_rate()
+            or recorder.channels != self.audio.channels
+        ):
+            self._logger.warning("input format changed. stop recording.")
+            self.audio.recorder = None
+            recorder.close()
+        self._update_resampler(self.session)
+
+    def _create_source(self, replay: Optional[str]) -> AudioSource:
+        """入力ソースを作成する。
+
+        Args:
+            replay (Optional[str]): 再生するファイルのパス（Noneの場合はマイク入力）
+
+        Returns:
+            AudioSource: 入力ソース
+        """
+        if replay is not None:
+            return ReplaySource(
+                replay, realtime=self._replay_realtime, **self._source_config
+            )
+        # サウンドデバイスのない環境でもreplayを利用できるよう、必要な場合のみimportする
+        from vosk_example_gui.audio import Audio
+
+        return Audio(**self._source_config)
+
+    def _update_resampler(self, session: Session) -> None:
+        """入力デバイスのサンプリングレート・チャンネル数に合わせてリサンプラを作り直す。
+
+        Args:
+            session (Session): 対象のセッション
+        """
+        audio = session.audio
+        input_rate = audio.get_sampling_rate()
+        if input_rate == self.recognize_rate and audio.channels == 1:
+            session.worker.set_resampler(None)
+            return
+        self._logger.info(
+            f"[{session.name}] resample {input_rate}Hz x{audio.channels}ch "
+            f"to {self.recognize_rate}Hz mono"
+        )
+        session.worker.set_resampler(
+            Resampler(input_rate, self.recognize_rate, audio.channels)
+        )
 
     def load_words_from_file(self, file_path: str) -> None:
-        """ファイル内の単語をword_listに追加する。（重複は弾く）
+        """ファイル内の単語を別スレッドで読み込み始める。（結果はadd_loaded_wordsで反映する）
+
+        Args:
+            file_path (str): 対象のファイルパス
+        """
+        self._loaded_words = 0
+        self._loaded_duplicates = 0
+        self.viewer.update_load_status("loading...")
+        threading.Thread(
+            target=self._read_word_file,
+            args=(file_path,),
+            name="WordFileLoader",
+            daemon=True,
+        ).start()
+
+    def _read_word_file(self, file_path: str) -> None:
+        """ファイルを少しずつ読み込み、GUIのイベントキューへ渡す。（別スレッドで実行する）
 
         Args:
             file_path (str): 対象のファイルパス
         """
         try:
-            with open(file_path, "r") as f:
-                lines = f.readlines()
-                for l in lines:
-                    l = l.strip()
-                    if l == "": continue
-                    if l in self.word_list: continue
-                    self.word_list.append(l)
-            self.viewer.update_table(self.word_list)
+            for words, progress in iter_word_file(file_path):
+                self.viewer.post_words_loaded(words, progress)
         except IOError as e:
             self._logger.error(f"IO Error. {e}")
-            self.viewer.show_error_popup(f"IO Error. {e}")
+            self.viewer.post_words_loaded([], 1.0, f"IO Error. {e}")
         except Exception as e:
             self._logger.error(f"{e}")
-            self.viewer.show_error_popup(f"FILE Error. {e}")
+            self.viewer.post_words_loaded([], 1.0, f"FILE Error. {e}")
 
-    def update_waveform(self, audio_data: Optional[bytes]) -> None:
-        """入力信号をGUI上のグラフに反映する。
+    def add_loaded_words(
+        self, words: List[str], progress: float, error: Optional[str]
+    ) -> None:
+        """ファイルから読み込んだワードをword_listとテーブルに追加する。（重複は弾く）
 
         Args:
-            audio_data (Optional[bytes]): マイクからの入力信号
+            words (List[str]): 読み込んだワード
+            progress (float): 読み込んだ割合（1.0で完了）
+            error (Optional[str]): 読み込みに失敗した場合のエラー内容
         """
-        if audio_data is None:
+        if error is not None:
+            self.viewer.update_load_status("")
+            self.viewer.show_error_popup(error)
             return
-        decode_wave = np.frombuffer(audio_data, dtype="int16") / 32767.0
-        self.viewer.update_waveform(decode_wave)
+        added = self.word_list.add_many(words)
+        self.viewer.append_table_rows(added)
+        self._loaded_words += len(added)
+        self._loaded_duplicates += len(words) - len(added)
+        if progress < 1.0:
+            self.viewer.update_load_status(f"loading... {progress * 100:.0f}%")
+        else:
+            self._logger.info(
+                f"loaded {self._loaded_words} words "
+                f"({self._loaded_duplicates} duplicates skipped)"
+            )
+            self.viewer.update_load_status(f"loaded {self._loaded_words} words")
+
+    def update_waveform(self) -> None:
+        """直近の入力信号の履歴をGUI上のグラフに反映する。"""
+        history = self.audio.history
+        if history is None or history.written == self._drawn_samples:
+            self.viewer.refresh_waveform()
+            return
+        self._drawn_samples = history.written
+        self.viewer.update_waveform(history.view())
+
+    def update_session_waveforms(self) -> None:
+        """追加の入力デバイスの入力信号の履歴をGUI上のグラフに反映する。"""
+        for i, session in enumerate(self.extra_sessions):
+            history = session.audio.history
+            if history is None or history.written == self._drawn_session_samples[i]:
+                self.viewer.refresh_session_waveform(i)
+                continue
+            self._drawn_session_samples[i] = history.written
+            self.viewer.update_session_waveform(i, history.view())
 
     def initialize_vosk(self) -> None:
-        """vosk_clientを初期化する。"""
-        self.audio.stop()
-        self.vosk.initialize_model(
-            self.word_list,
-            self.audio.get_sampling_rate(),
-            os.path.join(get_path(), "model"),
-        )
-        self.audio.start()
+        """vosk_clientの認識器を切り替える。
 
-    def _initialize_instance(self) -> None:
-        """利用インスタンスを初期化する。"""
-        self.audio = Audio()
-        self.vosk = VoskClient()
+        音声入力は止めずに、新しい認識器をバックグラウンドで作成し、発話の区切りで切り替える。
+        """
+        # 切り替えの間にキューで破棄されたブロックと、デバイスの取りこぼしを別々に数える
+        overflow_count = self.audio.overflow_count
+        queue = self.audio.q
+        queue_dropped = queue.dropped if queue is not None else 0
 
-        pulldown_list = []
-        pulldown_default_idx = 0
-        self.input_device_config, default_device_idx = self.audio.get_input_devices()
-        for i, (dev_name, dev_id) in enumerate(self.input_device_config.items()):
-            pulldown_list.append(dev_name)
-            if dev_id == default_device_idx:
-                pulldown_default_idx = i
-        self._current_audio = pulldown_list[pulldown_default_idx]
+        def on_swapped(report: Dict) -> None:
+            current = self.audio.q
+            dropped = 0
+            if current is not None:
+                dropped = current.dropped - (queue_dropped if current is queue else 0)
+            overflows = self.audio.overflow_count - overflow_count
+            self._logger.info(
+                f"grammar switch-over: {report['switch_sec'] * 1000:.1f}ms, "
+                f"dropped blocks: {dropped}, input overflows: {overflows}"
+            )
 
-        self.viewer = Viwer(
-            word_list=self.word_list,
-            pulldown_list=pulldown_list,
-            pulldown_list_default_idx=pulldown_default_idx,
-        )
-        self.audio.start_streaming()
-        self.vosk.initialize_model(
-            self.word_list,
-            self.audio.get_sampling_rate(),
-            os.path.join(get_path(), "model"),
-        )
+        for spotter in self._spotters:
+            spotter.set_keywords(self.word_list.to_list())
+        if self._fanout is not None:
+            # 主の認識器がワードリストなしになる場合は、同じ文法の認識器を止める
+            constrained = len(self.word_list.to_list()) > 0
+            self._fanout.set_active(FREE_GRAMMAR, constrained)
+            if not constrained:
+                index = self._fanout.names.index(FREE_GRAMMAR)
+                self.viewer.update_grammar_text(index, "")
+        threading.Thread(
+            target=self.vosk.prepare_recognizer,
+            args=(self.word_list.to_list(), self.recognize_rate, on_swapped),
+            name="PrepareRecognizer",
+            daemon=True,
+        ).start()
+        for session in self.extra_sessions:
+            threading.Thread(
+                target=session.vosk.prepare_recognizer,
+                args=(self.word_list.to_list(), self.recognize_rate),
+                name="PrepareRecognizer",
+                daemon=True,
+            ).start()
@@ -0,0 +1,388 @@
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from vosk_example_gui.pcm import SAMPLE_WIDTH
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.word_timing import json_default
+
+META_FILE: str = "meta.json"
+INDEX_FILE: str = "index.bin"
+RESULTS_FILE: str = "results.jsonl"
+SEGMENT_SUFFIX: str = ".pcm"
+
+# 発話1件の索引（開始・終了サンプル位置, 開始・終了時刻[UNIX時間], results.jsonl内のオフセット・長さ）
+INDEX_RECORD = struct.Struct("<qqddqi")
+INDEX_DTYPE = np.dtype(
+    [
+        ("start", "<i8"),
+        ("end", "<i8"),
+        ("start_time", "<f8"),
+        ("end_time", "<f8"),
+        ("result_offset", "<i8"),
+        ("result_length", "<i4"),
+    ]
+)
+
+
+def _segment_name(number: int) -> str:
+    return f"{number:06d}{SEGMENT_SUFFIX}"
+
+
+def _list_segments(path: str) -> List[str]:
+    """アーカイブ内のセグメントファイルを番号順に返す。
+
+    Args:
+        path (str): アーカイブのディレクトリ
+
+    Returns:
+        List[str]: セグメントファイルのパスのリスト
+    """
+    names = sorted(n for n in os.listdir(path) if n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(path, n) for n in names]
+
+
+class SessionWriter:
+    def __init__(
+        self, path: str, sampling_rate: int, segment_sec: float = 600.0
+    ) -> None:
+        """Initialize
+
+        認識器へ渡した音声（モノラル16bit PCM）と認識結果をディレクトリへ追記する。
+        音声は事前に確保したセグメントファイルへmmap経由で書き込み、発話毎の位置と結果は
+        固定長の索引（index.bin）と結果の本体（results.jsonl）に追記する。
+        既存のアーカイブを指定した場合は、新しいセグメントから続けて追記する。
+
+        Args:
+            path (str): アーカイブのディレクトリ
+            sampling_rate (int): サンプリングレート
+            segment_sec (float, optional): 1セグメントファイルの長さ[sec]. Defaults to 600.0.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.archive")
+        self.path = path
+        self.sampling_rate = sampling_rate
+        self._segment_bytes = max(1, int(sampling_rate * segment_sec)) * SAMPLE_WIDTH
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["sampling_rate"] != sampling_rate:
+                raise ValueError(
+                    f"{path} is archived at {meta['sampling_rate']}Hz, "
+                    f"not {sampling_rate}Hz."
+                )
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"sampling_rate": sampling_rate, "sample_width": SAMPLE_WIDTH}, f
+                )
+
+        # 既存のセグメントの後ろに続ける（位置はアーカイブ全体での通しのバイト数）
+        segments = _list_segments(path)
+        self._segment_number = len(segments)
+        self._written = sum(os.path.getsize(p) for p in segments)
+        self._file: Optional[Any] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._pos = 0
+
+        index_path = os.path.join(path, INDEX_FILE)
+        self._index = open(index_path, "ab")
+        # 前回異常終了した場合は書き込み途中のレコードを捨て、以降のレコードの位置を揃える
+        size = os.path.getsize(index_path)
+        self._index.truncate(size - size % INDEX_RECORD.size)
+        self._results = open(os.path.join(path, RESULTS_FILE), "ab")
+        self._utterance_start = self._written
+        self._utterance_start_time = 0.0
+        self._closed = False
+
+    @property
+    def samples(self) -> int:
+        """アーカイブ全体で書き込んだサンプル数"""
+        return self._written // SAMPLE_WIDTH
+
+    def write(self, data: Any) -> None:
+        """音声を追記する。
+
+        Args:
+            data (Any): int16 PCM（バッファプロトコルに対応したもの）
+        """
+        view = memoryview(data).cast("B")
+        if len(view) > 0 and self._written == self._utterance_start:
+            self._utterance_start_time = time.time()
+        while len(view) > 0:
+            if self._mm is None or self._pos == self._segment_bytes:
+                self._open_segment()
+            mm = self._mm
+            assert mm is not None
+            n = min(len(view), self._segment_bytes - self._pos)
+            mm[self._pos : self._pos + n] = view[:n]
+            self._pos += n
+            self._written += n
+            view = view[n:]
+
+    def add_result(self, recognized: Dict) -> None:
+        """前回の結果以降に書き込んだ音声を1発話として、認識結果を索引へ追記する。
+
+        結果が空の場合は索引に追加せず、区切りの位置のみ進める。
+
+        Args:
+            recognized (Dict): VoskClient.recognizeの結果
+        """
+        start = self._utterance_start
+        self._utterance_start = self._written
+        if recognized.get("result", "") == "" or start == self._written:
+            return
+        text = json.dumps(recognized, ensure_ascii=False, default=json_default)
+        line = text.encode("utf-8") + b"\n"
+        offset = self._results.tell()
+        self._results.write(line)
+        self._results.flush()
+        # 結果の本体を書き込んでから索引を追記する（索引が指す先は常に存在する）
+        self._index.write(
+            INDEX_RECORD.pack(
+                start // SAMPLE_WIDTH,
+                self._written // SAMPLE_WIDTH,
+                self._utterance_start_time,
+                time.time(),
+                offset,
+                len(line),
+            )
+        )
+        self._index.flush()
+
+    def close(self) -> None:
+        """書き込み中のセグメントを未使用部分を切り詰めて閉じる。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._close_segment(truncate=True)
+        self._index.close()
+        self._results.close()
+        self._logger.info(
+            f"archived {self.samples / self.sampling_rate:.1f}s to {self.path}"
+        )
+
+    def _open_segment(self) -> None:
+        """次のセグメントファイルを確保してmmapする。"""
+        self._close_segment(truncate=False)
+        segment_path = os.path.join(self.path, _segment_name(self._segment_number))
+        self._segment_number += 1
+        self._file = open(segment_path, "w+b")
+        self._file.truncate(self._segment_bytes)
+        if hasattr(os, "posix_fallocate"):
+            # ディスク上の領域を先に確保し、書き込み中の断片化・容量不足を避ける
+            try:
+                os.posix_fallocate(self._file.fileno(), 0, self._segment_bytes)
+            except OSError:
+                # 対応していないファイルシステムの場合は疎なファイルのまま使う
+                pass
+        self._mm = mmap.mmap(self._file.fileno(), self._segment_bytes)
+        self._pos = 0
+
+    def _close_segment(self, truncate: bool) -> None:
+        """書き込み中のセグメントを閉じる。
+
+        Args:
+            truncate (bool): 未使用部分を切り詰めるかどうか
+        """
+        if self._mm is None or self._file is None:
+            return
+        self._mm.flush()
+        self._mm.close()
+        if truncate:
+            self._file.truncate(self._pos)
+        self._file.close()
+        self._mm = None
+        self._file = None
+
+
+@dataclass
+class ArchivedUtterance:
+    """アーカイブされた発話"""
+
+    # 索引の番号
+    index: int
+    # アーカイブ全体での開始・終了サンプル位置
+    start: int
+    end: int
+    # 開始・終了時刻（UNIX時間）
+    start_time: float
+    end_time: float
+    # 記録時の認識結果
+    result: Dict
+
+
+class SessionArchive:
+    def __init__(self, path: str) -> None:
+        """Initialize
+
+        SessionWriterで記録したアーカイブを読み出す。
+        索引・音声はmmapで参照し、指定した発話の部分のみを読み込む。
+
+        Args:
+            path (str): アーカイブのディレクトリ
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.sampling_rate: int = meta["sampling_rate"]
+
+        index_path = os.path.join(path, INDEX_FILE)
+        # 書き込み途中の末尾のレコードは読まない
+        n = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        self._index: np.ndarray = (
+            np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(n,))
+            if n > 0
+            else np.zeros(0, dtype=INDEX_DTYPE)
+        )
+        self._results = open(os.path.join(path, RESULTS_FILE), "rb")
+
+        # 各セグメントと、その先頭のアーカイブ全体でのバイト位置（空のセグメントは除く）
+        self._segments: List[str] = []
+        self._segment_starts: List[int] = []
+        total = 0
+        for segment_path in _list_segments(path):
+            size = os.path.getsize(segment_path)
+            if size > 0:
+                self._segments.append(segment_path)
+                self._segment_starts.append(total)
+                total += size
+        self._mmaps: Dict[int, mmap.mmap] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i: int) -> ArchivedUtterance:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"utterance {i} is out of range.")
+        record = self._index[i]
+        self._results.seek(int(record["result_offset"]))
+        result = json.loads(self._results.read(int(record["result_length"])))
+        return ArchivedUtterance(
+            index=i,
+            start=int(record["start"]),
+            end=int(record["end"]),
+            start_time=float(record["start_time"]),
+            end_time=float(record["end_time"]),
+            result=result,
+        )
+
+    def __iter__(self) -> Iterator[ArchivedUtterance]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, timestamp: float) -> int:
+        """指定した時刻に終了していない最初の発話の番号を返す。
+
+        Args:
+            timestamp (float): 時刻（UNIX時間）
+
+        Returns:
+            int: 発話の番号（該当しない場合はlen(self)）
+        """
+        return int(np.searchsorted(self._index["end_time"], timestamp, side="left"))
+
+    def read_audio(self, i: int) -> bytes:
+        """発話の音声を読み出す。
+
+        Args:
+            i (int): 発話の番号
+
+        Returns:
+            bytes: モノラル16bit PCM
+        """
+        record = self._index[i]
+        return self.read_samples(int(record["start"]), int(record["end"]))
+
+    def read_samples(self, start: int, end: int) -> bytes:
+        """アーカイブ全体でのサンプル位置を指定して音声を読み出す。
+
+        Args:
+            start (int): 開始サンプル位置
+            end (int): 終了サンプル位置（含まない）
+
+        Returns:
+            bytes: モノラル16bit PCM
+        """
+        pos = start * SAMPLE_WIDTH
+        end_pos = end * SAMPLE_WIDTH
+        chunks = []
+        while pos < end_pos:
+            number = bisect.bisect_right(self._segment_starts, pos) - 1
+            if number < 0:
+                break
+            mm = self._segment(number)
+            offset = pos - self._segment_starts[number]
+            n = min(end_pos - pos, len(mm) - offset)
+            if n <= 0:
+                break
+            chunks.append(mm[offset : offset + n])
+            pos += n
+        return b"".join(chunks)
+
+    def redecode(
+        self, i: int, vosk: VoskClient, chunk_samples: int = 4000
+    ) -> List[Dict]:
+        """発話の音声を認識し直す。
+
+        Args:
+            i (int): 発話の番号
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス（アーカイブと同じサンプリングレートで初期化済みのもの）
+            chunk_samples (int, optional): 1回に認識器へ渡すサンプル数. Defaults to 4000.
+
+        Returns:
+            List[Dict]: 認識結果のリスト（空の結果は除く）
+        """
+        data = memoryview(self.read_audio(i))
+        step = chunk_samples * SAMPLE_WIDTH
+        results = []
+        for pos in range(0, len(data), step):
+            recognized = vosk.recognize(data[pos : pos + step])
+            if recognized is not None and recognized["result"] != "":
+                results.append(recognized)
+        recognized = vosk.flush()
+        if recognized is not None and recognized["result"] != "":
+            results.append(recognized)
+        return results
+
+    def close(self) -> None:
+        """開いているファイルを閉じる。"""
+        for mm in self._mmaps.values():
+            mm.close()
+        self._mmaps.clear()
+        self._results.close()
+        # np.memmapは参照がなくなった時点で閉じられる
+        self._index = np.zeros(0, dtype=INDEX_DTYPE)
+
+    def __enter__(self) -> "SessionArchive":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _segment(self, number: int) -> mmap.mmap:
+        """セグメントファイルを読み取り専用でmmapする。（開いたものは使い回す）
+
+        Args:
+            number (int): セグメントの番号
+
+        Returns:
+            mmap.mmap: セグメントのmmap
+        """
+        mm = self._mmaps.get(number)
+        if mm is None:
+            with open(self._segments[number], "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmaps[number] = mm
+        return mm
@@ -1,20 +1,38 @@
-import logging
-import queue
 import sys
 from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
 import sounddevice as sd
+from vosk_example_gui.block_queue import OverflowPolicy
 from vosk_example_gui.config import BLOCK_SIZE
+from vosk_example_gui.source import AudioSource
 
 
-class Audio(object):
-    def __init__(self) -> None:
-        """Initialize"""
-        self._logger = logging.getLogger("vosk_example.audio")
-        self.q = queue.Queue()
-        self.is_streaming = False
-        self._sampling_rate = None
+class Audio(AudioSource):
+    def __init__(
+        self,
+        block_size: int = BLOCK_SIZE,
+        block_ms: Optional[float] = None,
+        channels: int = 1,
+        overflow_policy: Optional[OverflowPolicy] = None,
+    ) -> None:
+        """Initialize
+
+        入力デバイスからPortAudioのコールバックでブロックを受け取る入力ソース。
+        コールバックを止めないよう、OverflowPolicy.BLOCKは指定できない。（ValueError）
+
+        Args:
+            block_size (int, optional): 1ブロックのサンプル数. Defaults to BLOCK_SIZE.
+            block_ms (Optional[float], optional): 1ブロックの長さ[msec]（指定した場合はblock_sizeより優先）. Defaults to None.
+            channels (int, optional): 入力チャンネル数（デバイスの最大数を上限とする）. Defaults to 1.
+            overflow_policy (Optional[OverflowPolicy], optional): キューに空きがない場合の動作（Noneの場合はAUDIO_OVERFLOW_POLICY）. Defaults to None.
+        """
+        super().__init__(block_size, block_ms, channels, overflow_policy)
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            raise ValueError(
+                "overflow policy 'block' would stall the audio callback. "
+                "use 'drop_oldest' for device input."
+            )
 
     def start_streaming(self, dev_id: Optional[int] = None) -> None:
         """Streamingを開始する
@@ -27,16 +45,22 @@ class Audio(object):
 
         device_info = sd.query_devices(dev_id, "input")
         # soundfile expects an int, sounddevice provides a float:
-        self._sampling_rate = int(device_info["default_samplerate"])
+        self._configure(
+            int(device_info["default_samplerate"]),
+            int(device_info["max_input_channels"]),
+        )
         self.stream = sd.RawInputStream(
             samplerate=self._sampling_rate,
-            blocksize=BLOCK_SIZE,
+            blocksize=self.block_size,
             device=dev_id,
             dtype="int16",
-            channels=1,
+            channels=self.channels,
             callback=self.__audio_callback,
         )
-        self._logger.info(f"device: {dev_id}, sampling_rate: {self._sampling_rate}")
+        self._logger.info(
+            f"device: {dev_id}, sampling_rate: {self._sampling_rate}, "
+            f"block_size: {self.block_size}, channels: {self.channels}"
+        )
         self.start()
 
     def get_input_devices(self) -> Tuple[Dict, int]:
@@ -60,40 +84,13 @@ class Audio(object):
 
         return input_device_config, default_input_idx
 
-    def get_sampling_rate(self) -> Optional[int]:
-        """サンプリングレートを返す
+    def _start_stream(self) -> None:
+        """デバイスからの入力を開始する。"""
+        self.stream.start()
 
-        Returns:
-            int: サンプリングレート
-        """
-        return self._sampling_rate
-
-    def start(self) -> None:
-        """ストリーミング開始"""
-        if not self.is_streaming:
-            self.q.queue.clear()
-            self.stream.start()
-            self._logger.info("start audio streaming")
-            self.is_streaming = True
-
-    def stop(self) -> None:
-        """ストリーミング停止"""
-        if self.is_streaming:
-            self.stream.stop()
-            self._logger.info("stop audio streaming")
-            self.is_streaming = False
-
-    def get(self) -> Optional[bytes]:
-        """マイク入力データを返す
-
-        Returns:
-            Optional[bytes]: バイト配列
-        """
-        try:
-            data = self.q.get_nowait()
-            return data
-        except:
-            return None
+    def _stop_stream(self) -> None:
+        """デバイスからの入力を停止する。"""
+        self.stream.stop()
 
     def __audio_callback(
         self, indata: np.ndarray, frames: int, time: Any, status: Any
@@ -106,6 +103,8 @@ class Audio(object):
             status {CallbackFlags} -- エラー収集用のフラグ
         """
         if status:
+            if status.input_overflow:
+                self.overflow_count += 1
             print("[audio callback error] {}".format(status))
             print(status, file=sys.stderr)
-        self.q.put(bytes(indata))
+        self._push_block(indata)
@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+import wave
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from vosk_example_gui.config import DEFAULT_CHUNK_SAMPLES
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.word_timing import WordTimeline, json_default
+
+# (ファイルパス, 発話毎の認識結果, 音声長[sec], エラー内容)
+FileResult = Tuple[str, List[Dict], float, Optional[str]]
+
+
+class BatchTranscriber:
+    def __init__(
+        self,
+        model_path: str,
+        word_list: Optional[List] = None,
+        chunk_samples: int = DEFAULT_CHUNK_SAMPLES,
+        raw_sampling_rate: int = 16000,
+        word_timings: bool = False,
+    ) -> None:
+        """Initialize
+
+        Args:
+            model_path (str): 利用するモデルのパス
+            word_list (Optional[List], optional): 認識対象のワードリスト. Defaults to None.
+            chunk_samples (int, optional): 1回に認識器へ渡すサンプル数. Defaults to DEFAULT_CHUNK_SAMPLES.
+            raw_sampling_rate (int, optional): raw PCMのサンプリングレート. Defaults to 16000.
+            word_timings (bool, optional): 結果に単語毎の時刻情報を含めるかどうか. Defaults to False.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.batch")
+        self._model_path = model_path
+        self._word_list = word_list if word_list is not None else []
+        self._chunk_samples = chunk_samples
+        self._raw_sampling_rate = raw_sampling_rate
+        # モデルは一度だけ読み込み、ファイル毎に認識器のみを作り直す
+        self._vosk = VoskClient(word_timings=word_timings)
+        self._vosk.load_model(model_path)
+
+    def transcribe(self, path: str) -> Tuple[List[Dict], float]:
+        """1ファイルを認識する。
+
+        Args:
+            path (str): 対象のファイルパス
+
+        Returns:
+            Tuple[List[Dict], float]: (発話毎の認識結果, 音声長[sec])
+        """
+        f = PcmFile(path, self._raw_sampling_rate)
+        sampling_rate = f.sampling_rate
+        try:
+            # 単語の時刻をファイルの先頭から数えるため、ファイル毎に新しい認識器を使う
+            self._vosk.initialize_recognizer(
+                self._word_list, sampling_rate, reuse=False
+            )
+            results = []
+            for data in f.iter_chunks(self._chunk_samples):
+                recognized = self._vosk.recognize(data)
+                if recognized is not None:
+                    results.append(recognized)
+            recognized = self._vosk.flush()
+            if recognized is not None and recognized["result"] != "":
+                results.append(recognized)
+        finally:
+            f.close()
+        return results, f.n_samples / sampling_rate
+
+    def run(
+        self,
+        paths: List[str],
+        out: IO[str],
+        timeline: Optional[WordTimeline] = None,
+    ) -> Dict:
+        """複数ファイルを認識し、結果をJSONLで書き出す。
+
+        Args:
+            paths (List[str]): 対象のファイルパスのリスト
+            out (IO[str]): JSONLの出力先
+            timeline (Optional[WordTimeline], optional): 単語の時刻情報をまとめる先. Defaults to None.
+
+        Returns:
+            Dict: スループット情報（real time factor, files/sec）
+        """
+        return write_results(map(self.try_transcribe, paths), out, timeline)
+
+    def try_transcribe(self, path: str) -> FileResult:
+        """1ファイルを認識する。（読み込みエラーは結果に格納する）
+
+        Args:
+            path (str): 対象のファイルパス
+
+        Returns:
+            FileResult: (ファイルパス, 発話毎の認識結果, 音声長[sec], エラー内容)
+        """
+        try:
+            results, duration = self.transcribe(path)
+            return path, results, duration, None
+        except (IOError, ValueError, wave.Error) as e:
+            return path, [], 0.0, str(e)
+
+
+def write_results(
+    file_results: Iterable[FileResult],
+    out: IO[str],
+    timeline: Optional[WordTimeline] = None,
+) -> Dict:
+    """ファイル毎の認識結果をJSONLで書き出し、スループットを集計する。
+
+    Args:
+        file_results (Iterable[FileResult]): ファイル毎の認識結果
+        out (IO[str]): JSONLの出力先
+        timeline (Optional[WordTimeline], optional): 単語の時刻情報をまとめる先（指定した場合は単語の時刻情報をJSONLに含めない）. Defaults to None.
+
+    Returns:
+        Dict: スループット情報（real time factor, files/sec）
+    """
+    logger = logging.getLogger("vosk_example_gui.batch")
+    audio_sec = 0.0
+    n_files = 0
+    start = time.perf_counter()
+    for path, results, duration, error in file_results:
+        if error is not None:
+            logger.error(f"skip {path}. {error}")
+            continue
+        for i, recognized in enumerate(results):
+            record = {"file": path, "utterance": i}
+            record.update(recognized)
+            if timeline is not None:
+                timeline.add_result(record, path)
+                record.pop("words", None)
+            line = json.dumps(record, ensure_ascii=False, default=json_default)
+            out.write(line + "\n")
+        audio_sec += duration
+        n_files += 1
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "files": n_files,
+        "audio_sec": audio_sec,
+        "elapsed_sec": elapsed,
+        "real_time_factor": elapsed / audio_sec if audio_sec > 0 else 0.0,
+        "files_per_sec": n_files / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.info(
+        f"files: {n_files}, audio: {audio_sec:.1f}s, elapsed: {elapsed:.1f}s, "
+        f"RTF: {stats['real_time_factor']:.3f}, "
+        f"files/sec: {stats['files_per_sec']:.2f}"
+    )
+    return stats
@@ -0,0 +1,153 @@
+import threading
+import time
+from enum import Enum
+from typing import List, Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST: str = "drop_oldest"
+    BLOCK: str = "block"
+
+
+class BlockQueue:
+    def __init__(
+        self,
+        n_slots: int,
+        block_bytes: int,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        block_timeout: float = 1.0,
+    ) -> None:
+        """Initialize
+
+        事前に確保したn_slots個のスロットを使い回す、1 producer / 1 consumer用のキュー。
+
+        Args:
+            n_slots (int): スロット数
+            block_bytes (int): 1スロットの最大バイト数
+            policy (OverflowPolicy, optional): 空きスロットがない場合の動作. Defaults to OverflowPolicy.DROP_OLDEST.
+            block_timeout (float, optional): BLOCKの場合に空きを待つ最大時間[sec]. Defaults to 1.0.
+        """
+        if n_slots < 2:
+            raise ValueError("n_slots must be 2 or more.")
+        self.n_slots = n_slots
+        self.block_bytes = block_bytes
+        self.policy = policy
+        self._block_timeout = block_timeout
+
+        self._storage = bytearray(n_slots * block_bytes)
+        view = memoryview(self._storage)
+        self._slots = [
+            view[i * block_bytes : (i + 1) * block_bytes] for i in range(n_slots)
+        ]
+        self._lengths = [0] * n_slots
+        # 各スロットへ書き込んだ時刻（time.perf_counter）
+        self._put_times = [0.0] * n_slots
+        # 空きスロットのスタックと、書き込み済みスロットのリングバッファ
+        self._free: List[int] = list(range(n_slots))
+        self._filled = [0] * n_slots
+        self._head = 0
+        self._count = 0
+        # consumerが処理中のスロット
+        self._held: Optional[int] = None
+
+        self._cond = threading.Condition()
+        # オーバーフローにより破棄したブロック数
+        self.dropped = 0
+        # 直前にgetしたブロックをputした時刻（キュー滞留時間の計測用）
+        self.last_put_time = 0.0
+
+    def put(self, data: Buffer) -> bool:
+        """データを空きスロットへコピーして追加する。
+
+        Args:
+            data (Buffer): 追加するデータ（block_bytes以下）
+
+        Returns:
+            bool: 追加できた場合はTrue（Falseの場合は破棄された）
+        """
+        n = len(data)
+        if n > self.block_bytes:
+            raise ValueError(f"block is too large. {n} > {self.block_bytes}")
+        with self._cond:
+            if not self._free:
+                if self.policy == OverflowPolicy.BLOCK:
+                    self._cond.wait_for(
+                        lambda: len(self._free) > 0, self._block_timeout
+                    )
+                elif self._count > 0:
+                    # 最も古いブロックを破棄してスロットを空ける
+                    self._free.append(self._filled[self._head])
+                    self._head = (self._head + 1) % self.n_slots
+                    self._count -= 1
+                    self.dropped += 1
+            if not self._free:
+                self.dropped += 1
+                return False
+
+            slot = self._free.pop()
+            self._slots[slot][:n] = data
+            self._lengths[slot] = n
+            self._put_times[slot] = time.perf_counter()
+            self._filled[(self._head + self._count) % self.n_slots] = slot
+            self._count += 1
+            self._cond.notify_all()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """最も古いブロックのビューを返す。
+
+        返したビューは次のget/release呼び出しまで有効で、その時点でスロットが再利用される。
+
+        Args:
+            timeout (Optional[float], optional): 待ち時間[sec]（Noneの場合は待たない）. Defaults to None.
+
+        Returns:
+            Optional[memoryview]: ブロックのビュー（データがない場合はNone）
+        """
+        with self._cond:
+            self._release()
+            if self._count == 0 and timeout is not None:
+                self._cond.wait_for(lambda: self._count > 0, timeout)
+            if self._count == 0:
+                return None
+            slot = self._filled[self._head]
+            self._head = (self._head + 1) % self.n_slots
+            self._count -= 1
+            self._held = slot
+            self.last_put_time = self._put_times[slot]
+
+        n = self._lengths[slot]
+        if n == self.block_bytes:
+            return self._slots[slot]
+        return self._slots[slot][:n]
+
+    def release(self) -> None:
+        """getで返したブロックのスロットを返却する。"""
+        with self._cond:
+            self._release()
+
+    def qsize(self) -> int:
+        """未処理のブロック数を返す。
+
+        Returns:
+            int: ブロック数
+        """
+        return self._count
+
+    def clear(self) -> None:
+        """未処理のブロックを全て破棄する。"""
+        with self._cond:
+            while self._count > 0:
+                self._free.append(self._filled[self._head])
+                self._head = (self._head + 1) % self.n_slots
+                self._count -= 1
+            self._cond.notify_all()
+
+    def _release(self) -> None:
+        """処理中のスロットを空きに戻す。（ロック取得済みの状態で呼び出す）"""
+        if self._held is not None:
+            self._free.append(self._held)
+            self._held = None
+            self._cond.notify_all()
@@ -1,2 +1,15 @@
+import os
+
 GUI_APP_NAME: str = "Vosk Example"
 BLOCK_SIZE: int = 8000
+WAVEFORM_HISTORY_SEC: float = 5.0
+AUDIO_QUEUE_SEC: float = 16.0  # 認識待ちのブロックを保持する最大時間
+# キューに空きがない場合の動作（"drop_oldest" or "block"）
+# "block"はreplay等のデバイス以外の入力のみ（コールバックを止めるためデバイスには不可）
+AUDIO_OVERFLOW_POLICY: str = "drop_oldest"
+# 1回のAcceptWaveformに渡すサンプル数（BLOCK_SIZEより大きくしてオーバーヘッドを減らす）
+DEFAULT_CHUNK_SAMPLES: int = 4 * 16000
+# 語彙で検証したワードリストの文法を保存するディレクトリ
+GRAMMAR_CACHE_DIR: str = os.path.join(
+    os.path.expanduser("~"), ".cache", "vosk_example_gui", "grammars"
+)
@@ -0,0 +1,424 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, TextIO
+
+from vosk_example_gui.session import Session
+from vosk_example_gui.source import AudioSource
+from vosk_example_gui.spotter import KeywordHit
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.word_timing import json_default
+from vosk_example_gui.worker import RecognizeWorker
+
+
+class Consumer:
+    """AsyncCoreの認識結果を受け取るフロントエンドの基底クラス
+
+    メソッドは全てイベントループのスレッドから呼び出されるため、長時間ブロックしないこと。
+    """
+
+    def on_result(self, index: int, recognized: Dict) -> None:
+        """認識結果が確定した際に呼び出される。
+
+        Args:
+            index (int): セッション番号（追加した順）
+            recognized (Dict): VoskClient.recognizeの結果
+        """
+
+    def on_partial(self, index: int, text: str) -> None:
+        """途中認識結果が変化した際に呼び出される。
+
+        Args:
+            index (int): セッション番号
+            text (str): 途中認識結果のテキスト
+        """
+
+    def on_keyword(self, index: int, hit: KeywordHit) -> None:
+        """キーワードを検出した際に呼び出される。（RecognizeWorker.set_spotterを設定した場合のみ）
+
+        Args:
+            index (int): セッション番号
+            hit (KeywordHit): 検出結果
+        """
+
+    def on_audio(self, index: int) -> None:
+        """新しい音声ブロックが届いた際に呼び出される。（max_fpsの間隔に間引かれる）
+
+        Args:
+            index (int): セッション番号
+        """
+
+    def on_tick(self) -> None:
+        """tick_intervalの間隔で呼び出される。"""
+
+
+class JsonlConsumer(Consumer):
+    def __init__(
+        self,
+        out: TextIO,
+        names: List[str],
+        partial: bool = False,
+        on_closed: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Initialize
+
+        認識結果を1行1件のJSONとして書き出すヘッドレスのフロントエンド。
+        出力先のパイプが閉じられた場合（headへ渡した場合など）は以降の書き出しをやめ、
+        on_closedで呼び出し元へ停止を促す。
+
+        Args:
+            out (TextIO): 出力先
+            names (List[str]): セッション名のリスト
+            partial (bool, optional): 途中認識結果も書き出すかどうか. Defaults to False.
+            on_closed (Optional[Callable[[], None]], optional): 出力先が閉じられた際のコールバック（イベントループのスレッドから呼び出される）. Defaults to None.
+        """
+        self._out = out
+        self._names = names
+        self._partial = partial
+        self._on_closed = on_closed
+        self.closed = False
+
+    def on_result(self, index: int, recognized: Dict) -> None:
+        if recognized["result"] == "":
+            return
+        self._write({"session": self._names[index], **recognized})
+
+    def on_partial(self, index: int, text: str) -> None:
+        if self._partial and text != "":
+            self._write({"session": self._names[index], "partial": text})
+
+    def on_keyword(self, index: int, hit: KeywordHit) -> None:
+        self._write({"session": self._names[index], **hit.to_dict()})
+
+    def _write(self, record: Dict) -> None:
+        if self.closed:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=json_default)
+        try:
+            self._out.write(line + "\n")
+            self._out.flush()
+        except BrokenPipeError:
+            self._close_broken_pipe()
+
+    def _close_broken_pipe(self) -> None:
+        """読み手がいなくなった出力先への書き出しをやめる。"""
+        self.closed = True
+        if self._out is sys.stdout:
+            # 終了時のflushで再び例外とならないよう、標準出力を/dev/nullへ差し替える
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            os.close(devnull)
+        if self._on_closed is not None:
+            self._on_closed()
+
+
+class _LoopWakeup:
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[int]", index: int
+    ) -> None:
+        """Initialize
+
+        AudioSource.on_blockとして設定し、音声コールバックのスレッドからイベントループへ
+        ブロックの到着を通知する。
+
+        Args:
+            loop (asyncio.AbstractEventLoop): 通知先のイベントループ
+            queue (asyncio.Queue[int]): 通知先のキュー
+            index (int): セッション番号
+        """
+        self._loop = loop
+        self._queue = queue
+        self._index = index
+
+    def set(self) -> None:
+        """ブロックの到着を通知する。（任意のスレッドから呼び出し可能）"""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, self._index)
+        except RuntimeError:
+            # 停止処理中にイベントループが閉じられた場合
+            pass
+
+
+class AsyncCore:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_fps: float = 30.0,
+        tick_interval: float = 1.0,
+        report_interval: float = 5.0,
+        partial: bool = False,
+    ) -> None:
+        """Initialize
+
+        asyncioのイベントループ上で複数の入力ストリームの認識を駆動する。
+        音声コールバックはブロックの到着をasyncio.Queueへ通知し、認識処理はスレッドプール上で
+        1ストリームにつき同時に1つまで実行する。待機中はポーリングせずに停止している。
+
+        Args:
+            workers (Optional[int], optional): 認識処理のスレッド数（Noneの場合はCPUコア数）. Defaults to None.
+            max_fps (float, optional): Consumer.on_audioを呼び出す上限回数[回/sec]. Defaults to 30.0.
+            tick_interval (float, optional): Consumer.on_tickを呼び出す間隔[sec]. Defaults to 1.0.
+            report_interval (float, optional): ストリーム毎の統計をログ出力する間隔[sec]. Defaults to 5.0.
+            partial (bool, optional): Consumerへ途中認識結果を渡すかどうか（途中認識結果の取得にはコストがかかる）. Defaults to False.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.core")
+        self._partial = partial
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="Recognize"
+        )
+        self._frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._tick_interval = tick_interval
+        self._report_interval = report_interval
+        self.sessions: List[Session] = []
+        self._consumers: List[Consumer] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="AsyncCore", daemon=True
+        )
+        # 処理中に新しいブロックが届いたセッション番号
+        self._dirty: Set[int] = set()
+        self._drain_on_stop = False
+        # on_audioの通知待ちのセッション番号と、次に通知できる時刻
+        self._audio_pending: Set[int] = set()
+        self._audio_handle: Optional[asyncio.TimerHandle] = None
+        self._next_audio = 0.0
+
+    def add_consumer(self, consumer: Consumer) -> None:
+        """認識結果を受け取るフロントエンドを追加する。
+
+        Args:
+            consumer (Consumer): 追加するフロントエンド
+        """
+        self._consumers.append(consumer)
+
+    def add_session(
+        self,
+        name: str,
+        audio: AudioSource,
+        vosk: VoskClient,
+        on_result: Optional[Callable[[Dict], None]] = None,
+        on_partial: Optional[Callable[[str], None]] = None,
+        on_keyword: Optional[Callable[[KeywordHit], None]] = None,
+    ) -> Session:
+        """セッションを追加する。（startの前に呼び出す）
+
+        結果はadd_consumerで追加したフロントエンドへ渡され、on_result/on_partial/on_keywordを
+        指定した場合はそれらもイベントループのスレッドから呼び出される。
+
+        Args:
+            name (str): セッション名（入力デバイス名）
+            audio (AudioSource): 入力元のAudioSourceインスタンス
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス（モデルは全セッションで共有される）
+            on_result (Optional[Callable[[Dict], None]], optional): このセッションの認識結果を受け取るコールバック. Defaults to None.
+            on_partial (Optional[Callable[[str], None]], optional): このセッションの途中認識結果を受け取るコールバック. Defaults to None.
+            on_keyword (Optional[Callable[[KeywordHit], None]], optional): このセッションのキーワードの検出結果を受け取るコールバック. Defaults to None.
+
+        Returns:
+            Session: 追加したセッション
+        """
+        index = len(self.sessions)
+
+        def publish_result(recognized: Dict) -> None:
+            self._call_soon(self._publish_result, index, recognized, on_result)
+
+        def publish_partial(text: str) -> None:
+            self._call_soon(self._publish_partial, index, text, on_partial)
+
+        def publish_keyword(hit: KeywordHit) -> None:
+            self._call_soon(self._publish_keyword, index, hit, on_keyword)
+
+        worker = RecognizeWorker(
+            audio,
+            vosk,
+            on_result=publish_result,
+            on_partial=(
+                publish_partial if self._partial or on_partial is not None else None
+            ),
+            name=name,
+            on_keyword=publish_keyword,
+        )
+        session = Session(name, audio, vosk, worker)
+        self.sessions.append(session)
+        self._logger.info(f"add session: {name}")
+        return session
+
+    def start(self) -> None:
+        """イベントループのスレッドを起動し、準備が完了するまで待つ。"""
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, drain: bool = False) -> None:
+        """イベントループを停止し、処理中のブロックの完了を待つ。
+
+        Args:
+            drain (bool, optional): キューに残っているブロックも処理してから停止するかどうか. Defaults to False.
+        """
+        self._drain_on_stop = drain
+        loop = self._loop
+        if loop is not None and self._stopping is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread.is_alive():
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _call_soon(self, callback: Callable, *args: object) -> None:
+        """イベントループのスレッドで実行するよう予約する。（任意のスレッドから呼び出し可能）"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 停止処理中にイベントループが閉じられた場合
+            pass
+
+    def _run(self) -> None:
+        """イベントループのスレッドの処理"""
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self._logger.error(f"{e}")
+        finally:
+            self._ready.set()
+
+    async def _main(self) -> None:
+        """ブロックの到着通知を待ち、届いたセッションの処理をスレッドプールへ投入し続ける。"""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stopping = asyncio.Event()
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for i, session in enumerate(self.sessions):
+            session.audio.on_block = _LoopWakeup(loop, queue, i)
+            if session.audio.q is not None and session.audio.q.qsize() > 0:
+                queue.put_nowait(i)
+        tick = loop.create_task(self._tick())
+        self._ready.set()
+        self._logger.info("async core start")
+
+        drains: Set["asyncio.Task[None]"] = set()
+        stopping = loop.create_task(self._stopping.wait())
+        while True:
+            get = loop.create_task(queue.get())
+            done, _ = await asyncio.wait(
+                {get, stopping}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if stopping in done:
+                get.cancel()
+                break
+            index = get.result()
+            self._schedule_audio(index)
+            session = self.sessions[index]
+            if session.scheduled:
+                # 処理中のセッションは処理が終わった後に再度取り出させる
+                self._dirty.add(index)
+                continue
+            session.scheduled = True
+            task = loop.create_task(self._drain(index))
+            drains.add(task)
+            task.add_done_callback(drains.discard)
+
+        for session in self.sessions:
+            session.audio.on_block = None
+        tick.cancel()
+        if drains:
+            await asyncio.wait(drains)
+        if self._drain_on_stop:
+            for session in self.sessions:
+                await loop.run_in_executor(self._executor, session.worker.drain)
+        self._logger.info("async core stop")
+
+    async def _drain(self, index: int) -> None:
+        """セッションに溜まっているブロックをスレッドプール上で処理する。
+
+        Args:
+            index (int): セッション番号
+        """
+        loop = asyncio.get_running_loop()
+        session = self.sessions[index]
+        try:
+            while True:
+                self._dirty.discard(index)
+                await loop.run_in_executor(self._executor, session.worker.drain)
+                if index not in self._dirty:
+                    break
+        except Exception as e:
+            self._logger.error(f"[{session.name}] {e}")
+        finally:
+            session.scheduled = False
+
+    async def _tick(self) -> None:
+        """一定間隔でConsumer.on_tickを呼び出し、統計をログ出力する。"""
+        last_report = time.perf_counter()
+        while True:
+            await asyncio.sleep(self._tick_interval)
+            for consumer in self._consumers:
+                consumer.on_tick()
+            now = time.perf_counter()
+            if now - last_report >= self._report_interval:
+                for session in self.sessions:
+                    session.worker.report_stats()
+                last_report = now
+
+    def _schedule_audio(self, index: int) -> None:
+        """Consumer.on_audioの呼び出しをmax_fpsの間隔に間引いて予約する。
+
+        Args:
+            index (int): セッション番号
+        """
+        self._audio_pending.add(index)
+        if self._audio_handle is not None or self._loop is None:
+            return
+        delay = max(0.0, self._next_audio - time.perf_counter())
+        self._audio_handle = self._loop.call_later(delay, self._publish_audio)
+
+    def _publish_audio(self) -> None:
+        """通知待ちのセッションについてConsumer.on_audioを呼び出す。"""
+        self._audio_handle = None
+        self._next_audio = time.perf_counter() + self._frame_interval
+        pending = self._audio_pending
+        self._audio_pending = set()
+        for index in sorted(pending):
+            for consumer in self._consumers:
+                consumer.on_audio(index)
+
+    def _publish_result(
+        self,
+        index: int,
+        recognized: Dict,
+        callback: Optional[Callable[[Dict], None]],
+    ) -> None:
+        """認識結果をフロントエンドへ渡す。"""
+        if callback is not None:
+            callback(recognized)
+        for consumer in self._consumers:
+            consumer.on_result(index, recognized)
+
+    def _publish_partial(
+        self, index: int, text: str, callback: Optional[Callable[[str], None]]
+    ) -> None:
+        """途中認識結果をフロントエンドへ渡す。"""
+        if callback is not None:
+            callback(text)
+        for consumer in self._consumers:
+            consumer.on_partial(index, text)
+
+    def _publish_keyword(
+        self,
+        index: int,
+        hit: KeywordHit,
+        callback: Optional[Callable[[KeywordHit], None]],
+    ) -> None:
+        """キーワードの検出結果をフロントエンドへ渡す。"""
+        if callback is not None:
+            callback(hit)
+        for consumer in self._consumers:
+            consumer.on_keyword(index, hit)
@@ -0,0 +1,187 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from vosk_example_gui.vosk_client import VoskClient
+
+# ワードリストを指定しない（通常のモデルで認識する）文法の名前
+FREE_GRAMMAR: str = "(free)"
+
+
+class FanoutClient:
+    def __init__(
+        self,
+        grammars: List[Tuple[str, List[str]]],
+        workers: Optional[int] = None,
+        free: bool = False,
+    ) -> None:
+        """Initialize
+
+        1つの音声ストリームを、同じモデルから作った文法の異なる複数の認識器で同時に認識する。
+        各認識器へのブロックの投入はスレッドプール上で並列に行う。（voskのネイティブ処理は
+        GILを解放するため、文法の数が増えても1ブロックあたりの経過時間は総和より短く済む）
+
+        確定結果は、どの文法の結果かを示す"grammar"を加えたVoskClient.recognizeの結果として返す。
+        set_activeで停止した認識器にはブロックを渡さない。（主と同じ文法の場合など）
+
+        Args:
+            grammars (List[Tuple[str, List[str]]]): (文法の名前, ワードリスト)のリスト
+            workers (Optional[int], optional): 認識処理のスレッド数（Noneの場合は文法の数）. Defaults to None.
+            free (bool, optional): ワードリストを指定しない認識器も加えるかどうか（主の認識器がワードリストなしの場合は同じ結果になるため不要）. Defaults to False.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.fanout")
+        grammars = list(grammars)
+        if free:
+            grammars.append((FREE_GRAMMAR, []))
+        self.names = [name for name, _ in grammars]
+        self._word_lists = [words for _, words in grammars]
+        # 確定結果のみを用いるため、途中認識結果は取得しない
+        self.clients = [VoskClient(track_partial_conf=False) for _ in grammars]
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers if workers is not None else max(1, len(grammars)),
+            thread_name_prefix="Fanout",
+        )
+        # 直前のrecognizeでの経過時間と、認識器毎の処理時間の総和[sec]
+        self.timings: Dict[str, float] = {"wall": 0.0, "serial": 0.0}
+        self._submitted = 0.0
+        self._sampling_rate = 0
+        # ブロックを渡す認識器の番号（認識中のスレッドは丸ごと差し替えたものを参照する）
+        self._active: Tuple[int, ...] = tuple(range(len(grammars)))
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def initialize_model(self, sampling_rate: int, model_path: str) -> None:
+        """モデルを読み込み、各文法の認識器を作成する。（モデルは全ての認識器で共有する）
+
+        Args:
+            sampling_rate (int): 入力される音声データのサンプリングレート
+            model_path (str): 利用するモデルのパス
+        """
+        start = time.perf_counter()
+        self._sampling_rate = sampling_rate
+        futures = [
+            self._executor.submit(c.initialize_model, words, sampling_rate, model_path)
+            for c, words in zip(self.clients, self._word_lists)
+        ]
+        for future in futures:
+            future.result()
+        self._logger.info(
+            f"grammars: {self.names}, "
+            f"built in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+
+    def set_active(self, name: str, active: bool) -> None:
+        """認識器へのブロックの受け渡しを再開・停止する。（別スレッドから呼び出し可能）
+
+        Args:
+            name (str): 文法の名前
+            active (bool): ブロックを渡すかどうか
+        """
+        index = self.names.index(name)
+        if active == (index in self._active):
+            return
+        if active and self._sampling_rate > 0:
+            # 停止した時点の発話の途中状態を破棄してから再開する
+            self.clients[index].initialize_recognizer(
+                self._word_lists[index], self._sampling_rate
+            )
+        indices = set(self._active)
+        if active:
+            indices.add(index)
+        else:
+            indices.discard(index)
+        self._active = tuple(sorted(indices))
+        self._logger.info(f"grammar {name}: {'active' if active else 'paused'}")
+
+    @property
+    def in_utterance(self) -> bool:
+        """いずれかの認識器が発話の途中かどうか"""
+        return any(self.clients[i].in_utterance for i in self._active)
+
+    def submit(self, audio_data: Union[bytes, memoryview]) -> List[Tuple[int, Future]]:
+        """全ての認識器へブロックを投入する。（結果はcollectで受け取る）
+
+        呼び出し元のスレッドは、collectまでの間に別の認識器の処理を行える。
+
+        Args:
+            audio_data (Union[bytes, memoryview]): 音声データ（collectを終えるまで書き換えないこと）
+
+        Returns:
+            List[Tuple[int, Future]]: (認識器の番号, 処理)のリスト
+        """
+        self._submitted = time.perf_counter()
+        return [
+            (i, self._executor.submit(self._recognize, self.clients[i], audio_data))
+            for i in self._active
+        ]
+
+    def collect(self, futures: List[Tuple[int, Future]]) -> List[Dict]:
+        """submitした処理の完了を待ち、確定結果を返す。
+
+        Args:
+            futures (List[Tuple[int, Future]]): submitの戻り値
+
+        Returns:
+            List[Dict]: 確定した文法の結果（"grammar"に文法の名前を含む、空の結果は除く）
+        """
+        results = []
+        serial = 0.0
+        for i, future in futures:
+            name = self.names[i]
+            recognized, elapsed = future.result()
+            serial += elapsed
+            if recognized is not None and recognized["result"] != "":
+                results.append({"grammar": name, **recognized})
+        self.timings["wall"] = time.perf_counter() - self._submitted
+        self.timings["serial"] = serial
+        return results
+
+    def recognize(self, audio_data: Union[bytes, memoryview]) -> List[Dict]:
+        """全ての認識器で並列に認識する。
+
+        Args:
+            audio_data (Union[bytes, memoryview]): 音声データ
+
+        Returns:
+            List[Dict]: 確定した文法の結果（"grammar"に文法の名前を含む、空の結果は除く）
+        """
+        return self.collect(self.submit(audio_data))
+
+    def flush(self) -> List[Dict]:
+        """入力終端として全ての認識器の残りの音声を確定させる。
+
+        Returns:
+            List[Dict]: 確定した文法の結果（空の結果は除く）
+        """
+        results = []
+        futures = [
+            (i, self._executor.submit(self.clients[i].flush)) for i in self._active
+        ]
+        for i, future in futures:
+            recognized = future.result()
+            if recognized is not None and recognized["result"] != "":
+                results.append({"grammar": self.names[i], **recognized})
+        return results
+
+    def close(self) -> None:
+        """スレッドプールを停止する。"""
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _recognize(
+        client: VoskClient, audio_data: Union[bytes, memoryview]
+    ) -> Tuple[Optional[Dict], float]:
+        """1つの認識器で認識する。（スレッドプール上で実行）
+
+        Args:
+            client (VoskClient): 認識器
+            audio_data (Union[bytes, memoryview]): 音声データ
+
+        Returns:
+            Tuple[Optional[Dict], float]: (認識結果, 処理時間[sec])
+        """
+        start = time.perf_counter()
+        recognized = client.recognize(audio_data)
+        return recognized, time.perf_counter() - start
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+UNK: str = "[unk]"
+
+# 読み込み済みの語彙のキャッシュ（キーはwords.txtの(絶対パス, 最終更新時刻, サイズ)）
+_vocabulary_cache: Dict[Tuple[str, float, int], FrozenSet[str]] = {}
+_vocabulary_cache_lock = threading.Lock()
+
+
+class OovPolicy(Enum):
+    DROP: str = "drop"  # 語彙にない単語を含むエントリを除く
+    KEEP: str = "keep"  # 報告のみ行い、エントリは残す（認識器側で無視される）
+
+
+@dataclass
+class CompiledGrammar:
+    """認識器に渡す文法"""
+
+    # KaldiRecognizerに渡すJSON文字列（選択肢のリスト）
+    grammar: str
+    # 選択肢として採用したエントリ（単語・フレーズ）
+    phrases: List[str]
+    # 語彙になかった単語
+    oov_words: List[str]
+    # 語彙にない単語を含むため除いたエントリ数
+    dropped: int
+
+
+def find_words_txt(model_path: str) -> Optional[str]:
+    """モデルの語彙ファイル（words.txt）のパスを返す。
+
+    Args:
+        model_path (str): モデルのパス
+
+    Returns:
+        Optional[str]: words.txtのパス（見つからない場合はNone）
+    """
+    for path in [
+        os.path.join(model_path, "graph", "words.txt"),
+        os.path.join(model_path, "words.txt"),
+    ]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _vocabulary_key(path: str) -> Tuple[str, float, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime, stat.st_size
+
+
+def load_vocabulary(words_txt: str) -> FrozenSet[str]:
+    """words.txtを読み込み、単語の集合を返す。（更新されていない場合は読み込み済みのものを返す）
+
+    Args:
+        words_txt (str): words.txtのパス
+
+    Returns:
+        FrozenSet[str]: 単語の集合（<eps>や#0などの記号は除く）
+    """
+    key = _vocabulary_key(words_txt)
+    with _vocabulary_cache_lock:
+        vocabulary = _vocabulary_cache.get(key)
+        if vocabulary is None:
+            with open(words_txt, "r", encoding="utf-8") as f:
+                vocabulary = frozenset(
+                    word
+                    for word, _, _ in (line.partition(" ") for line in f)
+                    if word and word[0] not in "<#"
+                )
+            for old_key in [k for k in _vocabulary_cache if k[0] == key[0]]:
+                del _vocabulary_cache[old_key]
+            _vocabulary_cache[key] = vocabulary
+    return vocabulary
+
+
+def compile_grammar(
+    entries: Iterable[str],
+    vocabulary: Optional[FrozenSet[str]] = None,
+    policy: OovPolicy = OovPolicy.DROP,
+) -> CompiledGrammar:
+    """ワードリストを認識器用の文法へ変換する。
+
+    各エントリを1つの選択肢とし、空白を含むエントリは単語の並び（フレーズ）として扱う。
+
+    Args:
+        entries (Iterable[str]): ワード・フレーズのリスト
+        vocabulary (Optional[FrozenSet[str]], optional): モデルの語彙（Noneの場合は検証しない）. Defaults to None.
+        policy (OovPolicy, optional): 語彙にない単語を含むエントリの扱い. Defaults to OovPolicy.DROP.
+
+    Returns:
+        CompiledGrammar: 文法
+    """
+    phrases: Dict[str, None] = {}
+    oov_words: Dict[str, None] = {}
+    dropped = 0
+    for entry in entries:
+        words = entry.split()
+        if len(words) == 0 or words == [UNK]:
+            continue
+        if vocabulary is not None:
+            missing = [w for w in words if w not in vocabulary]
+            if missing:
+                oov_words.update(dict.fromkeys(missing))
+                if policy == OovPolicy.DROP:
+                    dropped += 1
+                    continue
+        phrases[" ".join(words)] = None
+    phrase_list = list(phrases)
+    return CompiledGrammar(
+        grammar=json.dumps(phrase_list + [UNK], ensure_ascii=False),
+        phrases=phrase_list,
+        oov_words=list(oov_words),
+        dropped=dropped,
+    )
+
+
+class GrammarCompiler:
+    def __init__(
+        self,
+        model_path: str,
+        cache_dir: Optional[str] = None,
+        policy: OovPolicy = OovPolicy.DROP,
+    ) -> None:
+        """Initialize
+
+        モデルの語彙で検証した文法を作成し、ワードリストの内容のハッシュをキーにディスクへ保存する。
+        キャッシュが有効な間はwords.txtを読み込まない。
+
+        Args:
+            model_path (str): モデルのパス
+            cache_dir (Optional[str], optional): キャッシュの保存先（Noneの場合は保存しない）. Defaults to None.
+            policy (OovPolicy, optional): 語彙にない単語を含むエントリの扱い. Defaults to OovPolicy.DROP.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.grammar")
+        self._words_txt = find_words_txt(model_path)
+        self._cache_dir = cache_dir
+        self._policy = policy
+        if self._words_txt is None:
+            self._logger.warning(
+                f"words.txt not found in {model_path}. grammar is not validated."
+            )
+
+    def compile(self, entries: List[str]) -> CompiledGrammar:
+        """ワードリストを文法へ変換する。（キャッシュがある場合はそれを返す）
+
+        Args:
+            entries (List[str]): ワード・フレーズのリスト
+
+        Returns:
+            CompiledGrammar: 文法
+        """
+        path = self._cache_path(entries)
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return CompiledGrammar(**json.load(f))
+            except (IOError, ValueError, TypeError) as e:
+                self._logger.warning(f"broken grammar cache {path}. {e}")
+
+        vocabulary = None
+        if self._words_txt is not None:
+            vocabulary = load_vocabulary(self._words_txt)
+        compiled = compile_grammar(entries, vocabulary, self._policy)
+        if compiled.oov_words:
+            self._logger.warning(
+                f"{len(compiled.oov_words)} words are not in the model vocabulary "
+                f"({compiled.dropped} entries dropped): {compiled.oov_words[:10]}"
+            )
+        if path is not None:
+            self._save(path, compiled)
+        return compiled
+
+    def _cache_path(self, entries: List[str]) -> Optional[str]:
+        """キャッシュファイルのパスを返す。
+
+        キーにはワードリストの他に、語彙ファイルの更新時刻と扱いの設定を含める。
+
+        Args:
+            entries (List[str]): ワード・フレーズのリスト
+
+        Returns:
+            Optional[str]: キャッシュファイルのパス（キャッシュを利用しない場合はNone）
+        """
+        if self._cache_dir is None:
+            return None
+        digest = hashlib.sha256()
+        if self._words_txt is not None:
+            digest.update(repr(_vocabulary_key(self._words_txt)).encode("utf-8"))
+        digest.update(self._policy.value.encode("utf-8"))
+        for entry in entries:
+            digest.update(b"\n")
+            digest.update(entry.encode("utf-8"))
+        return os.path.join(self._cache_dir, f"{digest.hexdigest()}.json")
+
+    def _save(self, path: str, compiled: CompiledGrammar) -> None:
+        """文法をキャッシュへ保存する。（書き込み途中のファイルを読まないよう置き換えで行う）
+
+        Args:
+            path (str): キャッシュファイルのパス
+            compiled (CompiledGrammar): 文法
+        """
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(compiled), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._logger.warning(f"failed to save grammar cache {path}. {e}")
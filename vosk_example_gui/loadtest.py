@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from vosk_example_gui.metrics import Histogram
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.server import HEADER_LENGTH, RecognitionServer
+
+
+async def open_connection(
+    address: Tuple,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """サーバへ接続する。
+
+    Args:
+        address (Tuple): TCPの場合は(host, port)、Unixドメインソケットの場合は(path,)
+
+    Returns:
+        Tuple[asyncio.StreamReader, asyncio.StreamWriter]: 受信側・送信側のストリーム
+    """
+    if len(address) == 1:
+        return await asyncio.open_unix_connection(address[0])
+    return await asyncio.open_connection(address[0], address[1])
+
+
+async def stream_file(
+    address: Tuple,
+    path: str,
+    words: List[str],
+    block_ms: float = 100.0,
+    realtime: bool = True,
+    partial: bool = False,
+    raw_sampling_rate: int = 16000,
+) -> Dict:
+    """ファイルをサーバへ流し、結果と所要時間を返す。
+
+    Args:
+        address (Tuple): サーバのアドレス
+        path (str): 流すWAV/raw PCMファイル
+        words (List[str]): 認識対象のワードリスト
+        block_ms (float, optional): 1回に送る長さ[msec]. Defaults to 100.0.
+        realtime (bool, optional): 実時間の速さで送るかどうか（Falseの場合はサーバが受け取れる限り速く送る）. Defaults to True.
+        partial (bool, optional): 途中認識結果を要求するかどうか. Defaults to False.
+        raw_sampling_rate (int, optional): raw PCMのサンプリングレート. Defaults to 16000.
+
+    Returns:
+        Dict: {"file", "results", "audio_sec", "elapsed_sec", "final_latency_ms", "first_partial_ms", "error"}
+    """
+    pcm = PcmFile(path, raw_sampling_rate)
+    reader, writer = await open_connection(address)
+    header = json.dumps(
+        {"sample_rate": pcm.sampling_rate, "words": words, "partial": partial},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    writer.write(HEADER_LENGTH.pack(len(header)) + header)
+
+    stats: Dict = {
+        "file": path,
+        "results": [],
+        "audio_sec": pcm.n_samples / pcm.sampling_rate,
+        "elapsed_sec": 0.0,
+        "final_latency_ms": None,
+        "first_partial_ms": None,
+        "error": None,
+    }
+    start = time.perf_counter()
+    sent_all: List[float] = []
+
+    async def send() -> None:
+        chunk_samples = max(1, int(pcm.sampling_rate * block_ms / 1000))
+        try:
+            for i, chunk in enumerate(pcm.iter_chunks(chunk_samples)):
+                if realtime:
+                    delay = start + i * block_ms / 1000 - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                writer.write(chunk)
+                # サーバが読み込みを止めている間はここで待たされる
+                await writer.drain()
+            writer.write_eof()
+        except ConnectionError:
+            pass
+        finally:
+            sent_all.append(time.perf_counter())
+            pcm.close()
+
+    sender = asyncio.get_running_loop().create_task(send())
+    try:
+        async for line in reader:
+            message = json.loads(line)
+            now = time.perf_counter()
+            if "error" in message:
+                stats["error"] = message["error"]
+                break
+            if "partial" in message:
+                if stats["first_partial_ms"] is None and message["partial"] != "":
+                    stats["first_partial_ms"] = (now - start) * 1000
+                continue
+            if message["result"] != "":
+                stats["results"].append(message)
+            if message.get("final"):
+                stats["final_latency_ms"] = (now - sent_all[0]) * 1000
+                break
+    finally:
+        sender.cancel()
+        writer.close()
+    stats["elapsed_sec"] = time.perf_counter() - start
+    return stats
+
+
+async def run_load_test(
+    address: Tuple,
+    files: List[str],
+    words: List[str],
+    connections: int = 4,
+    block_ms: float = 100.0,
+    realtime: bool = True,
+    partial: bool = False,
+    raw_sampling_rate: int = 16000,
+) -> Dict:
+    """複数の接続から同時にファイルを流し、集計結果を返す。
+
+    filesを順番に割り当て、connections本の接続を常に並行させる。
+
+    Args:
+        address (Tuple): サーバのアドレス
+        files (List[str]): 流すWAV/raw PCMファイルのリスト
+        words (List[str]): 認識対象のワードリスト
+        connections (int, optional): 同時接続数. Defaults to 4.
+        block_ms (float, optional): 1回に送る長さ[msec]. Defaults to 100.0.
+        realtime (bool, optional): 実時間の速さで送るかどうか. Defaults to True.
+        partial (bool, optional): 途中認識結果を要求するかどうか. Defaults to False.
+        raw_sampling_rate (int, optional): raw PCMのサンプリングレート. Defaults to 16000.
+
+    Returns:
+        Dict: 集計結果
+    """
+    logger = logging.getLogger("vosk_example_gui.loadtest")
+    final_latency = Histogram()
+    first_partial = Histogram()
+    remaining = list(reversed(files))
+    streams: List[Dict] = []
+    errors: Dict[str, int] = {}
+
+    async def client() -> None:
+        while remaining:
+            path = remaining.pop()
+            try:
+                stats = await stream_file(
+                    address,
+                    path,
+                    words,
+                    block_ms=block_ms,
+                    realtime=realtime,
+                    partial=partial,
+                    raw_sampling_rate=raw_sampling_rate,
+                )
+            except (OSError, ValueError) as e:
+                stats = {"file": path, "error": str(e)}
+            if stats["error"] is not None:
+                logger.warning(f"{path}: {stats['error']}")
+                errors[stats["error"]] = errors.get(stats["error"], 0) + 1
+                continue
+            streams.append(stats)
+            if stats["final_latency_ms"] is not None:
+                final_latency.record(stats["final_latency_ms"])
+            if stats["first_partial_ms"] is not None:
+                first_partial.record(stats["first_partial_ms"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(connections)])
+    elapsed = time.perf_counter() - start
+    audio_sec = sum(s["audio_sec"] for s in streams)
+    return {
+        "connections": connections,
+        "realtime": realtime,
+        "streams": len(streams),
+        "errors": errors,
+        "results": sum(len(s["results"]) for s in streams),
+        "audio_sec": audio_sec,
+        "elapsed_sec": elapsed,
+        # 1秒あたりに処理できた音声の秒数（実時間の何倍で処理できたか）
+        "throughput": audio_sec / elapsed if elapsed > 0 else 0.0,
+        "final_latency_ms": final_latency.snapshot(),
+        "first_partial_ms": first_partial.snapshot(),
+    }
+
+
+async def run_loopback(
+    model_path: str,
+    files: List[str],
+    words: List[str],
+    max_connections: int = 8,
+    workers: Optional[int] = None,
+    **kwargs: Any,
+) -> Dict:
+    """同じプロセス内でサーバを起動し、ループバックで負荷試験を行う。
+
+    Args:
+        model_path (str): モデルのパス
+        files (List[str]): 流すWAV/raw PCMファイルのリスト
+        words (List[str]): 認識対象のワードリスト
+        max_connections (int, optional): サーバの最大同時接続数. Defaults to 8.
+        workers (Optional[int], optional): サーバの認識処理のスレッド数. Defaults to None.
+        **kwargs: run_load_testへ渡す引数
+
+    Returns:
+        Dict: 集計結果
+    """
+    server = RecognitionServer(
+        model_path, port=0, max_connections=max_connections, workers=workers
+    )
+    await server.start()
+    try:
+        return await run_load_test(server.address, files, words, **kwargs)
+    finally:
+        await server.close()
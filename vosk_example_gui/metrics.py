@@ -0,0 +1,170 @@
+import bisect
+import json
+import math
+import threading
+from typing import Dict, List, Optional
+
+
+def _log_bounds(lowest: float, highest: float, factor: float) -> List[float]:
+    """等比の区間境界を作成する。
+
+    Args:
+        lowest (float): 最小の境界
+        highest (float): 最大の境界
+        factor (float): 隣り合う境界の比
+
+    Returns:
+        List[float]: 区間境界
+    """
+    n = int(math.ceil(math.log(highest / lowest, factor))) + 1
+    return [lowest * factor**i for i in range(n)]
+
+
+# 0.05ms～60sを約25%刻みで区切る（ヒストグラムの値はすべてmsec）
+DEFAULT_BOUNDS: List[float] = _log_bounds(0.05, 60000.0, 1.25)
+
+
+class Histogram:
+    def __init__(self, bounds: Optional[List[float]] = None) -> None:
+        """Initialize
+
+        区間を固定したヒストグラム。記録はO(log 区間数)で、メモリ使用量は一定。
+
+        Args:
+            bounds (Optional[List[float]], optional): 区間境界（昇順）. Defaults to None.
+        """
+        self._bounds = bounds if bounds is not None else DEFAULT_BOUNDS
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, value: float) -> None:
+        """値を記録する。
+
+        Args:
+            value (float): 記録する値
+        """
+        i = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q: float) -> float:
+        """パーセンタイル値（区間の上端）を返す。
+
+        Args:
+            q (float): 0～100のパーセンタイル
+
+        Returns:
+            float: パーセンタイル値（記録がない場合は0）
+        """
+        if self.count == 0:
+            return 0.0
+        target = self.count * q / 100
+        cumulative = 0
+        for i, c in enumerate(self._counts):
+            cumulative += c
+            if cumulative >= target and c > 0:
+                if i < len(self._bounds):
+                    return min(self._bounds[i], self.max)
+                return self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        """平均値"""
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def reset(self) -> None:
+        """記録を消去する。"""
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def snapshot(self) -> Dict:
+        """集計値を返す。
+
+        Returns:
+            Dict: count/mean/p50/p95/p99/max
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    def __init__(self) -> None:
+        """Initialize
+
+        名前付きのヒストグラム・ゲージを保持するレジストリ。
+        """
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        """ヒストグラムを返す。（存在しない場合は作成する）
+
+        Args:
+            name (str): 名前
+
+        Returns:
+            Histogram: ヒストグラム
+        """
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, Histogram())
+        return hist
+
+    def record(self, name: str, value: float) -> None:
+        """ヒストグラムに値を記録する。
+
+        Args:
+            name (str): 名前
+            value (float): 記録する値
+        """
+        self.histogram(name).record(value)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """ゲージの値を設定する。
+
+        Args:
+            name (str): 名前
+            value (float): 値
+        """
+        self._gauges[name] = value
+
+    def snapshot(self) -> Dict:
+        """全てのヒストグラム・ゲージの集計値を返す。
+
+        Returns:
+            Dict: {"histograms": {名前: 集計値}, "gauges": {名前: 値}}
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {
+            "histograms": {k: v.snapshot() for k, v in sorted(histograms.items())},
+            "gauges": dict(sorted(self._gauges.items())),
+        }
+
+    def dump_json(self, path: str) -> None:
+        """集計値をJSONファイルへ書き出す。
+
+        Args:
+            path (str): 出力先のパス
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+# アプリケーション全体で共有するレジストリ
+registry = Metrics()
@@ -0,0 +1,65 @@
+import os
+import wave
+from typing import IO, Iterator, Optional
+
+SAMPLE_WIDTH: int = 2  # int16
+
+
+class PcmFile:
+    def __init__(self, path: str, raw_sampling_rate: int) -> None:
+        """WAV/raw PCMファイルを開く。
+
+        Args:
+            path (str): 対象のファイルパス
+            raw_sampling_rate (int): 拡張子が.wavでない場合に仮定するサンプリングレート
+        """
+        self._wave: Optional[wave.Wave_read] = None
+        self._raw: Optional[IO[bytes]] = None
+        if os.path.splitext(path)[1].lower() == ".wav":
+            self._wave = wave.open(path, "rb")
+            channels = self._wave.getnchannels()
+            if channels != 1 or self._wave.getsampwidth() != SAMPLE_WIDTH:
+                self._wave.close()
+                raise ValueError(f"{path} is not mono 16bit PCM.")
+            self.sampling_rate = self._wave.getframerate()
+            self.n_samples = self._wave.getnframes()
+        else:
+            self._raw = open(path, "rb")
+            self.sampling_rate = raw_sampling_rate
+            self.n_samples = os.path.getsize(path) // SAMPLE_WIDTH
+
+    def read(self, n_samples: int) -> bytes:
+        """PCMをn_samples分読み出す。
+
+        Args:
+            n_samples (int): 読み出すサンプル数
+
+        Returns:
+            bytes: PCMデータ（終端の場合は空）
+        """
+        if self._wave is not None:
+            return self._wave.readframes(n_samples)
+        assert self._raw is not None
+        return self._raw.read(n_samples * SAMPLE_WIDTH)
+
+    def iter_chunks(self, chunk_samples: int) -> Iterator[bytes]:
+        """PCMをchunk_samples毎に読み出す。
+
+        Args:
+            chunk_samples (int): 1回に読み出すサンプル数
+
+        Yields:
+            Iterator[bytes]: PCMデータ
+        """
+        while True:
+            data = self.read(chunk_samples)
+            if not data:
+                break
+            yield data
+
+    def close(self) -> None:
+        """ファイルを閉じる。"""
+        if self._wave is not None:
+            self._wave.close()
+        if self._raw is not None:
+            self._raw.close()
@@ -0,0 +1,163 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import IO, Deque, Dict, Iterable, Iterator, List, Optional, Set
+
+from vosk_example_gui.batch import BatchTranscriber, FileResult, write_results
+from vosk_example_gui.config import DEFAULT_CHUNK_SAMPLES
+from vosk_example_gui.word_timing import WordTimeline
+
+# ワーカープロセス毎に1つだけ保持するTranscriber（モデルはプロセス起動時に1度だけ読み込む）
+_transcriber: Optional[BatchTranscriber] = None
+
+
+def _init_worker(
+    model_path: str,
+    word_list: List,
+    chunk_samples: int,
+    raw_sampling_rate: int,
+    word_timings: bool,
+) -> None:
+    """ワーカープロセスの初期化処理
+
+    Args:
+        model_path (str): 利用するモデルのパス
+        word_list (List): 認識対象のワードリスト
+        chunk_samples (int): 1回に認識器へ渡すサンプル数
+        raw_sampling_rate (int): raw PCMのサンプリングレート
+        word_timings (bool): 結果に単語毎の時刻情報を含めるかどうか
+    """
+    global _transcriber
+    _transcriber = BatchTranscriber(
+        model_path,
+        word_list,
+        chunk_samples=chunk_samples,
+        raw_sampling_rate=raw_sampling_rate,
+        word_timings=word_timings,
+    )
+
+
+def _transcribe(path: str) -> FileResult:
+    """ワーカープロセス上で1ファイルを認識する。
+
+    Args:
+        path (str): 対象のファイルパス
+
+    Returns:
+        FileResult: (ファイルパス, 発話毎の認識結果, 音声長[sec], エラー内容)
+    """
+    assert _transcriber is not None
+    return _transcriber.try_transcribe(path)
+
+
+class TranscribePool:
+    def __init__(
+        self,
+        model_path: str,
+        word_list: Optional[List] = None,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        chunk_samples: int = DEFAULT_CHUNK_SAMPLES,
+        raw_sampling_rate: int = 16000,
+        word_timings: bool = False,
+    ) -> None:
+        """Initialize
+
+        Args:
+            model_path (str): 利用するモデルのパス
+            word_list (Optional[List], optional): 認識対象のワードリスト. Defaults to None.
+            workers (Optional[int], optional): ワーカープロセス数（Noneの場合はCPUコア数）. Defaults to None.
+            max_pending (Optional[int], optional): 同時に投入する最大ファイル数（Noneの場合はworkers*2）. Defaults to None.
+            chunk_samples (int, optional): 1回に認識器へ渡すサンプル数. Defaults to DEFAULT_CHUNK_SAMPLES.
+            raw_sampling_rate (int, optional): raw PCMのサンプリングレート. Defaults to 16000.
+            word_timings (bool, optional): 結果に単語毎の時刻情報を含めるかどうか（単語IDは受け取り側のプロセスで振り直す）. Defaults to False.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.pool")
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.max_pending = max_pending if max_pending is not None else self.workers * 2
+        if self.max_pending < self.workers:
+            raise ValueError("max_pending must be greater than or equal to workers.")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(
+                model_path,
+                word_list if word_list is not None else [],
+                chunk_samples,
+                raw_sampling_rate,
+                word_timings,
+            ),
+        )
+        self._logger.info(f"workers: {self.workers}, max pending: {self.max_pending}")
+
+    def __enter__(self) -> "TranscribePool":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ワーカープロセスを終了する。"""
+        self._executor.shutdown(wait=True)
+
+    def imap(self, paths: Iterable[str], ordered: bool = True) -> Iterator[FileResult]:
+        """ファイルを並列に認識し、結果を順に返す。
+
+        投入済みで未回収のファイル数がmax_pendingを超えないよう、入力の読み出しを待たせる。
+
+        Args:
+            paths (Iterable[str]): 対象のファイルパス
+            ordered (bool, optional): Trueの場合は入力順、Falseの場合は完了順に返す. Defaults to True.
+
+        Yields:
+            Iterator[FileResult]: (ファイルパス, 発話毎の認識結果, 音声長[sec], エラー内容)
+        """
+        if ordered:
+            yield from self._imap_ordered(iter(paths))
+        else:
+            yield from self._imap_unordered(iter(paths))
+
+    def run(
+        self,
+        paths: Iterable[str],
+        out: IO[str],
+        ordered: bool = True,
+        timeline: Optional[WordTimeline] = None,
+    ) -> Dict:
+        """複数ファイルを並列に認識し、結果をJSONLで書き出す。
+
+        Args:
+            paths (Iterable[str]): 対象のファイルパス
+            out (IO[str]): JSONLの出力先
+            ordered (bool, optional): Trueの場合は入力順に書き出す. Defaults to True.
+            timeline (Optional[WordTimeline], optional): 単語の時刻情報をまとめる先. Defaults to None.
+
+        Returns:
+            Dict: スループット情報（real time factor, files/sec）
+        """
+        stats = write_results(self.imap(paths, ordered), out, timeline)
+        stats["workers"] = self.workers
+        return stats
+
+    def _imap_ordered(self, paths: Iterator[str]) -> Iterator[FileResult]:
+        pending: Deque[Future] = deque()
+        for path in paths:
+            pending.append(self._executor.submit(_transcribe, path))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _imap_unordered(self, paths: Iterator[str]) -> Iterator[FileResult]:
+        pending: Set[Future] = set()
+        for path in paths:
+            pending.add(self._executor.submit(_transcribe, path))
+            if len(pending) >= self.max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
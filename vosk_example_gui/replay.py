@@ -0,0 +1,193 @@
+import logging
+import math
+import os
+import threading
+import time
+import wave
+from typing import Any, Dict, Optional, Tuple
+
+from vosk_example_gui.block_queue import BlockQueue, OverflowPolicy
+from vosk_example_gui.config import AUDIO_QUEUE_SEC, BLOCK_SIZE
+from vosk_example_gui.pcm import PcmFile
+from vosk_example_gui.source import AudioSource
+
+
+class ReplaySource(AudioSource):
+    def __init__(
+        self,
+        path: str,
+        realtime: bool = True,
+        loop: bool = False,
+        raw_sampling_rate: int = 16000,
+        block_size: int = BLOCK_SIZE,
+        block_ms: Optional[float] = None,
+        channels: int = 1,
+        overflow_policy: Optional[OverflowPolicy] = None,
+    ) -> None:
+        """Initialize
+
+        録音済みのWAV/raw PCMを、マイク入力と同じキュー経由で流す入力ソース。
+
+        Args:
+            path (str): 再生するWAV/raw PCMファイルのパス
+            realtime (bool, optional): Trueの場合は実時間の速度、Falseの場合は可能な限り速く流す. Defaults to True.
+            loop (bool, optional): 終端に達したら先頭から繰り返すかどうか. Defaults to False.
+            raw_sampling_rate (int, optional): raw PCMのサンプリングレート. Defaults to 16000.
+            block_size (int, optional): 1ブロックのサンプル数. Defaults to BLOCK_SIZE.
+            block_ms (Optional[float], optional): 1ブロックの長さ[msec]（指定した場合はblock_sizeより優先）. Defaults to None.
+            channels (int, optional): 入力チャンネル数. Defaults to 1.
+            overflow_policy (Optional[OverflowPolicy], optional): キューに空きがない場合の動作（実時間で流さない場合はBLOCKも利用可能）. Defaults to None.
+        """
+        super().__init__(
+            block_size=block_size,
+            block_ms=block_ms,
+            channels=channels,
+            overflow_policy=overflow_policy,
+        )
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self._raw_sampling_rate = raw_sampling_rate
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # 最後まで流し終えたことを示すイベント
+        self.finished = threading.Event()
+
+    def start_streaming(self, dev_id: Optional[int] = None) -> None:
+        """Streamingを開始する
+
+        Args:
+            dev_id (Optional[int], optional): 利用しない（デバイスとの互換のため）. Defaults to None.
+        """
+        if self.is_streaming:
+            self.stop()
+        f = PcmFile(self.path, self._raw_sampling_rate)
+        f.close()
+        self._configure(f.sampling_rate, 1)
+        self._logger.info(
+            f"replay: {self.path}, sampling_rate: {self._sampling_rate}, "
+            f"block_size: {self.block_size}, realtime: {self.realtime}"
+        )
+        self.start()
+
+    def get_input_devices(self) -> Tuple[Dict, int]:
+        """入力デバイスの情報を返す（再生するファイルのみ）
+
+        Returns:
+            Tuple[Dict, int]: (入力デバイス情報, デフォルトデバイスIndex)
+        """
+        return {os.path.basename(self.path): 0}, 0
+
+    def _start_stream(self) -> None:
+        """再生スレッドを開始する。"""
+        self._stop_event.clear()
+        self.finished.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ReplaySource", daemon=True
+        )
+        self._thread.start()
+
+    def _stop_stream(self) -> None:
+        """再生スレッドを停止する。"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """ファイルをブロック毎に読み出し、コールバックと同じ経路で流す。"""
+        block_sec = self.block_size / self._sampling_rate
+        start = time.perf_counter()
+        n_blocks = 0
+        while not self._stop_event.is_set():
+            f = PcmFile(self.path, self._raw_sampling_rate)
+            try:
+                for data in f.iter_chunks(self.block_size):
+                    if self._stop_event.is_set():
+                        break
+                    if self.realtime:
+                        # 実時間に合わせて、ブロックが溜まる時刻まで待つ
+                        wait = start + (n_blocks + 1) * block_sec - time.perf_counter()
+                        if wait > 0 and self._stop_event.wait(wait):
+                            break
+                    self._push_block(data)
+                    n_blocks += 1
+            finally:
+                f.close()
+            if not self.loop:
+                break
+        self.finished.set()
+        self._logger.info(f"replay finished. blocks: {n_blocks}")
+
+
+class Recorder:
+    def __init__(
+        self,
+        path: str,
+        sampling_rate: int,
+        channels: int = 1,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        """Initialize
+
+        入力ソースに届いたブロックをWAVファイルへ保存する。
+        書き込みは別スレッドで行い、入力のコールバックを待たせない。
+        書き込み待ちのブロックは事前に確保したAUDIO_QUEUE_SEC秒分のスロットへコピーし、
+        書き込みが追いつかない場合は古いものから破棄する（数はdroppedで参照できる）。
+
+        Args:
+            path (str): 保存先のWAVファイルのパス
+            sampling_rate (int): サンプリングレート
+            channels (int, optional): チャンネル数. Defaults to 1.
+            block_size (int, optional): 1ブロックのサンプル数（これより大きいブロックは分割して保持する）. Defaults to BLOCK_SIZE.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.replay")
+        self.path = path
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self._wave = wave.open(path, "wb")
+        self._wave.setnchannels(channels)
+        self._wave.setsampwidth(2)
+        self._wave.setframerate(sampling_rate)
+        n_slots = max(2, math.ceil(AUDIO_QUEUE_SEC * sampling_rate / block_size))
+        self._q = BlockQueue(n_slots, block_size * channels * 2)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="Recorder", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, data: Any) -> None:
+        """ブロックを書き込み待ちに追加する。
+
+        Args:
+            data (Any): int16 PCM（バッファプロトコルに対応したもの）
+        """
+        view = memoryview(data).cast("B")
+        block_bytes = self._q.block_bytes
+        for i in range(0, len(view), block_bytes):
+            self._q.put(view[i : i + block_bytes])
+
+    @property
+    def dropped(self) -> int:
+        """書き込みが追いつかずに破棄したブロック数"""
+        return self._q.dropped
+
+    def close(self) -> None:
+        """書き込み待ちのブロックを全て書き込んでファイルを閉じる。"""
+        self._closed.set()
+        self._thread.join()
+        self._wave.close()
+        self._logger.info(f"recorded to {self.path}, dropped blocks: {self.dropped}")
+
+    def _run(self) -> None:
+        """書き込み待ちのブロックをファイルへ書き込み続ける。"""
+        while True:
+            data = self._q.get(timeout=0.1)
+            if data is None:
+                # closeの後は、書き込み待ちがなくなった時点で終了する
+                if self._closed.is_set():
+                    break
+                continue
+            self._wave.writeframesraw(data)
+        self._q.release()
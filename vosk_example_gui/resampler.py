@@ -0,0 +1,102 @@
+import math
+from typing import Union
+
+import numpy as np
+
+
+def design_polyphase_filter(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """ポリフェーズ分解したローパスフィルタ（Kaiser窓のsinc）を作成する。
+
+    Args:
+        up (int): アップサンプリング倍率
+        down (int): ダウンサンプリング倍率
+        taps_per_phase (int): 1フェーズあたりのタップ数
+
+    Returns:
+        np.ndarray: shape=(up, taps_per_phase)のフィルタ係数（入力の古い順に並べ替え済み）
+    """
+    n_taps = up * taps_per_phase
+    # アップサンプル後のサンプリングレートで正規化したカットオフ周波数
+    cutoff = 0.5 / max(up, down)
+    k = np.arange(n_taps) - (n_taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * k) * np.kaiser(n_taps, 8.0) * up
+    # poly[p, i] = h[p + i * up]（iは新しい入力からの遡り数）
+    poly = h.reshape(taps_per_phase, up).T
+    return np.ascontiguousarray(poly[:, ::-1], dtype=np.float32)
+
+
+class Resampler:
+    def __init__(
+        self,
+        input_rate: int,
+        output_rate: int,
+        channels: int = 1,
+        taps_per_phase: int = 0,
+    ) -> None:
+        """Initialize
+
+        ブロック間でフィルタの状態を引き継ぐ、ストリーミング用のリサンプラ。
+        マルチチャンネルの入力はモノラルへミックスダウンする。
+
+        Args:
+            input_rate (int): 入力のサンプリングレート
+            output_rate (int): 出力のサンプリングレート
+            channels (int, optional): 入力のチャンネル数. Defaults to 1.
+            taps_per_phase (int, optional): 1フェーズあたりのタップ数（0の場合は変換比から決める）. Defaults to 0.
+        """
+        g = math.gcd(input_rate, output_rate)
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.channels = channels
+        self._up = output_rate // g
+        self._down = input_rate // g
+        if taps_per_phase <= 0:
+            taps_per_phase = 24 * max(1, math.ceil(self._down / self._up))
+        self._taps = taps_per_phase
+        self._poly = design_polyphase_filter(self._up, self._down, taps_per_phase)
+        self._offsets = np.arange(-taps_per_phase + 1, 1)
+        self.reset()
+
+    @property
+    def is_passthrough(self) -> bool:
+        """変換が不要かどうか"""
+        return self._up == self._down and self.channels == 1
+
+    def reset(self) -> None:
+        """ブロック間で引き継いでいる状態を初期化する。"""
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+        # 次の出力サンプルの、バッファ先頭を基準としたアップサンプル後の時刻
+        self._next_t = (self._taps - 1) * self._up
+
+    def process(self, data: Union[bytes, memoryview]) -> np.ndarray:
+        """1ブロック分のint16 PCMを変換する。
+
+        Args:
+            data (Union[bytes, memoryview]): インターリーブされたint16 PCM
+
+        Returns:
+            np.ndarray: 変換後のモノラルint16 PCM
+        """
+        pcm = np.frombuffer(data, dtype=np.int16)
+        if self.channels > 1:
+            mono = pcm.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            mono = pcm.astype(np.float32)
+        if self._up == self._down:
+            return mono.astype(np.int16)
+
+        buf = np.concatenate((self._history, mono))
+        end_t = len(buf) * self._up
+        t = np.arange(self._next_t, end_t, self._down)
+        if len(t) > 0:
+            base, phase = np.divmod(t, self._up)
+            frames = buf[base[:, None] + self._offsets[None, :]]
+            out = np.einsum("ij,ij->i", frames, self._poly[phase])
+            self._next_t = int(t[-1]) + self._down
+        else:
+            out = np.empty(0, dtype=np.float32)
+
+        consumed = len(buf) - (self._taps - 1)
+        self._next_t -= consumed * self._up
+        self._history = buf[consumed:].copy()
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity: int, dtype: type = np.int16) -> None:
+        """Initialize
+
+        同じデータを2重に書き込むことで、最新capacity分を常に連続したビューとして読み出せる。
+
+        Args:
+            capacity (int): 保持するサンプル数
+            dtype (type, optional): データ型. Defaults to np.int16.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        self.capacity = capacity
+        self._buf = np.zeros(capacity * 2, dtype=dtype)
+        self._pos = 0
+        # これまでに書き込まれた総サンプル数
+        self.written = 0
+
+    def write(self, data: np.ndarray) -> None:
+        """データを追記する。（メモリ確保は行わない）
+
+        Args:
+            data (np.ndarray): 追記するデータ
+        """
+        cap = self.capacity
+        n = len(data)
+        if n > cap:
+            data = data[n - cap :]
+            self.written += n - cap
+            n = cap
+
+        pos = self._pos
+        head = min(n, cap - pos)
+        self._buf[pos : pos + head] = data[:head]
+        self._buf[pos + cap : pos + cap + head] = data[:head]
+        if head < n:
+            tail = n - head
+            self._buf[:tail] = data[head:]
+            self._buf[cap : cap + tail] = data[head:]
+        self._pos = (pos + n) % cap
+        self.written += n
+
+    def view(self) -> np.ndarray:
+        """最新capacity分のデータを古い順に並んだビューとして返す。（コピーは行わない）
+
+        Returns:
+            np.ndarray: 読み取り専用のビュー
+        """
+        pos = self._pos
+        view = self._buf[pos : pos + self.capacity]
+        view.flags.writeable = False
+        return view
+
+    def clear(self) -> None:
+        """データを消去する。"""
+        self._buf[:] = 0
+        self._pos = 0
+        self.written = 0
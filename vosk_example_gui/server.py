@@ -0,0 +1,264 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from vosk_example_gui.metrics import registry
+from vosk_example_gui.pcm import SAMPLE_WIDTH
+from vosk_example_gui.vosk_client import VoskClient, load_cached_model
+from vosk_example_gui.word_timing import json_default
+
+# 接続直後にクライアントが送るヘッダ（ワードリストを含むJSON）の長さの形式と最大長
+HEADER_LENGTH = struct.Struct(">I")
+MAX_HEADER_BYTES: int = 16 << 20
+
+
+class RecognitionServer:
+    def __init__(
+        self,
+        model_path: str,
+        host: str = "127.0.0.1",
+        port: int = 2700,
+        unix_path: Optional[str] = None,
+        max_connections: int = 8,
+        workers: Optional[int] = None,
+        block_ms: float = 100.0,
+        max_pending_blocks: int = 8,
+    ) -> None:
+        """Initialize
+
+        1つのモデルを複数のクライアントで共有する、ローカル向けのストリーミング認識サーバ。
+
+        プロトコル:
+        1. クライアントは接続後、4byte（ビッグエンディアン）の長さに続けてJSONのヘッダを送る。
+           {"sample_rate": 16000, "words": ["..."], "partial": false, "partial_conf": false,
+            "word_timings": false}
+           （ワードリストが大きくても受信バッファの上限を上げずに済むよう、改行区切りにしない）
+        2. 続けてモノラル16bitのraw PCMを送り、送信を終えたら書き込み側を閉じる。
+        3. サーバは改行区切りのJSONを返す。途中認識結果は{"partial": "..."}、確定結果は
+           VoskClientと同じ{"result": "...", "partial_conf": [...]}（word_timingsを指定した
+           場合は"words"に単語毎の時刻を含む）、入力終端の結果には
+           "final": trueが付く。エラーの場合は{"error": "..."}を返して切断する。
+
+        Args:
+            model_path (str): モデルのパス
+            host (str, optional): 待ち受けるアドレス. Defaults to "127.0.0.1".
+            port (int, optional): 待ち受けるポート. Defaults to 2700.
+            unix_path (Optional[str], optional): 指定した場合はTCPの代わりにUnixドメインソケットで待ち受ける. Defaults to None.
+            max_connections (int, optional): 同時に認識する最大接続数（超えた接続は拒否する）. Defaults to 8.
+            workers (Optional[int], optional): 認識処理のスレッド数（Noneの場合はCPUコア数）. Defaults to None.
+            block_ms (float, optional): 認識器へ渡す1ブロックの長さ[msec]. Defaults to 100.0.
+            max_pending_blocks (int, optional): 接続毎に認識待ちで保持する最大ブロック数（超えるとソケットの読み込みを止める）. Defaults to 8.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.server")
+        self._model_path = model_path
+        self._host = host
+        self._port = port
+        self._unix_path = unix_path
+        self._max_connections = max_connections
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers if workers is not None else (os.cpu_count() or 1),
+            thread_name_prefix="ServerRecognize",
+        )
+        self._block_ms = block_ms
+        self._max_pending_blocks = max_pending_blocks
+        self._active = 0
+        self._rejected = 0
+        self._next_id = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """モデルを読み込み、待ち受けを開始する。"""
+        loop = asyncio.get_running_loop()
+        # 全ての接続で共有するモデルを先に読み込んでおく
+        await loop.run_in_executor(self._executor, load_cached_model, self._model_path)
+        if self._unix_path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=self._unix_path
+            )
+            self._logger.info(f"listening on {self._unix_path}")
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, self._host, self._port
+            )
+            self._logger.info(f"listening on {self._host}:{self._port}")
+
+    @property
+    def address(self) -> Tuple:
+        """待ち受けているアドレス（port=0で起動した場合に割り当てられたポートを知るために用いる）
+
+        Returns:
+            Tuple: TCPの場合は(host, port)、Unixドメインソケットの場合は(path,)
+        """
+        if self._server is None or not self._server.sockets:
+            return ()
+        name = self._server.sockets[0].getsockname()
+        return (name,) if isinstance(name, str) else tuple(name[:2])
+
+    async def serve_forever(self) -> None:
+        """待ち受けを開始し、停止されるまで接続を処理する。"""
+        await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """待ち受けを停止する。"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """1つの接続を処理する。
+
+        Args:
+            reader (asyncio.StreamReader): 受信側のストリーム
+            writer (asyncio.StreamWriter): 送信側のストリーム
+        """
+        conn_id = self._next_id
+        self._next_id += 1
+        if self._active >= self._max_connections:
+            self._logger.warning(f"[{conn_id}] rejected. too many connections.")
+            self._rejected += 1
+            registry.set_gauge("server.rejected", self._rejected)
+            await self._send(writer, {"error": "too many connections"})
+            writer.close()
+            return
+
+        self._active += 1
+        registry.set_gauge("server.active", self._active)
+        try:
+            await self._recognize_stream(conn_id, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            self._logger.info(f"[{conn_id}] disconnected. {e}")
+        except Exception as e:
+            self._logger.error(f"[{conn_id}] {e}")
+            try:
+                await self._send(writer, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            self._active -= 1
+            registry.set_gauge("server.active", self._active)
+            writer.close()
+
+    async def _recognize_stream(
+        self,
+        conn_id: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """ヘッダを読み込み、PCMの受信と認識を並行して行う。
+
+        Args:
+            conn_id (int): 接続番号（ログの識別に用いる）
+            reader (asyncio.StreamReader): 受信側のストリーム
+            writer (asyncio.StreamWriter): 送信側のストリーム
+        """
+        loop = asyncio.get_running_loop()
+        (header_bytes,) = HEADER_LENGTH.unpack(
+            await reader.readexactly(HEADER_LENGTH.size)
+        )
+        if header_bytes > MAX_HEADER_BYTES:
+            raise ValueError(f"header is too large. ({header_bytes} bytes)")
+        header = json.loads(await reader.readexactly(header_bytes))
+        sampling_rate = int(header.get("sample_rate", 16000))
+        words = [str(w) for w in header.get("words", [])]
+        send_partial = bool(header.get("partial", False))
+
+        vosk = VoskClient(
+            track_partial_conf=bool(header.get("partial_conf", False)),
+            word_timings=bool(header.get("word_timings", False)),
+        )
+        await loop.run_in_executor(
+            self._executor,
+            vosk.initialize_model,
+            words,
+            sampling_rate,
+            self._model_path,
+        )
+        self._logger.info(
+            f"[{conn_id}] start. rate: {sampling_rate}, words: {len(words)}, "
+            f"active: {self._active}"
+        )
+
+        # 認識待ちのブロックが溜まるとputが待たされ、ソケットの読み込みが止まる（TCPのフロー制御で送信側も止まる）
+        blocks: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(
+            self._max_pending_blocks
+        )
+        block_bytes = max(1, int(sampling_rate * self._block_ms / 1000)) * SAMPLE_WIDTH
+        receiver = loop.create_task(self._receive(reader, blocks, block_bytes))
+        try:
+            last_partial = ""
+            while True:
+                data = await blocks.get()
+                if data is None:
+                    break
+                recognized = await loop.run_in_executor(
+                    self._executor, vosk.recognize, data
+                )
+                if recognized is not None:
+                    last_partial = ""
+                    await self._send(writer, recognized)
+                elif send_partial:
+                    # 途中認識結果の取得（JSONの解析）もイベントループの外で行う
+                    partial = await loop.run_in_executor(
+                        self._executor, lambda: vosk.partial_text
+                    )
+                    if partial != last_partial:
+                        last_partial = partial
+                        await self._send(writer, {"partial": partial})
+            recognized = await loop.run_in_executor(self._executor, vosk.flush)
+            await self._send(writer, {**(recognized or {"result": ""}), "final": True})
+            self._logger.info(f"[{conn_id}] finished.")
+        finally:
+            receiver.cancel()
+
+    async def _receive(
+        self,
+        reader: asyncio.StreamReader,
+        blocks: "asyncio.Queue[Optional[bytes]]",
+        block_bytes: int,
+    ) -> None:
+        """PCMをブロック単位に区切ってキューへ渡す。（終端ではNoneを渡す）
+
+        Args:
+            reader (asyncio.StreamReader): 受信側のストリーム
+            blocks (asyncio.Queue[Optional[bytes]]): 認識待ちのブロックのキュー
+            block_bytes (int): 1ブロックのバイト数
+        """
+        pending = b""
+        while True:
+            try:
+                data = await reader.read(block_bytes)
+            except ConnectionError:
+                # 切断された場合は受信済みの分で終える（結果の送信時に切断が検出される）
+                break
+            if not data:
+                break
+            pending += data
+            if len(pending) >= block_bytes:
+                # 奇数バイトで途切れたサンプルは次のブロックへ回す
+                n = len(pending) - len(pending) % SAMPLE_WIDTH
+                await blocks.put(pending[:n])
+                pending = pending[n:]
+        if pending:
+            await blocks.put(pending[: len(pending) - len(pending) % SAMPLE_WIDTH])
+        await blocks.put(None)
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict) -> None:
+        """JSONを1行送信する。（送信バッファが溢れている場合は空くまで待つ）
+
+        Args:
+            writer (asyncio.StreamWriter): 送信側のストリーム
+            message (Dict): 送信する内容
+        """
+        line = json.dumps(message, ensure_ascii=False, default=json_default)
+        writer.write(line.encode("utf-8") + b"\n")
+        await writer.drain()
@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from vosk_example_gui.source import AudioSource
+from vosk_example_gui.spotter import KeywordHit
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.worker import RecognizeWorker
+
+
+class Session:
+    def __init__(
+        self, name: str, audio: AudioSource, vosk: VoskClient, worker: RecognizeWorker
+    ) -> None:
+        """Initialize
+
+        Args:
+            name (str): セッション名（入力デバイス名）
+            audio (AudioSource): 入力元のAudioSourceインスタンス
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス
+            worker (RecognizeWorker): ブロック毎の処理を行うワーカー
+        """
+        self.name = name
+        self.audio = audio
+        self.vosk = vosk
+        self.worker = worker
+        # ワーカープールに処理を投入済みかどうか
+        self.scheduled = False
+
+
+class SessionManager:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        poll_timeout: float = 0.1,
+        report_interval: float = 5.0,
+    ) -> None:
+        """Initialize
+
+        複数の入力ストリームを同時に認識する。ストリーム毎の処理はスレッドプール上で
+        1ストリームにつき同時に1つまで実行する。（voskのデコード中はGILが解放される）
+
+        Args:
+            workers (Optional[int], optional): ワーカースレッド数（Noneの場合はCPUコア数）. Defaults to None.
+            poll_timeout (float, optional): ブロック到着を待つ最大時間[sec]. Defaults to 0.1.
+            report_interval (float, optional): ストリーム毎の統計をログ出力する間隔[sec]. Defaults to 5.0.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.session")
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="Recognize"
+        )
+        self._poll_timeout = poll_timeout
+        self._report_interval = report_interval
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.sessions: List[Session] = []
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="SessionDispatcher", daemon=True
+        )
+
+    def add_session(
+        self,
+        name: str,
+        audio: AudioSource,
+        vosk: VoskClient,
+        on_result: Callable[[Dict], None],
+        on_partial: Optional[Callable[[str], None]] = None,
+        on_keyword: Optional[Callable[[KeywordHit], None]] = None,
+    ) -> Session:
+        """セッションを追加する。
+
+        Args:
+            name (str): セッション名（入力デバイス名）
+            audio (AudioSource): 入力元のAudioSourceインスタンス
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス（モデルは全セッションで共有される）
+            on_result (Callable[[Dict], None]): 認識結果を受け取るコールバック
+            on_partial (Optional[Callable[[str], None]], optional): 途中認識結果が変化した際のコールバック. Defaults to None.
+            on_keyword (Optional[Callable[[KeywordHit], None]], optional): キーワードを検出した際のコールバック. Defaults to None.
+
+        Returns:
+            Session: 追加したセッション
+        """
+        worker = RecognizeWorker(
+            audio,
+            vosk,
+            on_result=on_result,
+            on_partial=on_partial,
+            name=name,
+            on_keyword=on_keyword,
+        )
+        session = Session(name, audio, vosk, worker)
+        audio.on_block = self._wakeup
+        with self._lock:
+            self.sessions.append(session)
+        self._logger.info(f"add session: {name}")
+        return session
+
+    def start(self) -> None:
+        """ディスパッチを開始する。"""
+        self._dispatcher.start()
+
+    def stop(self) -> None:
+        """ディスパッチを停止し、処理中のブロックの完了を待つ。"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._dispatcher.is_alive():
+            self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self) -> None:
+        """ブロックが届いたセッションの処理をワーカープールへ投入し続ける。"""
+        last_report = time.perf_counter()
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self._poll_timeout)
+            self._wakeup.clear()
+            with self._lock:
+                sessions = list(self.sessions)
+            for session in sessions:
+                if not session.scheduled and session.audio.q.qsize() > 0:
+                    session.scheduled = True
+                    self._executor.submit(self._drain, session)
+
+            now = time.perf_counter()
+            if now - last_report >= self._report_interval:
+                for session in sessions:
+                    session.worker.report_stats()
+                last_report = now
+
+    def _drain(self, session: Session) -> None:
+        """セッションに溜まっているブロックを処理する。（ワーカースレッド上で実行）
+
+        Args:
+            session (Session): 対象のセッション
+        """
+        try:
+            session.worker.drain()
+        except Exception as e:
+            self._logger.error(f"[{session.name}] {e}")
+        finally:
+            session.scheduled = False
+            # 処理中に届いたブロックを取りこぼさないよう再度確認させる
+            self._wakeup.set()
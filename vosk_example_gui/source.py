@@ -0,0 +1,181 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+import numpy as np
+from vosk_example_gui.block_queue import BlockQueue, OverflowPolicy
+from vosk_example_gui.config import (
+    AUDIO_OVERFLOW_POLICY,
+    AUDIO_QUEUE_SEC,
+    BLOCK_SIZE,
+    WAVEFORM_HISTORY_SEC,
+)
+from vosk_example_gui.ring_buffer import RingBuffer
+
+
+class BlockListener(Protocol):
+    """ブロックの到着通知を受け取るオブジェクト（threading.Eventなど）"""
+
+    def set(self) -> None:
+        ...
+
+
+class AudioSource(ABC):
+    def __init__(
+        self,
+        block_size: int = BLOCK_SIZE,
+        block_ms: Optional[float] = None,
+        channels: int = 1,
+        overflow_policy: Optional[OverflowPolicy] = None,
+    ) -> None:
+        """Initialize
+
+        入力ソースの共通処理（キュー・波形履歴・録音）を持つ基底クラス。
+        サブクラスはブロック毎に_push_blockを呼び出してデータを渡す。
+
+        Args:
+            block_size (int, optional): 1ブロックのサンプル数. Defaults to BLOCK_SIZE.
+            block_ms (Optional[float], optional): 1ブロックの長さ[msec]（指定した場合はblock_sizeより優先）. Defaults to None.
+            channels (int, optional): 入力チャンネル数（ソースの最大数を上限とする）. Defaults to 1.
+            overflow_policy (Optional[OverflowPolicy], optional): キューに空きがない場合の動作（Noneの場合はAUDIO_OVERFLOW_POLICY）. Defaults to None.
+        """
+        self._logger = logging.getLogger("vosk_example.audio")
+        self.overflow_policy = (
+            overflow_policy
+            if overflow_policy is not None
+            else OverflowPolicy(AUDIO_OVERFLOW_POLICY)
+        )
+        self._block_size_config = block_size
+        self._block_ms = block_ms
+        self.block_size = block_size
+        self._channels_config = channels
+        self.channels = channels
+        # コールバックから認識ワーカーへブロックを渡すための、事前確保済みのキュー
+        self.q: Optional[BlockQueue] = None
+        self._ensure_queue(block_size, channels, 16000)
+        self.is_streaming = False
+        self._sampling_rate: Optional[int] = None
+        # 入力オーバーフローにより取りこぼしたブロック数
+        self.overflow_count = 0
+        # 波形表示用の直近WAVEFORM_HISTORY_SEC秒分の入力信号
+        self.history: Optional[RingBuffer] = None
+        # ブロックが届いたことを通知するためのイベント（複数の入力をまとめて待つ場合に利用）
+        self.on_block: Optional[BlockListener] = None
+        # 入力をそのまま保存するレコーダー
+        self.recorder: Optional[Any] = None
+
+    @abstractmethod
+    def start_streaming(self, dev_id: Optional[int] = None) -> None:
+        """Streamingを開始する
+
+        Args:
+            dev_id (Optional[int], optional): デバイスID. Defaults to None.
+        """
+
+    @abstractmethod
+    def get_input_devices(self) -> Tuple[Dict, int]:
+        """入力デバイスの情報を返す
+
+        Returns:
+            Tuple[Dict, int]: (入力デバイス情報, デフォルトデバイスIndex)
+        """
+
+    @abstractmethod
+    def _start_stream(self) -> None:
+        """ソース固有のストリーミング開始処理"""
+
+    @abstractmethod
+    def _stop_stream(self) -> None:
+        """ソース固有のストリーミング停止処理"""
+
+    def get_sampling_rate(self) -> Optional[int]:
+        """サンプリングレートを返す
+
+        Returns:
+            int: サンプリングレート
+        """
+        return self._sampling_rate
+
+    def start(self) -> None:
+        """ストリーミング開始"""
+        if not self.is_streaming:
+            self.q.clear()
+            self._start_stream()
+            self._logger.info("start audio streaming")
+            self.is_streaming = True
+
+    def stop(self) -> None:
+        """ストリーミング停止"""
+        if self.is_streaming:
+            self._stop_stream()
+            self._logger.info("stop audio streaming")
+            self.is_streaming = False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """マイク入力データを返す
+
+        返したデータは次のget/release呼び出しまで有効で、それ以降はバッファが再利用される。
+
+        Args:
+            timeout (Optional[float], optional): 待ち時間[sec]（Noneの場合は待たない）. Defaults to None.
+
+        Returns:
+            Optional[memoryview]: バイト配列のビュー
+        """
+        return self.q.get(timeout)
+
+    def release(self) -> None:
+        """getで返したデータのバッファを返却する。"""
+        self.q.release()
+
+    def _configure(self, sampling_rate: int, max_channels: int) -> None:
+        """サンプリングレートに合わせてブロックサイズ・キュー・波形履歴を用意する。
+
+        Args:
+            sampling_rate (int): サンプリングレート
+            max_channels (int): ソースの最大チャンネル数
+        """
+        self._sampling_rate = sampling_rate
+        history_size = int(sampling_rate * WAVEFORM_HISTORY_SEC)
+        if self.history is None or self.history.capacity != history_size:
+            self.history = RingBuffer(history_size)
+        if self._block_ms is not None:
+            self.block_size = max(1, int(sampling_rate * self._block_ms / 1000))
+        else:
+            self.block_size = self._block_size_config
+        self.channels = max(1, min(self._channels_config, max_channels))
+        self._ensure_queue(self.block_size, self.channels, sampling_rate)
+
+    def _ensure_queue(self, block_size: int, channels: int, sampling_rate: int) -> None:
+        """AUDIO_QUEUE_SEC秒分のブロックを保持できるキューを用意する。（サイズが同じ場合は使い回す）
+
+        Args:
+            block_size (int): 1ブロックのサンプル数
+            channels (int): チャンネル数
+            sampling_rate (int): サンプリングレート
+        """
+        n_slots = max(2, math.ceil(AUDIO_QUEUE_SEC * sampling_rate / block_size))
+        block_bytes = block_size * channels * 2
+        if (
+            self.q is not None
+            and self.q.n_slots == n_slots
+            and self.q.block_bytes == block_bytes
+        ):
+            return
+        self.q = BlockQueue(n_slots, block_bytes, self.overflow_policy)
+
+    def _push_block(self, indata: Any) -> None:
+        """1ブロック分の入力を波形履歴・レコーダー・キューへ渡す。
+
+        Args:
+            indata (Any): インターリーブされたint16 PCM（バッファプロトコルに対応したもの）
+        """
+        if self.history is not None:
+            # 波形表示には先頭チャンネルのみを利用する
+            self.history.write(np.frombuffer(indata, dtype=np.int16)[:: self.channels])
+        if self.recorder is not None:
+            self.recorder.write(indata)
+        self.q.put(indata)
+        if self.on_block is not None:
+            self.on_block.set()
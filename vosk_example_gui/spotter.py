@@ -0,0 +1,156 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+# 1つのキーワードの索引の値（単語列, キーワード, 閾値）
+_Entry = Tuple[Tuple[str, ...], str, float]
+
+
+@dataclass
+class KeywordHit:
+    """キーワードの検出結果（時刻は認識器へ渡した音声の先頭からの秒数）"""
+
+    keyword: str
+    conf: float
+    start: float
+    end: float
+    detected: float
+
+    @property
+    def latency_ms(self) -> float:
+        """キーワードの発話開始から検出までの時間[msec]（音声上の時間で、処理の遅れは含まない）"""
+        return (self.detected - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        """結果出力用のDictを返す。
+
+        Returns:
+            Dict: keyword/conf/start/end/latency_ms
+        """
+        return {
+            "keyword": self.keyword,
+            "conf": self.conf,
+            "start": self.start,
+            "end": self.end,
+            "latency_ms": self.latency_ms,
+        }
+
+
+class KeywordSpotter:
+    def __init__(
+        self,
+        keywords: List[str],
+        threshold: float = 0.7,
+        thresholds: Optional[Dict[str, float]] = None,
+        min_interval_ms: float = 1000.0,
+    ) -> None:
+        """Initialize
+
+        途中認識結果の単語列からキーワード（複数語のフレーズも可）を探し、confidenceが閾値を
+        超えた時点で検出とする。確定結果（発話終端の無音）を待たずに反応できる。
+        キーワードは先頭の単語をキーとする索引で引くため、ワードリストが大きくても1ブロックあたりの
+        コストは途中認識結果の単語数にのみ比例する。
+
+        同じキーワードは1発話につき1回のみ検出し、発話をまたいでもmin_interval_ms以内に
+        始まったものは検出しない（発話の区切り直後に同じ区間が再認識される場合の重複を防ぐ）。
+
+        Args:
+            keywords (List[str]): キーワードのリスト
+            threshold (float, optional): 既定の閾値（フレーズの場合は各単語のconfidenceの最小値と比較する）. Defaults to 0.7.
+            thresholds (Optional[Dict[str, float]], optional): キーワード毎の閾値. Defaults to None.
+            min_interval_ms (float, optional): 同じキーワードを再度検出するまでの最短間隔[msec]. Defaults to 1000.0.
+        """
+        self._logger = logging.getLogger("vosk_example_gui.spotter")
+        self._threshold = threshold
+        self._thresholds = dict(thresholds) if thresholds is not None else {}
+        self._min_interval = min_interval_ms / 1000
+        self._index: Dict[str, List[_Entry]] = {}
+        self._size = 0
+        # 現在の発話で検出済みのキーワードと、キーワード毎の直前の検出区間の終了時刻
+        self._fired: Set[str] = set()
+        self._last_end: Dict[str, float] = {}
+        self.set_keywords(keywords)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def set_keywords(self, keywords: List[str]) -> None:
+        """キーワードを入れ替える。（認識中のスレッドとは別のスレッドから呼び出し可能）
+
+        Args:
+            keywords (List[str]): キーワードのリスト
+        """
+        index: Dict[str, List[_Entry]] = {}
+        size = 0
+        for keyword in keywords:
+            tokens = tuple(keyword.split())
+            if len(tokens) == 0:
+                continue
+            threshold = self._thresholds.get(keyword, self._threshold)
+            index.setdefault(tokens[0], []).append((tokens, keyword, threshold))
+            size += 1
+        # 索引は丸ごと差し替える（参照側はロックなしで新旧どちらかの索引を見る）
+        self._index = index
+        self._size = size
+        self._logger.info(f"keywords: {size}")
+
+    def update(self, words: List[Dict], stream_time: float) -> List[KeywordHit]:
+        """途中認識結果の単語列からキーワードを探す。
+
+        Args:
+            words (List[Dict]): Voskの途中認識結果の"partial_result"（[{"word", "conf", "start", "end"}, ...]）
+            stream_time (float): 認識器へ渡し終えた音声の長さ[sec]
+
+        Returns:
+            List[KeywordHit]: 新たに検出したキーワード
+        """
+        index = self._index
+        hits: List[KeywordHit] = []
+        for i, w in enumerate(words):
+            entries = index.get(w["word"])
+            if entries is None:
+                continue
+            for tokens, keyword, threshold in entries:
+                if keyword in self._fired:
+                    continue
+                span = words[i : i + len(tokens)]
+                if len(span) < len(tokens) or any(
+                    s["word"] != t for s, t in zip(span[1:], tokens[1:])
+                ):
+                    continue
+                conf = min(s["conf"] for s in span)
+                if conf < threshold:
+                    continue
+                self._fired.add(keyword)
+                start = span[0].get("start", stream_time)
+                end = span[-1].get("end", stream_time)
+                last_end = self._last_end.get(keyword)
+                self._last_end[keyword] = end
+                if last_end is not None and 0 <= start - last_end < self._min_interval:
+                    continue
+                hits.append(KeywordHit(keyword, conf, start, end, stream_time))
+        return hits
+
+    def reset(self) -> None:
+        """発話の区切りで呼び出し、発話単位の検出済みの状態を初期化する。"""
+        self._fired = set()
+
+
+def read_thresholds(path: str) -> Dict[str, float]:
+    """キーワード毎の閾値のファイルを読み込む。
+
+    1行に「キーワード<TAB>閾値」を記載する。（閾値を省略した行・空行は無視する）
+
+    Args:
+        path (str): 対象のファイルパス
+
+    Returns:
+        Dict[str, float]: キーワード毎の閾値
+    """
+    thresholds = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            keyword, _, value = line.rstrip("\n").partition("\t")
+            if keyword.strip() != "" and value.strip() != "":
+                thresholds[keyword.strip()] = float(value)
+    return thresholds
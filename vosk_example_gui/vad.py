@@ -0,0 +1,128 @@
+from typing import List
+
+import numpy as np
+
+from vosk_example_gui.ring_buffer import RingBuffer
+
+
+class VoiceActivityGate:
+    def __init__(
+        self,
+        sampling_rate: int,
+        threshold_db: float = 12.0,
+        min_level_db: float = -55.0,
+        min_band_ratio: float = 0.3,
+        pre_roll_ms: float = 300.0,
+        hangover_ms: float = 800.0,
+        frame_ms: float = 10.0,
+        noise_rise_db_per_sec: float = 3.0,
+    ) -> None:
+        """Initialize
+
+        ブロックをframe_ms毎のフレームに分け、エネルギーと音声帯域（300～3400Hz）の
+        エネルギー比から発話の有無を判定するゲート。
+
+        Args:
+            sampling_rate (int): サンプリングレート
+            threshold_db (float, optional): 推定ノイズレベルに対する発話判定の閾値[dB]. Defaults to 12.0.
+            min_level_db (float, optional): 発話と判定する最小レベル[dBFS]. Defaults to -55.0.
+            min_band_ratio (float, optional): 発話と判定する音声帯域のエネルギー比の下限. Defaults to 0.3.
+            pre_roll_ms (float, optional): ゲートが開いた際に遡って渡す長さ[msec]. Defaults to 300.0.
+            hangover_ms (float, optional): 発話が途切れてからゲートを閉じるまでの時間[msec]. Defaults to 800.0.
+            frame_ms (float, optional): 判定に用いるフレーム長[msec]. Defaults to 10.0.
+            noise_rise_db_per_sec (float, optional): 推定ノイズレベルの上昇速度[dB/sec]. Defaults to 3.0.
+        """
+        self.sampling_rate = sampling_rate
+        self._threshold_db = threshold_db
+        self._min_level_db = min_level_db
+        self._min_band_ratio = min_band_ratio
+        self._hangover = int(sampling_rate * hangover_ms / 1000)
+        self._frame_len = max(1, int(sampling_rate * frame_ms / 1000))
+        self._noise_rise_per_sample = noise_rise_db_per_sec / sampling_rate
+
+        freqs = np.fft.rfftfreq(self._frame_len, 1.0 / sampling_rate)
+        self._band = (freqs >= 300) & (freqs <= 3400)
+        self._window = np.hanning(self._frame_len).astype(np.float32)
+
+        self._pre_roll = RingBuffer(max(1, int(sampling_rate * pre_roll_ms / 1000)))
+        self._noise_db = -60.0
+        self._silent_samples = self._hangover
+        self.is_open = False
+
+        # 統計
+        self.total_samples = 0
+        self.skipped_samples = 0
+
+    def process(self, pcm: np.ndarray) -> List[np.ndarray]:
+        """1ブロック分の判定を行い、認識器へ渡すべきデータを返す。
+
+        Args:
+            pcm (np.ndarray): モノラルint16 PCM
+
+        Returns:
+            List[np.ndarray]: 認識器へ渡すデータ（ゲートが閉じている場合は空）
+        """
+        n = len(pcm)
+        self.total_samples += n
+        if self._is_speech(pcm):
+            self._silent_samples = 0
+        else:
+            self._silent_samples += n
+
+        if self._silent_samples >= self._hangover:
+            # 無音が続いている間は認識器へ渡さず、pre-roll用に保持するのみ
+            self.is_open = False
+            self._pre_roll.write(pcm)
+            self.skipped_samples += n
+            return []
+
+        if not self.is_open:
+            self.is_open = True
+            n_pre = min(self._pre_roll.written, self._pre_roll.capacity)
+            # ビューのままではclearで0に上書きされるため、発話開始時のみコピーして渡す
+            pre_roll = self._pre_roll.view()[self._pre_roll.capacity - n_pre :].copy()
+            chunks = [pre_roll, pcm]
+            self.skipped_samples -= n_pre
+            self._pre_roll.clear()
+            return chunks
+        return [pcm]
+
+    @property
+    def skipped_ratio(self) -> float:
+        """認識器へ渡さずに済んだ音声の割合"""
+        if self.total_samples == 0:
+            return 0.0
+        return self.skipped_samples / self.total_samples
+
+    def _is_speech(self, pcm: np.ndarray) -> bool:
+        """ブロック内に発話と判定されるフレームがあるかどうかを返す。
+
+        Args:
+            pcm (np.ndarray): モノラルint16 PCM
+
+        Returns:
+            bool: 発話を含む場合はTrue
+        """
+        n_frames = len(pcm) // self._frame_len
+        if n_frames == 0:
+            return False
+        frames = pcm[: n_frames * self._frame_len].reshape(n_frames, self._frame_len)
+        frames = frames.astype(np.float32) / 32768.0
+
+        power = np.mean(frames * frames, axis=1)
+        level_db = 10 * np.log10(power + 1e-12)
+
+        # 推定ノイズレベルは、下降には即座に追従し、上昇はゆっくりと行う
+        self._noise_db = min(
+            self._noise_db + self._noise_rise_per_sample * len(pcm),
+            float(level_db.min()),
+        )
+        loud = level_db > max(self._noise_db + self._threshold_db, self._min_level_db)
+        if not loud.any():
+            return False
+
+        spectrum = np.abs(np.fft.rfft(frames[loud] * self._window, axis=1)) ** 2
+        band_ratio = spectrum[:, self._band].sum(axis=1) / (
+            spectrum.sum(axis=1) + 1e-12
+        )
+        return bool((band_ratio >= self._min_band_ratio).any())
@@ -1,10 +1,13 @@
 import logging
 from enum import Enum
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import PySimpleGUI as sg
 from vosk_example_gui.config import GUI_APP_NAME
+from vosk_example_gui.core import Consumer
+from vosk_example_gui.spotter import KeywordHit
+from vosk_example_gui.waveform import WaveformRenderer
 
 
 class Event(Enum):
@@ -15,6 +18,15 @@ class Event(Enum):
     SUBMIT_WORDS: int = 4
     CHANGE_AUDIO: int = 5
     LOAD_FILE: int = 6
+    RECOGNIZED: int = 7
+    PARTIAL: int = 8
+    SESSION_RECOGNIZED: int = 9
+    WORDS_LOADED: int = 10
+    REDRAW: int = 11
+    TICK: int = 12
+    STARTED: int = 13
+    MODEL_LOADED: int = 14
+    KEYWORD: int = 15
 
 
 class _GUI_KEY:
@@ -29,6 +41,20 @@ class _GUI_KEY:
     AUDIO_PULLDOWN_KEY: str = "__AUDIO__"
     RESULT_TEXT_KEY: str = "__RESULT__"
     TABLE_DOUBLE_CLICK: str = "__double_click__"
+    RECOGNIZED_EVENT_KEY: str = "__RECOGNIZED__"
+    PARTIAL_EVENT_KEY: str = "__PARTIAL__"
+    SESSION_RECOGNIZED_EVENT_KEY: str = "__SESSION_RECOGNIZED__"
+    SESSION_GRAPH_KEY: str = "__SESSION_GRAPH__"
+    SESSION_RESULT_KEY: str = "__SESSION_RESULT__"
+    GRAMMAR_RESULT_KEY: str = "__GRAMMAR_RESULT__"
+    STATUS_TEXT_KEY: str = "__STATUS__"
+    WORDS_LOADED_EVENT_KEY: str = "__WORDS_LOADED__"
+    LOAD_STATUS_KEY: str = "__LOAD_STATUS__"
+    REDRAW_EVENT_KEY: str = "__REDRAW__"
+    TICK_EVENT_KEY: str = "__TICK__"
+    STARTED_EVENT_KEY: str = "__STARTED__"
+    MODEL_LOADED_EVENT_KEY: str = "__MODEL_LOADED__"
+    KEYWORD_EVENT_KEY: str = "__KEYWORD__"
 
 
 class Viwer:
@@ -37,29 +63,60 @@ class Viwer:
         word_list: List,
         pulldown_list: List,
         pulldown_list_default_idx: int = 0,
-        timeout: int = 10,
+        timeout: Optional[int] = 10,
+        max_fps: float = 30.0,
+        session_names: Optional[List[str]] = None,
+        grammar_names: Optional[List[str]] = None,
     ) -> None:
         """Initialize
 
         Args:
-            word_list (List): テーブル表示用のテキストリスト
+            word_list (List): テーブル表示用の(ID, ワード)のリスト
             pulldown_list (List): プルダウン用のテキストリスト
             pulldown_list_default_idx (int, optional): プルダウンのデフォルトIndex. Defaults to 0.
-            timeout (int, optional): event loopのタイムアウト時間[msec]. Defaults to 10.
+            timeout (Optional[int], optional): event loopのタイムアウト時間[msec]（Noneの場合はイベントが届くまで待つ）. Defaults to 10.
+            max_fps (float, optional): 波形の再描画の上限回数[回/sec]. Defaults to 30.0.
+            session_names (Optional[List[str]], optional): 同時に認識する追加の入力デバイス名. Defaults to None.
+            grammar_names (Optional[List[str]], optional): 同じ入力を並行して認識する文法の名前（結果を横に並べて表示する）. Defaults to None.
         """
         self._logger = logging.getLogger("vosk_example_gui.view")
         self.timeout = timeout
-        self.window = sg.Window(
-            GUI_APP_NAME,
-            [
-                self._get_waveform_frame(pulldown_list, pulldown_list_default_idx),
-                self._get_word_editor_frame(word_list),
-            ],
-            finalize=True,
+        session_names = session_names if session_names is not None else []
+        layout = [
+            self._get_waveform_frame(pulldown_list, pulldown_list_default_idx),
+            self._get_word_editor_frame(),
+        ]
+        if len(session_names) > 0:
+            layout.append(self._get_session_frame(session_names))
+        if grammar_names is not None and len(grammar_names) > 0:
+            layout.append(self._get_grammar_frame(grammar_names))
+        layout.append(
+            [sg.Text("", key=_GUI_KEY.STATUS_TEXT_KEY, size=(80, 1), font="Any 9")]
         )
+        self.window = sg.Window(GUI_APP_NAME, layout, finalize=True)
         self.window[_GUI_KEY.TABLE_KEY].bind(
             "<Double-Button-1>", _GUI_KEY.TABLE_DOUBLE_CLICK
         )
+        # 行の追加・削除はTreeviewへ直接差分で反映する（iidはワードのID）
+        self._table_widget = self.window[_GUI_KEY.TABLE_KEY].Widget
+        self.update_table(word_list)
+        graph = self.window[_GUI_KEY.WAVEFORM_GRAPH_KEY]
+        self._waveform = WaveformRenderer(
+            graph.TKCanvas, graph.CanvasSize, max_fps=max_fps, full_scale=32767.0
+        )
+        self._session_waveforms = []
+        for i in range(len(session_names)):
+            graph = self.window[f"{_GUI_KEY.SESSION_GRAPH_KEY}{i}"]
+            self._session_waveforms.append(
+                WaveformRenderer(
+                    graph.TKCanvas,
+                    graph.CanvasSize,
+                    max_fps=max_fps,
+                    full_scale=32767.0,
+                )
+            )
+        # 最初のreadで取り出され、ウィンドウが操作を受け付けられる状態になったことを知らせる
+        self.window.write_event_value(_GUI_KEY.STARTED_EVENT_KEY, None)
 
     def close(self) -> None:
         """GUIをクローズする。"""
@@ -77,6 +134,20 @@ class Viwer:
             # 特にEventがない場合
             return Event.NONE, content
 
+        elif key == _GUI_KEY.RECOGNIZED_EVENT_KEY:
+            # 認識ワーカーから結果が届いた場合
+            return Event.RECOGNIZED, content[_GUI_KEY.RECOGNIZED_EVENT_KEY]
+
+        elif key == _GUI_KEY.PARTIAL_EVENT_KEY:
+            # 認識ワーカーから途中認識結果が届いた場合
+            return Event.PARTIAL, content[_GUI_KEY.PARTIAL_EVENT_KEY]
+
+        elif key == _GUI_KEY.SESSION_RECOGNIZED_EVENT_KEY:
+            # 追加の入力デバイスの認識結果が届いた場合、(セッション番号, 結果)を返す
+            return Event.SESSION_RECOGNIZED, content[
+                _GUI_KEY.SESSION_RECOGNIZED_EVENT_KEY
+            ]
+
         elif key == _GUI_KEY.FILE_LOAD_BUTTON_KEY:
             self.window.FindElement(_GUI_KEY.FILE_PATH_KEY).Update("")
             return Event.LOAD_FILE, content["Browse"]
@@ -88,8 +159,32 @@ class Viwer:
             return Event.ADD_WORD, text
 
         elif key == f"{_GUI_KEY.TABLE_KEY}{_GUI_KEY.TABLE_DOUBLE_CLICK}":
-            # テーブルの単語がダブルクリックされた場合、対象の単語のインデックスリストを返す
-            return Event.DELETE_WORD, content[_GUI_KEY.TABLE_KEY]
+            # テーブルの単語がダブルクリックされた場合、対象の単語のIDリストを返す
+            return Event.DELETE_WORD, [int(i) for i in self._table_widget.selection()]
+
+        elif key == _GUI_KEY.REDRAW_EVENT_KEY:
+            # 新しい音声ブロックが届いた場合（波形はイベントループ側で毎回更新する）
+            return Event.REDRAW, ""
+
+        elif key == _GUI_KEY.TICK_EVENT_KEY:
+            # 一定間隔の通知（ステータスバーの更新など）
+            return Event.TICK, ""
+
+        elif key == _GUI_KEY.WORDS_LOADED_EVENT_KEY:
+            # ファイルの読み込みスレッドからワードが届いた場合、(ワード, 進捗, エラー)を返す
+            return Event.WORDS_LOADED, content[_GUI_KEY.WORDS_LOADED_EVENT_KEY]
+
+        elif key == _GUI_KEY.STARTED_EVENT_KEY:
+            # ウィンドウの表示後、最初のイベント処理
+            return Event.STARTED, ""
+
+        elif key == _GUI_KEY.MODEL_LOADED_EVENT_KEY:
+            # モデルの読み込みスレッドが完了した場合、(エラー, 所要時間[msec])を返す
+            return Event.MODEL_LOADED, content[_GUI_KEY.MODEL_LOADED_EVENT_KEY]
+
+        elif key == _GUI_KEY.KEYWORD_EVENT_KEY:
+            # キーワードを検出した場合、(セッション番号, 検出結果)を返す
+            return Event.KEYWORD, content[_GUI_KEY.KEYWORD_EVENT_KEY]
 
         elif key == _GUI_KEY.SUBMIT_BUTTON_KEY:
             # Apply Voskボタンが押された場合
@@ -106,13 +201,123 @@ class Viwer:
             self._logger.error(f"unknown event : {key}, {content}")
             return Event.FINISH, ""
 
-    def update_table(self, data: List) -> None:
-        """テーブル内容を更新する。
+    def post_recognized(self, recognized: Dict) -> None:
+        """認識結果をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
+
+        Args:
+            recognized (Dict): VoskClient.recognizeの結果
+        """
+        self.window.write_event_value(_GUI_KEY.RECOGNIZED_EVENT_KEY, recognized)
+
+    def post_partial(self, text: str) -> None:
+        """途中認識結果をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
+
+        Args:
+            text (str): 途中認識結果のテキスト
+        """
+        self.window.write_event_value(_GUI_KEY.PARTIAL_EVENT_KEY, text)
+
+    def post_session_recognized(self, index: int, recognized: Dict) -> None:
+        """追加の入力デバイスの認識結果をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
+
+        Args:
+            index (int): セッション番号
+            recognized (Dict): VoskClient.recognizeの結果
+        """
+        self.window.write_event_value(
+            _GUI_KEY.SESSION_RECOGNIZED_EVENT_KEY, (index, recognized)
+        )
+
+    def post_keyword(self, index: int, hit: KeywordHit) -> None:
+        """キーワードの検出結果をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
 
         Args:
-            data (List): テーブルに反映するテキストのリスト
+            index (int): セッション番号（0が主の入力）
+            hit (KeywordHit): 検出結果
         """
-        self.window.FindElement(_GUI_KEY.TABLE_KEY).Update(data)
+        self.window.write_event_value(_GUI_KEY.KEYWORD_EVENT_KEY, (index, hit))
+
+    def post_redraw(self) -> None:
+        """波形の再描画をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）"""
+        self.window.write_event_value(_GUI_KEY.REDRAW_EVENT_KEY, None)
+
+    def post_tick(self) -> None:
+        """一定間隔の通知をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）"""
+        self.window.write_event_value(_GUI_KEY.TICK_EVENT_KEY, None)
+
+    def post_words_loaded(
+        self, words: List[str], progress: float, error: Optional[str] = None
+    ) -> None:
+        """ファイルから読み込んだワードをGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
+
+        Args:
+            words (List[str]): 読み込んだワード
+            progress (float): 読み込んだ割合（1.0で完了）
+            error (Optional[str], optional): 読み込みに失敗した場合のエラー内容. Defaults to None.
+        """
+        self.window.write_event_value(
+            _GUI_KEY.WORDS_LOADED_EVENT_KEY, (words, progress, error)
+        )
+
+    def post_model_loaded(self, error: Optional[str], elapsed_ms: float) -> None:
+        """モデルの読み込み完了をGUIのイベントキューへ投入する。（別スレッドから呼び出し可能）
+
+        Args:
+            error (Optional[str]): 読み込みに失敗した場合のエラー内容
+            elapsed_ms (float): 読み込みにかかった時間[msec]
+        """
+        self.window.write_event_value(
+            _GUI_KEY.MODEL_LOADED_EVENT_KEY, (error, elapsed_ms)
+        )
+
+    def set_model_loading(self, loading: bool) -> None:
+        """モデルの読み込み中の表示に切り替える。（読み込み中は認識器の操作を無効にする）
+
+        Args:
+            loading (bool): 読み込み中かどうか
+        """
+        self.window[_GUI_KEY.SUBMIT_BUTTON_KEY].Update(disabled=loading)
+        self.window[_GUI_KEY.CHANGE_AUDIO_BUTTON_KEY].Update(disabled=loading)
+        if loading:
+            self.update_status("loading model...")
+
+    def update_table(self, rows: List[Tuple[int, str]]) -> None:
+        """テーブル内容を全て置き換える。
+
+        Args:
+            rows (List[Tuple[int, str]]): テーブルに反映する(ID, ワード)のリスト
+        """
+        children = self._table_widget.get_children()
+        if children:
+            self._table_widget.delete(*children)
+        self.append_table_rows(rows)
+
+    def append_table_rows(self, rows: List[Tuple[int, str]]) -> None:
+        """テーブルの末尾に行を追加する。
+
+        Args:
+            rows (List[Tuple[int, str]]): 追加する(ID, ワード)のリスト
+        """
+        insert = self._table_widget.insert
+        for word_id, word in rows:
+            insert("", "end", iid=str(word_id), values=(word,))
+
+    def delete_table_rows(self, ids: List[int]) -> None:
+        """テーブルから行を削除する。
+
+        Args:
+            ids (List[int]): 削除するワードのIDリスト
+        """
+        if ids:
+            self._table_widget.delete(*[str(i) for i in ids])
+
+    def update_load_status(self, text: str) -> None:
+        """ファイル読み込みの進捗表示を更新する。
+
+        Args:
+            text (str): 反映するテキスト
+        """
+        self.window[_GUI_KEY.LOAD_STATUS_KEY].Update(text)
 
     def update_text(self, text: str) -> None:
         """テキストエリアの内容を更新する。
@@ -124,26 +329,73 @@ class Viwer:
             f"Recognized...\n\n{text}"
         )
 
+    def update_partial_text(self, text: str) -> None:
+        """テキストエリアに途中認識結果を表示する。
+
+        Args:
+            text (str): 反映するテキスト
+        """
+        self.window.FindElement(_GUI_KEY.RESULT_TEXT_KEY).Update(
+            f"Recognizing...\n\n{text}"
+        )
+
     def update_waveform(self, data: np.ndarray) -> None:
-        """グラフの波形を更新する。
+        """グラフの波形を更新する。（再描画はmax_fpsの間隔に間引く）
 
         Args:
-            data (np.ndarray): 波形データ
+            data (np.ndarray): int16の波形データ
         """
-        self.window[_GUI_KEY.WAVEFORM_GRAPH_KEY].erase()  # 再描画
-        self.window[_GUI_KEY.WAVEFORM_GRAPH_KEY].draw_line((0, 150), (512, 150))
+        self._waveform.push(data)
+        self._waveform.render_if_due()
+
+    def refresh_waveform(self) -> None:
+        """間引かれて未描画の波形があれば描画する。"""
+        self._waveform.render_if_due()
+
+    def update_session_text(self, index: int, text: str) -> None:
+        """追加の入力デバイスの認識結果を更新する。
+
+        Args:
+            index (int): セッション番号
+            text (str): 反映するテキスト
+        """
+        self.window[f"{_GUI_KEY.SESSION_RESULT_KEY}{index}"].Update(text)
+
+    def update_grammar_text(self, index: int, text: str) -> None:
+        """文法毎の認識結果を更新する。
+
+        Args:
+            index (int): 文法の番号
+            text (str): 反映するテキスト
+        """
+        self.window[f"{_GUI_KEY.GRAMMAR_RESULT_KEY}{index}"].Update(text)
+
+    def update_session_waveform(self, index: int, data: np.ndarray) -> None:
+        """追加の入力デバイスの波形を更新する。（再描画はmax_fpsの間隔に間引く）
+
+        Args:
+            index (int): セッション番号
+            data (np.ndarray): int16の波形データ
+        """
+        self._session_waveforms[index].push(data)
+        self._session_waveforms[index].render_if_due()
+
+    def refresh_session_waveform(self, index: int) -> None:
+        """追加の入力デバイスの間引かれて未描画の波形があれば描画する。
+
+        Args:
+            index (int): セッション番号
+        """
+        self._session_waveforms[index].render_if_due()
+
+    def update_status(self, text: str) -> None:
+        """ステータスバーの表示を更新する。
+
+        Args:
+            text (str): 反映するテキスト
+        """
+        self.window[_GUI_KEY.STATUS_TEXT_KEY].Update(text)
 
-        prev_x: Optional[float] = None
-        for i, x in enumerate(data[:: len(data) // 512]):
-            if i == 512:
-                break
-            if prev_x is not None:
-                # 前の点と現在の点を線で結ぶ
-                self.window[_GUI_KEY.WAVEFORM_GRAPH_KEY].draw_line(
-                    (i - 1, prev_x * 150 + 150), (i, x * 150 + 150), color="red"
-                )
-            prev_x = x
-    
     def show_error_popup(self, msg: str) -> None:
         """エラーポップアップを表示する。
 
@@ -155,12 +407,9 @@ class Viwer:
             title="Error"
         )
 
-    def _get_word_editor_frame(self, word_list: List) -> List:
+    def _get_word_editor_frame(self) -> List:
         """下部フレームを初期化する。
 
-        Args:
-            word_list (List): テーブルに反映するテキストのリスト
-
         Returns:
             List: フレーム情報
         """
@@ -171,7 +420,7 @@ class Viwer:
                 layout=[
                     [
                         sg.Table(
-                            values=word_list,
+                            values=[],
                             headings=["Word"],
                             text_color="black",
                             background_color="#cccccc",
@@ -199,6 +448,7 @@ class Viwer:
                     [
                         sg.InputText(key=_GUI_KEY.FILE_PATH_KEY, size=(15, 1)),
                         sg.FileBrowse(), sg.Submit(key=_GUI_KEY.FILE_LOAD_BUTTON_KEY, button_text="LOAD"),
+                        sg.Text("", key=_GUI_KEY.LOAD_STATUS_KEY, size=(20, 1)),
                     ],
                     [
                         sg.Submit(
@@ -210,6 +460,65 @@ class Viwer:
         ]
         return preview_frame
 
+    def _get_session_frame(self, session_names: List[str]) -> List:
+        """追加の入力デバイス毎の波形・認識結果のフレームを初期化する。
+
+        Args:
+            session_names (List[str]): 入力デバイス名のリスト
+
+        Returns:
+            List: フレーム情報
+        """
+        rows = []
+        for i, name in enumerate(session_names):
+            rows.append(
+                [
+                    sg.Text(name, size=(20, 1)),
+                    sg.Graph(
+                        canvas_size=(232, 60),
+                        graph_bottom_left=(0, 0),
+                        graph_top_right=(232, 60),
+                        background_color="white",
+                        key=f"{_GUI_KEY.SESSION_GRAPH_KEY}{i}",
+                    ),
+                    sg.Text(
+                        "",
+                        size=(30, 2),
+                        font=("Arial", 11),
+                        key=f"{_GUI_KEY.SESSION_RESULT_KEY}{i}",
+                    ),
+                ]
+            )
+        return [sg.Frame("", font="Any 15", layout=rows)]
+
+    def _get_grammar_frame(self, grammar_names: List[str]) -> List:
+        """文法毎の認識結果を横に並べるフレームを初期化する。
+
+        Args:
+            grammar_names (List[str]): 文法の名前のリスト
+
+        Returns:
+            List: フレーム情報
+        """
+        columns = []
+        for i, name in enumerate(grammar_names):
+            columns.append(
+                sg.Column(
+                    [
+                        [sg.Text(name, size=(20, 1), font="Any 9")],
+                        [
+                            sg.Text(
+                                "",
+                                size=(20, 3),
+                                font=("Arial", 11),
+                                key=f"{_GUI_KEY.GRAMMAR_RESULT_KEY}{i}",
+                            )
+                        ],
+                    ]
+                )
+            )
+        return [sg.Frame("Grammars", font="Any 15", layout=[columns])]
+
     def _get_waveform_frame(
         self, pulldown_list: List, pulldown_list_default_idx: int
     ) -> List:
@@ -253,3 +562,35 @@ class Viwer:
             )
         ]
         return frame
+
+
+class ViewerConsumer(Consumer):
+    def __init__(self, viewer: Viwer) -> None:
+        """Initialize
+
+        AsyncCoreの結果をViwerのイベントキューへ渡すフロントエンド。
+        セッション0を主の入力、それ以降を追加の入力デバイスとして表示する。
+
+        Args:
+            viewer (Viwer): 表示先のViwerインスタンス
+        """
+        self._viewer = viewer
+
+    def on_result(self, index: int, recognized: Dict) -> None:
+        if index == 0:
+            self._viewer.post_recognized(recognized)
+        else:
+            self._viewer.post_session_recognized(index - 1, recognized)
+
+    def on_partial(self, index: int, text: str) -> None:
+        if index == 0:
+            self._viewer.post_partial(text)
+
+    def on_keyword(self, index: int, hit: KeywordHit) -> None:
+        self._viewer.post_keyword(index, hit)
+
+    def on_audio(self, index: int) -> None:
+        self._viewer.post_redraw()
+
+    def on_tick(self) -> None:
+        self._viewer.post_tick()
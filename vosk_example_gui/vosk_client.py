@@ -1,16 +1,209 @@
 import json
 import logging
-from collections import defaultdict
-from typing import Dict, List, Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import ModuleType
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 
-import vosk
+from vosk_example_gui.config import GRAMMAR_CACHE_DIR
+from vosk_example_gui.grammar import GrammarCompiler
+from vosk_example_gui.pcm import SAMPLE_WIDTH
 
+if TYPE_CHECKING:
+    import vosk
+
+# 読み込み済みモデルのキャッシュ（キーは(モデルの絶対パス, 最終更新時刻)）
+_model_cache: Dict[Tuple[str, float], "vosk.Model"] = {}
+_model_cache_lock = threading.Lock()
+
+
+def _import_vosk() -> ModuleType:
+    """voskをimportする。
+
+    ネイティブライブラリの読み込みに時間がかかるため、モジュールのimport時ではなく
+    モデルを読み込む時点まで遅らせる。
+
+    Returns:
+        ModuleType: voskモジュール
+    """
+    import vosk
+
+    return vosk
+
+
+def _get_model_mtime(model_path: str) -> float:
+    """モデルディレクトリ内の最終更新時刻を返す。
+
+    Args:
+        model_path (str): モデルのパス
+
+    Returns:
+        float: ディレクトリ配下のファイルの最大mtime
+    """
+    mtime = os.stat(model_path).st_mtime
+    for dir_path, _, file_names in os.walk(model_path):
+        for file_name in file_names:
+            mtime = max(mtime, os.stat(os.path.join(dir_path, file_name)).st_mtime)
+    return mtime
+
+
+def load_cached_model(model_path: str) -> Tuple[Tuple[str, float], "vosk.Model"]:
+    """モデルを読み込む。（同じパスかつ更新されていない場合は読み込み済みのものを返す）
+
+    Args:
+        model_path (str): モデルのパス
+
+    Returns:
+        Tuple[Tuple[str, float], vosk.Model]: (キャッシュのキー, モデル)
+    """
+    key = (os.path.abspath(model_path), _get_model_mtime(model_path))
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is None:
+            # 同じパスの古いモデルは破棄する
+            for old_key in [k for k in _model_cache.keys() if k[0] == key[0]]:
+                del _model_cache[old_key]
+            model = _import_vosk().Model(model_path)
+            _model_cache[key] = model
+    return key, model
+
+
+def get_model_sampling_rate(model_path: str) -> Optional[int]:
+    """モデルの学習時のサンプリングレートを返す。
+
+    Args:
+        model_path (str): モデルのパス
+
+    Returns:
+        Optional[int]: サンプリングレート（conf/mfcc.confから取得できない場合はNone）
+    """
+    try:
+        with open(os.path.join(model_path, "conf", "mfcc.conf"), "r") as f:
+            for line in f:
+                if line.startswith("--sample-frequency="):
+                    return int(float(line.split("=", 1)[1]))
+    except (IOError, ValueError):
+        pass
+    return None
+
+
+def clear_model_cache() -> None:
+    """モデルのキャッシュを破棄する。"""
+    with _model_cache_lock:
+        _model_cache.clear()
+
+
+@dataclass
+class _PendingRecognizer:
+    """切り替え待ちの認識器"""
+
+    cache_key: Tuple
+    rec: "vosk.KaldiRecognizer"
+    requested: float
+    built: float
+    on_swapped: Optional[Callable[[Dict], None]]
+    blocks: int = 0
+
+
+class WordConfidence:
+    """1発話中に途中認識結果へ現れた単語のconfidenceの集計値"""
+
+    __slots__ = ("count", "total", "min", "last")
 
-class VoskClient:
     def __init__(self) -> None:
-        """Initialize"""
+        self.count = 0
+        self.total = 0.0
+        self.min = 1.0
+        self.last = 0.0
+
+    def add(self, conf: float) -> None:
+        """confidenceを集計に加える。
+
+        Args:
+            conf (float): confidence
+        """
+        self.count += 1
+        self.total += conf
+        if conf < self.min:
+            self.min = conf
+        self.last = conf
+
+    @property
+    def mean(self) -> float:
+        """平均値"""
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """結果出力用のDictを返す。
+
+        Returns:
+            Dict: count/mean/min/last
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "last": self.last,
+        }
+
+
+class VoskClient:
+    def __init__(
+        self,
+        recognizer_cache_size: int = 4,
+        track_partial_conf: bool = True,
+        grammar_cache_dir: Optional[str] = GRAMMAR_CACHE_DIR,
+        word_timings: bool = False,
+    ) -> None:
+        """Initialize
+
+        途中認識結果は、track_partial_confがFalseの場合は利用側が参照した時点でのみ取得する。
+        word_timingsがTrueの場合、確定結果の"words"に単語毎の開始・終了時刻とconfidenceを
+        UtteranceWords（単語IDと数値の構造化配列）として格納する。
+
+        Args:
+            recognizer_cache_size (int, optional): 使い回すために保持する認識器の数. Defaults to 4.
+            track_partial_conf (bool, optional): 毎ブロック途中認識結果を取得してconfidenceを集計するかどうか. Defaults to True.
+            grammar_cache_dir (Optional[str], optional): ワードリストの文法の保存先（Noneの場合は保存しない）. Defaults to GRAMMAR_CACHE_DIR.
+            word_timings (bool, optional): 確定結果に単語毎の時刻情報を含めるかどうか. Defaults to False.
+        """
         self._logger = logging.getLogger("vosk_example.vosk_client")
+        self._model = None
+        # cffiのバッファ変換関数（モデルの読み込み時にvoskから取得する）
+        self._from_buffer: Optional[Callable] = None
+        self._model_key: Optional[Tuple[str, float]] = None
+        self._grammar_cache_dir = grammar_cache_dir
+        self._grammar_compiler: Optional[GrammarCompiler] = None
         self._rec = None
+        self._rec_key: Optional[Tuple] = None
+        self._in_utterance = False
+        self._track_partial_conf = track_partial_conf
+        self._word_timings = word_timings
+        # 最新の途中認識結果のテキストと、前回取得以降に音声を受け取ったかどうか
+        self._partial_text = ""
+        self._partial_words: List[Dict] = []
+        self._partial_stale = False
+        # 認識器毎に渡し終えたサンプル数（Voskの単語の時刻と同じくResetでは戻らない）
+        self._fed_samples: Dict[Tuple, int] = {}
+        # 途中認識結果に新しい単語が現れた時刻（発話終端から確定までの遅延計測用）
+        self._last_speech_time = 0.0
+        # 直前の確定結果の発話終端の時刻（途中認識結果を取得していない場合は0）
+        self.speech_end_time = 0.0
+        # 直前のrecognizeでの各処理時間[sec]
+        self.timings: Dict[str, float] = {"accept": 0.0, "partial": 0.0, "result": 0.0}
+        self._pending: Optional[_PendingRecognizer] = None
+        self._partial_conf: Dict[str, WordConfidence] = {}
+        # 最近利用したワードリスト毎の認識器（LRU）
+        self._recognizer_cache_size = recognizer_cache_size
+        self._recognizer_cache: "OrderedDict[Tuple, vosk.KaldiRecognizer]" = (
+            OrderedDict()
+        )
+        # 認識ワーカーとGUIスレッドの双方から触られるためロックで保護する
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
 
     def initialize_model(
         self, target_word_list: List, sampling_rate: int, model_path: str
@@ -22,63 +215,337 @@ class VoskClient:
             sampling_rate (int): 入力される音声データのサンプリングレート
             model_path (str): 利用するモデルのパス
         """
-        self._logger.info(f"target words is {target_word_list}")
+        self.load_model(model_path)
+        self.initialize_recognizer(target_word_list, sampling_rate)
+
+    def load_model(self, model_path: str) -> None:
+        """voskモデルを読み込む。（読み込み済みの場合はキャッシュを利用する）
+
+        Args:
+            model_path (str): 利用するモデルのパス
+        """
+        key, model = load_cached_model(model_path)
+        with self._lock:
+            if key != self._model_key:
+                with self._cache_lock:
+                    self._recognizer_cache.clear()
+                self._grammar_compiler = GrammarCompiler(
+                    model_path, self._grammar_cache_dir
+                )
+            self._model_key = key
+            self._model = model
+            self._from_buffer = _import_vosk()._ffi.from_buffer
+
+    def initialize_recognizer(
+        self, target_word_list: List, sampling_rate: int, reuse: bool = True
+    ) -> None:
+        """読み込み済みのモデルから認識器を作り直す。（即座に切り替える）
+
+        Args:
+            target_word_list (List): 認識対象のワードリスト（空の場合は通常のモデルを作成）
+            sampling_rate (int): 入力される音声データのサンプリングレート
+            reuse (bool, optional): LRUの認識器を再利用するかどうか（Falseの場合は新しく作成し、単語の時刻も0から数える）. Defaults to True.
+        """
+        cache_key, rec = self._get_recognizer(target_word_list, sampling_rate, reuse)
+        with self._lock:
+            if cache_key == self._rec_key:
+                # 利用中の認識器の場合は途中状態を破棄する
+                rec.Reset()
+            self._pending = None
+            self._set_recognizer(cache_key, rec)
+
+    def prepare_recognizer(
+        self,
+        target_word_list: List,
+        sampling_rate: int,
+        on_swapped: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """新しい認識器を作成し、次の発話の区切りで切り替えるよう予約する。
+
+        認識器の作成は呼び出し元のスレッドで行うため、認識中のスレッドとは別のスレッドから
+        呼び出すことで、デコードを止めずに切り替えられる。
+
+        Args:
+            target_word_list (List): 認識対象のワードリスト（空の場合は通常のモデルを作成）
+            sampling_rate (int): 入力される音声データのサンプリングレート
+            on_swapped (Optional[Callable[[Dict], None]], optional): 切り替え完了時のコールバック. Defaults to None.
+        """
+        requested = time.perf_counter()
+        cache_key = (tuple(target_word_list), sampling_rate)
+        with self._lock:
+            # 認識中のスレッドが切り替えるため、利用中の認識器はロック内で確認する
+            if cache_key == self._rec_key:
+                # 利用中の認識器と同じ場合は何もしない
+                self._pending = None
+                return
+        cache_key, rec = self._get_recognizer(target_word_list, sampling_rate)
+        with self._lock:
+            self._pending = _PendingRecognizer(
+                cache_key, rec, requested, time.perf_counter(), on_swapped
+            )
+
+    def _get_recognizer(
+        self, target_word_list: List, sampling_rate: int, reuse: bool = True
+    ) -> Tuple[Tuple, "vosk.KaldiRecognizer"]:
+        """認識器をLRUから取り出す。（存在しない場合は作成する）
+
+        Args:
+            target_word_list (List): 認識対象のワードリスト（空の場合は通常のモデルを作成）
+            sampling_rate (int): 入力される音声データのサンプリングレート
+            reuse (bool, optional): LRUの認識器を再利用するかどうか. Defaults to True.
+
+        Returns:
+            Tuple[Tuple, vosk.KaldiRecognizer]: (LRUのキー, 認識器)
+        """
+        if self._model is None:
+            raise RuntimeError("model not loaded.")
+        self._logger.info(f"target words: {len(target_word_list)}")
+        if self._logger.isEnabledFor(logging.DEBUG):
+            # 大きなワードリストでは文字列化も重いため、DEBUGの場合のみ全体を出力する
+            self._logger.debug(f"target words is {target_word_list}")
+
+        cache_key = (tuple(target_word_list), sampling_rate)
+        with self._cache_lock:
+            rec = self._recognizer_cache.pop(cache_key, None)
+        if not reuse:
+            # Resetでは単語の時刻が0に戻らないため、LRUの認識器は破棄して作り直す
+            rec = None
+        with self._lock:
+            in_use = cache_key == self._rec_key
+        if rec is not None and not in_use:
+            # 以前の発話の途中状態を破棄して再利用する
+            rec.Reset()
+        elif rec is None:
+            rec = self._create_recognizer(target_word_list, sampling_rate)
+            with self._lock:
+                self._fed_samples[cache_key] = 0
+        evicted = []
+        with self._cache_lock:
+            self._recognizer_cache[cache_key] = rec
+            while len(self._recognizer_cache) > self._recognizer_cache_size:
+                evicted.append(self._recognizer_cache.popitem(last=False)[0])
+        if evicted:
+            with self._lock:
+                for key in evicted:
+                    self._fed_samples.pop(key, None)
+        return cache_key, rec
+
+    def _set_recognizer(
+        self, cache_key: Tuple, rec: "vosk.KaldiRecognizer"
+    ) -> None:
+        """利用する認識器を切り替える。（ロック取得済みの状態で呼び出す）
+
+        Args:
+            cache_key (Tuple): LRUのキー
+            rec (vosk.KaldiRecognizer): 認識器
+        """
+        self._rec_key = cache_key
+        self._rec = rec
+        self._reset_utterance()
+        self._last_speech_time = 0.0
+
+    def _swap_pending(self) -> None:
+        """予約されている認識器へ切り替える。（ロック取得済みの状態で呼び出す）"""
+        pending = self._pending
+        assert pending is not None
+        self._pending = None
+        self._set_recognizer(pending.cache_key, pending.rec)
+
+        now = time.perf_counter()
+        report = {
+            "build_sec": pending.built - pending.requested,
+            "switch_sec": now - pending.requested,
+            "blocks_before_switch": pending.blocks,
+        }
+        self._logger.info(
+            f"recognizer swapped. build: {report['build_sec'] * 1000:.1f}ms, "
+            f"switch: {report['switch_sec'] * 1000:.1f}ms, "
+            f"blocks decoded while waiting: {pending.blocks}"
+        )
+        if pending.on_swapped is not None:
+            pending.on_swapped(report)
 
-        # voskの初期化
-        self._model = vosk.Model(model_path)
+    def _create_recognizer(
+        self, target_word_list: List, sampling_rate: int
+    ) -> "vosk.KaldiRecognizer":
+        """認識器を作成する。
+
+        Args:
+            target_word_list (List): 認識対象のワード・フレーズのリスト（空の場合は通常のモデルを作成）
+            sampling_rate (int): 入力される音声データのサンプリングレート
+
+        Returns:
+            vosk.KaldiRecognizer: 認識器
+        """
+        kaldi_recognizer = _import_vosk().KaldiRecognizer
         if len(target_word_list) > 0:
-            target_word = '["' + " ".join(target_word_list) + '", "[unk]"]'
-            self._rec = vosk.KaldiRecognizer(self._model, sampling_rate, target_word)
+            # 各ワード・フレーズを選択肢とし、語彙にない単語を含むものは除く
+            compiled = self._grammar_compiler.compile(list(target_word_list))
+            rec = kaldi_recognizer(self._model, sampling_rate, compiled.grammar)
         else:
-            self._rec = vosk.KaldiRecognizer(self._model, sampling_rate)
-        self._rec.SetPartialWords(True)  # confidenceを取得するために必要
+            rec = kaldi_recognizer(self._model, sampling_rate)
+        rec.SetPartialWords(True)  # confidenceを取得するために必要
+        if self._word_timings:
+            rec.SetWords(True)  # 確定結果に単語毎の時刻を含める
+        return rec
+
+    @property
+    def in_utterance(self) -> bool:
+        """発話の途中かどうか（途中認識結果が空でない場合はTrue）"""
+        with self._lock:
+            self._refresh_partial()
+            return self._in_utterance
 
-        # 途中解析結果のconfidenceを保持するためのDict
-        self._partial_response = defaultdict(list)
+    @property
+    def partial_text(self) -> str:
+        """最新の途中認識結果のテキスト"""
+        with self._lock:
+            self._refresh_partial()
+            return self._partial_text
 
-    def recognize(self, audio_data: bytes) -> Optional[Dict]:
+    @property
+    def partial_words(self) -> List[Dict]:
+        """最新の途中認識結果の単語毎の情報（[{"word", "conf", "start", "end"}, ...]）"""
+        with self._lock:
+            self._refresh_partial()
+            return self._partial_words
+
+    @property
+    def stream_time(self) -> float:
+        """利用中の認識器へ渡し終えた音声の長さ[sec]（Voskの単語の時刻と同じ基準）"""
+        with self._lock:
+            if self._rec_key is None:
+                return 0.0
+            return self._fed_samples.get(self._rec_key, 0) / self._rec_key[1]
+
+    def recognize(self, audio_data: Union[bytes, memoryview]) -> Optional[Dict]:
         """音声認識を行う
 
         Args:
-            audio_data (bytes): マイク入力データ
+            audio_data (Union[bytes, memoryview]): マイク入力データ（memoryviewはコピーせずに渡す）
+
+        Returns:
+            Optional[Dict]: 結果を格納したDict（Noneの場合は認識できていない）
+        """
+        with self._lock:
+            return self._recognize(audio_data)
+
+    def _recognize(self, audio_data: Union[bytes, memoryview]) -> Optional[Dict]:
+        """音声認識を行う（ロック取得済みの状態で呼び出す）
+
+        Args:
+            audio_data (Union[bytes, memoryview]): マイク入力データ
 
         Returns:
             Optional[Dict]: 結果を格納したDict（Noneの場合は認識できていない）
         """
+        if self._pending is not None:
+            self._refresh_partial()
+            if self._in_utterance:
+                # 発話中は現在の認識器でデコードを続ける
+                self._pending.blocks += 1
+            else:
+                # 発話の区切りで切り替えるため、このブロックから新しい認識器に渡す
+                self._swap_pending()
+
         if self._rec is None:
             self._logger.error(f"model not initialized.")
             return None
 
-        if self._rec.AcceptWaveform(audio_data):
-            return self._judge_final_response()
+        if isinstance(audio_data, memoryview):
+            n_samples = audio_data.nbytes // SAMPLE_WIDTH
         else:
-            response = json.loads(self._rec.PartialResult())
-            if "partial_result" in response.keys():
-                for r in response["partial_result"]:
-                    word = r["word"]
-                    conf = r["conf"]
-                    if word not in self._partial_response.keys():
-                        self._partial_response[word] = []
-                    self._partial_response[word].append(conf)
-                    self._logger.debug(f"{word} is {conf}")
-            return None
+            n_samples = len(audio_data) // SAMPLE_WIDTH
+        self._fed_samples[self._rec_key] = (
+            self._fed_samples.get(self._rec_key, 0) + n_samples
+        )
+        if not isinstance(audio_data, bytes):
+            # cffiのchar*引数はbytesしか受け付けないため、コピーせずにポインタへ変換する
+            audio_data = self._from_buffer(audio_data)
+        timings = self.timings
+        timings["partial"] = 0.0
+        timings["result"] = 0.0
+        start = time.perf_counter()
+        accepted = self._rec.AcceptWaveform(audio_data)
+        end = time.perf_counter()
+        timings["accept"] = end - start
+        if accepted:
+            result = self._judge_final_response()
+            timings["result"] = time.perf_counter() - end
+            return result
+        self._partial_stale = True
+        if self._track_partial_conf:
+            self._refresh_partial()
+        return None
+
+    def _refresh_partial(self) -> None:
+        """前回取得以降に音声を受け取っていれば、途中認識結果を取得する。（ロック取得済みの状態で呼び出す）"""
+        if not self._partial_stale or self._rec is None:
+            return
+        self._partial_stale = False
+        start = time.perf_counter()
+        response = json.loads(self._rec.PartialResult())
+        partial_text = response.get("partial", "")
+        if partial_text != self._partial_text and partial_text != "":
+            self._last_speech_time = start
+        self._partial_text = partial_text
+        self._in_utterance = partial_text != ""
+        self._partial_words = response.get("partial_result", [])
+        for r in self._partial_words:
+            stats = self._partial_conf.get(r["word"])
+            if stats is None:
+                stats = self._partial_conf[r["word"]] = WordConfidence()
+            stats.add(r["conf"])
+        self.timings["partial"] = time.perf_counter() - start
+
+    def _reset_utterance(self) -> None:
+        """発話単位の状態を初期化する。"""
+        self._in_utterance = False
+        self._partial_text = ""
+        self._partial_words = []
+        self._partial_stale = False
+        self._partial_conf = {}
 
-    def _judge_final_response(self) -> Optional[Dict]:
+    def flush(self) -> Optional[Dict]:
+        """入力終端として残りの音声を確定させ、最終結果を返す。
+
+        Returns:
+            Optional[Dict]: 結果を格納したDict（Noneの場合は認識できていない）
+        """
+        with self._lock:
+            if self._rec is None:
+                self._logger.error(f"model not initialized.")
+                return None
+            start = time.perf_counter()
+            result = self._judge_final_response(self._rec.FinalResult())
+            self.timings["result"] = time.perf_counter() - start
+            return result
+
+    def _judge_final_response(self, raw: Optional[str] = None) -> Optional[Dict]:
         """Voskの結果をまとめる
 
+        Args:
+            raw (Optional[str], optional): Voskの結果JSON（Noneの場合はResult()を利用）. Defaults to None.
+
         Returns:
             Optional[Dict]: 結果情報
         """
-        response = json.loads(self._rec.Result())
+        response = json.loads(self._rec.Result() if raw is None else raw)
+        partial_conf = self._partial_conf
+        self._reset_utterance()
+        self.speech_end_time = self._last_speech_time
+        self._last_speech_time = 0.0
         if "text" in response.keys():
             result = {}
             result["result"] = response["text"]
-            result["partial_conf"] = []
-            for k, v in self._partial_response.items():
-                conf = {}
-                conf[k] = v
-                result["partial_conf"].append(conf)
-            self._partial_response = defaultdict(List)
+            result["partial_conf"] = [
+                {word: stats.to_dict()} for word, stats in partial_conf.items()
+            ]
+            if self._word_timings:
+                # numpyを必要とするため、単語の時刻情報を使う場合のみimportする
+                from vosk_example_gui.word_timing import UtteranceWords
+
+                result["words"] = UtteranceWords.from_vosk(response.get("result", []))
             return result
         else:
             return None
@@ -0,0 +1,98 @@
+import time
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+def compute_envelope(
+    data: np.ndarray, n_buckets: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """波形をn_buckets個の区間に分け、区間毎の最小値・最大値を求める。
+
+    Args:
+        data (np.ndarray): 波形データ
+        n_buckets (int): 区間数（データ数より多い場合はデータ数に切り詰める）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (区間毎の最小値, 区間毎の最大値)
+    """
+    n_buckets = max(1, min(n_buckets, len(data)))
+    bucket_size = len(data) // n_buckets
+    buckets = data[: bucket_size * n_buckets].reshape(n_buckets, bucket_size)
+    return buckets.min(axis=1), buckets.max(axis=1)
+
+
+class WaveformRenderer:
+    def __init__(
+        self,
+        canvas: Any,
+        size: Tuple[int, int],
+        max_fps: float = 30.0,
+        color: str = "red",
+        full_scale: float = 1.0,
+    ) -> None:
+        """Initialize
+
+        Args:
+            canvas (Any): 描画先のtkinter.Canvas
+            size (Tuple[int, int]): キャンバスのサイズ(幅, 高さ)[px]
+            max_fps (float, optional): 再描画の上限回数[回/sec]. Defaults to 30.0.
+            color (str, optional): 波形の色. Defaults to "red".
+            full_scale (float, optional): 波形データの最大振幅. Defaults to 1.0.
+        """
+        self._canvas = canvas
+        self._width, self._height = size
+        self._full_scale = full_scale
+        self._min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._last_render = 0.0
+        self._pending: Optional[np.ndarray] = None
+
+        # 描画アイテムは1度だけ作成し、以降は座標のみ更新する
+        mid = self._height / 2
+        self._canvas.create_line(0, mid, self._width, mid)
+        self._line = self._canvas.create_line(0, mid, self._width, mid, fill=color)
+
+        # 各列で(最大値, 最小値)を往復する折れ線のx座標
+        self._xs = np.repeat(np.arange(self._width, dtype=np.float64), 2)
+
+    def push(self, data: np.ndarray) -> None:
+        """描画する波形を登録する。（描画はrender_if_dueで行う）
+
+        Args:
+            data (np.ndarray): 波形データ（描画時に参照するため、ビューを渡してもよい）
+        """
+        self._pending = data
+
+    def render_if_due(self) -> bool:
+        """前回描画から最小間隔が経過していれば、登録済みの波形を描画する。
+
+        Returns:
+            bool: 描画した場合はTrue
+        """
+        if self._pending is None:
+            return False
+        now = time.perf_counter()
+        if now - self._last_render < self._min_interval:
+            return False
+        self.render(self._pending)
+        self._pending = None
+        self._last_render = now
+        return True
+
+    def render(self, data: np.ndarray) -> None:
+        """波形を即座に描画する。
+
+        Args:
+            data (np.ndarray): 波形データ
+        """
+        if len(data) == 0:
+            return
+        mins, maxs = compute_envelope(data, self._width)
+        n = len(mins)
+        mid = self._height / 2
+        scale = mid / self._full_scale
+        coords = np.empty((n * 2, 2), dtype=np.float64)
+        coords[:, 0] = self._xs[: n * 2] * (self._width / n)
+        coords[0::2, 1] = mid - maxs * scale
+        coords[1::2, 1] = mid - mins * scale
+        self._canvas.coords(self._line, coords.ravel().tolist())
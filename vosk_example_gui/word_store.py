@@ -0,0 +1,121 @@
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class WordStore:
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        """Initialize
+
+        追加順を保持する重複なしのワードリスト。
+        各ワードには追加時に変わらないIDを割り当て、追加・存在確認・IDによる削除をO(1)で行う。
+
+        Args:
+            words (Iterable[str], optional): 初期のワード. Defaults to ().
+        """
+        # dictは挿入順を保持するため、削除しても残りの順序は変わらない
+        self._ids: Dict[str, int] = {}
+        self._words: Dict[int, str] = {}
+        self._next_id = 0
+        self.add_many(words)
+
+    def add(self, word: str) -> int:
+        """ワードを末尾に追加する。
+
+        Args:
+            word (str): 追加するワード
+
+        Returns:
+            int: 追加したワードのID（空文字・重複の場合は-1）
+        """
+        word = word.strip()
+        if word == "" or word in self._ids:
+            return -1
+        word_id = self._next_id
+        self._next_id += 1
+        self._ids[word] = word_id
+        self._words[word_id] = word
+        return word_id
+
+    def add_many(self, words: Iterable[str]) -> List[Tuple[int, str]]:
+        """複数のワードを末尾に追加する。
+
+        Args:
+            words (Iterable[str]): 追加するワード
+
+        Returns:
+            List[Tuple[int, str]]: 追加した(ID, ワード)のリスト（空文字・重複は除く）
+        """
+        added = []
+        for word in words:
+            word_id = self.add(word)
+            if word_id >= 0:
+                added.append((word_id, self._words[word_id]))
+        return added
+
+    def remove(self, word_id: int) -> str:
+        """IDを指定してワードを削除する。
+
+        Args:
+            word_id (int): 削除するワードのID
+
+        Returns:
+            str: 削除したワード
+        """
+        word = self._words.pop(word_id)
+        del self._ids[word]
+        return word
+
+    def clear(self) -> None:
+        """全てのワードを削除する。"""
+        self._ids.clear()
+        self._words.clear()
+
+    def items(self) -> List[Tuple[int, str]]:
+        """(ID, ワード)のリストを追加順に返す。
+
+        Returns:
+            List[Tuple[int, str]]: (ID, ワード)のリスト
+        """
+        return list(self._words.items())
+
+    def to_list(self) -> List[str]:
+        """ワードのリストを追加順に返す。
+
+        Returns:
+            List[str]: ワードのリスト
+        """
+        return list(self._words.values())
+
+    def __contains__(self, word: object) -> bool:
+        return word in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._words.values())
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+
+def iter_word_file(
+    path: str, chunk_size: int = 2000
+) -> Iterator[Tuple[List[str], float]]:
+    """ワードリストファイルを少しずつ読み込む。
+
+    Args:
+        path (str): 対象のファイルパス
+        chunk_size (int, optional): 1回に返す最大行数. Defaults to 2000.
+
+    Yields:
+        Iterator[Tuple[List[str], float]]: (空行を除いたワードのリスト, 読み込んだ割合)
+    """
+    total = max(1, os.path.getsize(path))
+    with open(path, "rb") as f:
+        chunk: List[str] = []
+        for line in f:
+            word = line.decode("utf-8", errors="replace").strip()
+            if word != "":
+                chunk.append(word)
+            if len(chunk) >= chunk_size:
+                yield chunk, f.tell() / total
+                chunk = []
+        yield chunk, 1.0
@@ -0,0 +1,298 @@
+import json
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# 1単語の時刻情報（単語は文字列の代わりにWordVocabularyのIDで持つ。1単語あたり24byte）
+WORD_DTYPE = np.dtype(
+    [("word_id", "<i4"), ("start", "<f8"), ("end", "<f8"), ("conf", "<f4")]
+)
+
+
+class WordVocabulary:
+    def __init__(self) -> None:
+        """Initialize
+
+        単語の文字列とIDの対応表。IDは登録順の連番で、一度割り当てたIDは変わらない。
+        """
+        self._ids: Dict[str, int] = {}
+        self.words: List[str] = []
+        # 複数の認識スレッドから登録されるため、未登録の単語を追加する時のみロックする
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, word_id: int) -> str:
+        return self.words[word_id]
+
+    def intern(self, word: str) -> int:
+        """単語のIDを返す。（未登録の場合は登録する）
+
+        Args:
+            word (str): 単語
+
+        Returns:
+            int: 単語のID
+        """
+        word_id = self._ids.get(word)
+        if word_id is None:
+            with self._lock:
+                word_id = self._ids.get(word)
+                if word_id is None:
+                    word_id = len(self.words)
+                    self.words.append(word)
+                    self._ids[word] = word_id
+        return word_id
+
+
+# プロセス内で共有する対応表（UtteranceWordsのword_idはこの対応表のID）
+vocabulary = WordVocabulary()
+
+
+class UtteranceWords:
+    """1発話の単語毎の開始・終了時刻[sec]とconfidence"""
+
+    __slots__ = ("words",)
+
+    def __init__(self, words: np.ndarray) -> None:
+        """Initialize
+
+        Args:
+            words (np.ndarray): WORD_DTYPEの配列
+        """
+        self.words = words
+
+    @classmethod
+    def from_vosk(cls, result: List[Dict]) -> "UtteranceWords":
+        """Voskの結果の"result"（単語毎のDictのリスト）から作成する。
+
+        Args:
+            result (List[Dict]): [{"word", "start", "end", "conf"}, ...]
+
+        Returns:
+            UtteranceWords: 作成した結果
+        """
+        intern = vocabulary.intern
+        rows = [(intern(r["word"]), r["start"], r["end"], r["conf"]) for r in result]
+        return cls(np.array(rows, dtype=WORD_DTYPE))
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __reduce__(self) -> Tuple[Any, Tuple]:
+        # IDはプロセス毎の対応表に依存するため、別プロセスへは単語の文字列を添えて渡す
+        ids, inverse = np.unique(self.words["word_id"], return_inverse=True)
+        return (
+            _restore_utterance_words,
+            ([vocabulary[i] for i in ids], inverse, self.words),
+        )
+
+    @property
+    def labels(self) -> List[str]:
+        """単語の文字列のリスト"""
+        return [vocabulary[i] for i in self.words["word_id"].tolist()]
+
+    def to_list(self) -> List[Dict]:
+        """JSON出力用のリストを返す。（Voskの"result"と同じ形式）
+
+        Returns:
+            List[Dict]: [{"word", "start", "end", "conf"}, ...]
+        """
+        # confはfloat32で保持しているため、Voskの出力と同じ小数点以下6桁に丸めて戻す
+        return [
+            {"word": vocabulary[w], "start": s, "end": e, "conf": round(c, 6)}
+            for w, s, e, c in self.words.tolist()
+        ]
+
+
+def _restore_utterance_words(
+    labels: List[str], inverse: np.ndarray, words: np.ndarray
+) -> UtteranceWords:
+    """受け取ったプロセスの対応表でIDを振り直す。
+
+    Args:
+        labels (List[str]): 発話中に現れる単語（重複なし）
+        inverse (np.ndarray): 各単語のlabels上の位置
+        words (np.ndarray): WORD_DTYPEの配列（word_idは送信元のID）
+
+    Returns:
+        UtteranceWords: 復元した結果
+    """
+    ids = np.array([vocabulary.intern(w) for w in labels], dtype="<i4")
+    words = words.copy()
+    words["word_id"] = ids[inverse]
+    return UtteranceWords(words)
+
+
+def json_default(obj: object) -> Any:
+    """json.dumpsのdefault引数に渡し、UtteranceWordsをリストとして書き出す。
+
+    Args:
+        obj (object): JSONへ変換できなかったオブジェクト
+
+    Returns:
+        Any: JSONへ変換できる値
+    """
+    if isinstance(obj, UtteranceWords):
+        return obj.to_list()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class WordTimeline:
+    def __init__(self, capacity: int = 4096) -> None:
+        """Initialize
+
+        多数の発話の単語をまとめて保持する。単語は1つの配列へ、発話の区切りは単語の位置で
+        持つため、発話毎のオブジェクトを保持し続けずに済む。
+
+        Args:
+            capacity (int, optional): 最初に確保する単語数（不足した場合は倍に広げる）. Defaults to 4096.
+        """
+        self._words = np.empty(max(1, capacity), dtype=WORD_DTYPE)
+        self._n_words = 0
+        # i番目の発話の単語は_words[offsets[i]:offsets[i + 1]]
+        self._offsets = array("q", [0])
+        self.texts: List[str] = []
+        self.sources: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i: int) -> Tuple[str, np.ndarray]:
+        """i番目の発話を返す。
+
+        Args:
+            i (int): 発話の番号
+
+        Returns:
+            Tuple[str, np.ndarray]: (テキスト, WORD_DTYPEの配列のビュー)
+        """
+        return self.texts[i], self._words[self._offsets[i] : self._offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def words(self) -> np.ndarray:
+        """全発話の単語の配列（ビュー）"""
+        return self._words[: self._n_words]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """各発話の単語の開始位置（末尾に単語数を含む）"""
+        # ビューを残すとarrayへの追記ができなくなるためコピーを返す
+        return np.frombuffer(self._offsets, dtype=np.int64).copy()
+
+    def append(self, text: str, words: UtteranceWords, source: str = "") -> None:
+        """発話を追加する。
+
+        Args:
+            text (str): 認識結果のテキスト
+            words (UtteranceWords): 単語毎の時刻情報
+            source (str, optional): 発話の出所（ファイル名・セッション名）. Defaults to "".
+        """
+        n = len(words.words)
+        end = self._n_words + n
+        if end > len(self._words):
+            grown = np.empty(max(end, len(self._words) * 2), dtype=WORD_DTYPE)
+            grown[: self._n_words] = self._words[: self._n_words]
+            self._words = grown
+        self._words[self._n_words : end] = words.words
+        self._n_words = end
+        self._offsets.append(end)
+        self.texts.append(text)
+        self.sources.append(source)
+
+    def add_result(self, recognized: Dict, source: str = "") -> None:
+        """VoskClient.recognizeの結果を追加する。（単語の時刻情報を含まない結果は無視する）
+
+        Args:
+            recognized (Dict): 認識結果
+            source (str, optional): 発話の出所（ファイル名・セッション名）. Defaults to "".
+        """
+        words = recognized.get("words")
+        if isinstance(words, UtteranceWords):
+            self.append(recognized["result"], words, source)
+
+    def export_npz(self, path: str, compressed: bool = False) -> None:
+        """NumPyのnpz形式で書き出す。
+
+        Args:
+            path (str): 出力先
+            compressed (bool, optional): 圧縮するかどうか. Defaults to False.
+        """
+        save = np.savez_compressed if compressed else np.savez
+        save(
+            path,
+            words=self.words,
+            offsets=self.offsets,
+            vocabulary=np.array(vocabulary.words, dtype=str),
+            texts=np.array(self.texts, dtype=str),
+            sources=np.array(self.sources, dtype=str),
+        )
+
+    def export_jsonl(self, path: str) -> None:
+        """発話毎に1行のJSONLで書き出す。
+
+        Args:
+            path (str): 出力先
+        """
+        words = self._words
+        offsets = self._offsets
+        labels = vocabulary.words
+        with open(path, "w", encoding="utf-8") as f:
+            for i, text in enumerate(self.texts):
+                rows = words[offsets[i] : offsets[i + 1]].tolist()
+                record = {
+                    "source": self.sources[i],
+                    "result": text,
+                    "words": [
+                        {"word": labels[w], "start": s, "end": e, "conf": round(c, 6)}
+                        for w, s, e, c in rows
+                    ],
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def export(self, path: str) -> None:
+        """拡張子（.npz/.jsonl）に応じた形式で書き出す。
+
+        Args:
+            path (str): 出力先
+        """
+        if path.endswith(".npz"):
+            self.export_npz(path)
+        elif path.endswith(".jsonl"):
+            self.export_jsonl(path)
+        else:
+            raise ValueError(f"unsupported format. {path}")
+
+    @classmethod
+    def load_npz(cls, path: str) -> "WordTimeline":
+        """export_npzで書き出したファイルを読み込む。（IDはこのプロセスの対応表で振り直す）
+
+        Args:
+            path (str): 対象のファイル
+
+        Returns:
+            WordTimeline: 読み込んだ結果
+        """
+        with np.load(path) as data:
+            words = data["words"]
+            offsets = data["offsets"]
+            ids = np.array(
+                [vocabulary.intern(str(w)) for w in data["vocabulary"]], dtype="<i4"
+            )
+            timeline = cls(len(words))
+            timeline.texts = [str(t) for t in data["texts"]]
+            timeline.sources = [str(s) for s in data["sources"]]
+        timeline._words[: len(words)] = words
+        if len(words) > 0:
+            timeline._words["word_id"][: len(words)] = ids[words["word_id"]]
+        timeline._n_words = len(words)
+        timeline._offsets = array("q", offsets.tolist())
+        return timeline
+
@@ -0,0 +1,278 @@
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+from vosk_example_gui.archive import SessionWriter
+from vosk_example_gui.fanout import FanoutClient
+from vosk_example_gui.metrics import Metrics, registry
+from vosk_example_gui.resampler import Resampler
+from vosk_example_gui.source import AudioSource
+from vosk_example_gui.spotter import KeywordHit, KeywordSpotter
+from vosk_example_gui.vad import VoiceActivityGate
+from vosk_example_gui.vosk_client import VoskClient
+from vosk_example_gui.word_timing import UtteranceWords
+
+
+class RecognizeWorker:
+    def __init__(
+        self,
+        audio: AudioSource,
+        vosk: VoskClient,
+        on_result: Callable[[Dict], None],
+        on_partial: Optional[Callable[[str], None]] = None,
+        name: str = "RecognizeWorker",
+        metrics: Optional[Metrics] = None,
+        on_keyword: Optional[Callable[[KeywordHit], None]] = None,
+    ) -> None:
+        """Initialize
+
+        1つの入力ストリームのブロック毎の処理（リサンプル・ゲート・認識）を行う。
+        スレッドは持たず、SessionManager・AsyncCoreがブロックの到着時にdrainを呼び出す。
+
+        Args:
+            audio (AudioSource): 入力元のAudioSourceインスタンス
+            vosk (VoskClient): 認識に利用するVoskClientインスタンス
+            on_result (Callable[[Dict], None]): 認識結果を受け取るコールバック（GUIスレッドへの受け渡し用）
+            on_partial (Optional[Callable[[str], None]], optional): 途中認識結果が変化した際のコールバック. Defaults to None.
+            name (str, optional): ストリーム名（ログ・計測値の識別に用いる）. Defaults to "RecognizeWorker".
+            metrics (Optional[Metrics], optional): 計測値の記録先（Noneの場合は共有レジストリ）. Defaults to None.
+            on_keyword (Optional[Callable[[KeywordHit], None]], optional): キーワードを検出した際のコールバック（set_spotterで設定した場合のみ呼び出される）. Defaults to None.
+        """
+        self.name = name
+        self._logger = logging.getLogger("vosk_example_gui.worker")
+        self._audio = audio
+        self._vosk = vosk
+        self._on_result = on_result
+        self._on_partial = on_partial
+        self._on_keyword = on_keyword
+        self._last_partial = ""
+        self._resampler: Optional[Resampler] = None
+        self._gate: Optional[VoiceActivityGate] = None
+        self._archive: Optional[SessionWriter] = None
+        self._spotter: Optional[KeywordSpotter] = None
+        self._fanout: Optional[FanoutClient] = None
+
+        # 段階毎の計測値（ヒストグラムの取得を毎ブロック行わないよう事前に引いておく）
+        self._metrics = metrics if metrics is not None else registry
+        self._queue_delay = self._metrics.histogram(f"{name}.queue_delay_ms")
+        self._queue_depth = self._metrics.histogram(f"{name}.queue_depth")
+        self._recognize_hist = self._metrics.histogram(f"{name}.recognize_ms")
+        self._accept_hist = self._metrics.histogram(f"{name}.accept_waveform_ms")
+        self._partial_hist = self._metrics.histogram(f"{name}.partial_result_ms")
+        self._result_hist = self._metrics.histogram(f"{name}.result_ms")
+        self._final_latency = self._metrics.histogram(f"{name}.final_latency_ms")
+        self._keyword_latency = self._metrics.histogram(f"{name}.keyword_latency_ms")
+        self._fanout_hist = self._metrics.histogram(f"{name}.fanout_ms")
+        self._fanout_serial_hist = self._metrics.histogram(f"{name}.fanout_serial_ms")
+
+        # レイテンシ計測用
+        self._reset_stats()
+
+    def drain(self) -> int:
+        """Audio.qに溜まっているブロックを全て処理する。
+
+        Returns:
+            int: 処理したブロック数
+        """
+        n = 0
+        while True:
+            audio_data = self._audio.get()
+            if audio_data is None:
+                return n
+            self._process(audio_data)
+            n += 1
+
+    def set_resampler(self, resampler: Optional[Resampler]) -> None:
+        """認識器へ渡す前に適用するリサンプラを設定する。
+
+        Args:
+            resampler (Optional[Resampler]): リサンプラ（Noneの場合は変換しない）
+        """
+        self._resampler = resampler
+
+    def set_gate(self, gate: Optional[VoiceActivityGate]) -> None:
+        """認識器の前段に置く発話区間ゲートを設定する。
+
+        Args:
+            gate (Optional[VoiceActivityGate]): ゲート（Noneの場合は全ブロックを認識器へ渡す）
+        """
+        self._gate = gate
+
+    def set_archive(self, archive: Optional[SessionWriter]) -> None:
+        """認識器へ渡した音声と認識結果の保存先を設定する。
+
+        Args:
+            archive (Optional[SessionWriter]): 保存先（Noneの場合は保存しない）
+        """
+        self._archive = archive
+
+    def set_spotter(self, spotter: Optional[KeywordSpotter]) -> None:
+        """途中認識結果からキーワードを検出するKeywordSpotterを設定する。
+
+        設定中は毎ブロック途中認識結果を取得する。
+
+        Args:
+            spotter (Optional[KeywordSpotter]): 検出器（Noneの場合は検出しない）
+        """
+        self._spotter = spotter
+
+    def set_fanout(self, fanout: Optional[FanoutClient]) -> None:
+        """同じ音声を別の文法でも認識するFanoutClientを設定する。
+
+        各文法の確定結果は、"grammar"を含む結果としてon_resultへ渡される。
+
+        Args:
+            fanout (Optional[FanoutClient]): 認識器の組（Noneの場合は主の認識器のみ）
+        """
+        self._fanout = fanout
+
+    def _process(self, audio_data: memoryview) -> None:
+        """1ブロック分の認識を行い、結果をコールバックへ渡す。
+
+        Args:
+            audio_data (memoryview): マイクからの入力信号
+        """
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        q = self._audio.q
+        self._queue_delay.record((start - q.last_put_time) * 1000)
+        qsize = q.qsize()
+        self._queue_depth.record(qsize)
+        chunks: List[Union[memoryview, np.ndarray]] = [audio_data]
+        resampler = self._resampler
+        if resampler is not None:
+            chunks = [resampler.process(audio_data)]
+        gate = self._gate
+        if gate is not None:
+            chunks = gate.process(np.frombuffer(chunks[0], dtype=np.int16))
+            if len(chunks) == 0 and self._vosk.in_utterance:
+                # ゲートが閉じた時点で発話途中の場合は結果を確定させる
+                self._handle_result(self._vosk.flush())
+            fanout = self._fanout
+            if len(chunks) == 0 and fanout is not None and fanout.in_utterance:
+                for result in fanout.flush():
+                    self._on_result(result)
+
+        timings = self._vosk.timings
+        archive = self._archive
+        fanout = self._fanout
+        for chunk in chunks:
+            data = chunk.data if isinstance(chunk, np.ndarray) else chunk
+            if archive is not None:
+                # 認識器へ渡したものと同じ音声を保存し、発話の位置を認識結果と揃える
+                archive.write(data)
+            # 他の文法の認識器へ先に投入し、主の認識器の処理と並行させる
+            pending = fanout.submit(data) if fanout is not None else None
+            recognized = self._vosk.recognize(data)
+            self._handle_result(recognized)
+            if fanout is not None and pending is not None:
+                for result in fanout.collect(pending):
+                    self._on_result(result)
+                self._fanout_hist.record(fanout.timings["wall"] * 1000)
+                self._fanout_serial_hist.record(fanout.timings["serial"] * 1000)
+            self._accept_hist.record(timings["accept"] * 1000)
+            if recognized is not None:
+                self._result_hist.record(timings["result"] * 1000)
+            elif timings["partial"] > 0:
+                # 途中認識結果は参照された場合のみ取得される
+                self._partial_hist.record(timings["partial"] * 1000)
+        elapsed = time.perf_counter() - start
+        self._recognize_hist.record(elapsed * 1000)
+
+        self._cpu_time += time.thread_time() - cpu_start
+        rate = self._audio.get_sampling_rate()
+        if rate:
+            self._audio_sec += len(audio_data) / (2 * self._audio.channels * rate)
+        self._blocks += 1
+        self._busy_time += elapsed
+        self._max_elapsed = max(self._max_elapsed, elapsed)
+        self._max_qsize = max(self._max_qsize, qsize)
+
+    def _handle_result(self, recognized: Optional[Dict]) -> None:
+        """認識結果・途中認識結果をコールバックへ渡す。
+
+        Args:
+            recognized (Optional[Dict]): VoskClient.recognizeの結果
+        """
+        spotter = self._spotter
+        if recognized is not None:
+            self._last_partial = ""
+            if spotter is not None:
+                words = recognized.get("words")
+                if isinstance(words, UtteranceWords):
+                    # 最後のブロックで現れた単語は途中結果に含まれないため確定結果も調べる
+                    self._spot(spotter, words.to_list())
+                spotter.reset()
+            if self._archive is not None:
+                self._archive.add_result(recognized)
+            speech_end = self._vosk.speech_end_time
+            if recognized["result"] != "" and speech_end > 0:
+                # 最後に単語が増えた時刻を発話終端とみなし、確定までの時間を記録する
+                latency = time.perf_counter() - speech_end
+                self._final_latency.record(latency * 1000)
+            self._on_result(recognized)
+            return
+        if spotter is not None:
+            self._spot(spotter, self._vosk.partial_words)
+        if self._on_partial is not None:
+            partial = self._vosk.partial_text
+            if partial != self._last_partial:
+                self._last_partial = partial
+                self._on_partial(partial)
+
+    def _spot(self, spotter: KeywordSpotter, words: List[Dict]) -> None:
+        """単語列からキーワードを探し、検出したものをコールバックへ渡す。
+
+        Args:
+            spotter (KeywordSpotter): 検出器
+            words (List[Dict]): 単語毎の情報（[{"word", "conf", "start", "end"}, ...]）
+        """
+        for hit in spotter.update(words, self._vosk.stream_time):
+            self._keyword_latency.record(hit.latency_ms)
+            self._logger.info(
+                f"[{self.name}] keyword: {hit.keyword} (conf: {hit.conf:.2f}, "
+                f"latency: {hit.latency_ms:.0f}ms)"
+            )
+            if self._on_keyword is not None:
+                self._on_keyword(hit)
+
+    def _reset_stats(self) -> None:
+        """レイテンシ統計を初期化する。"""
+        self._stats_start = time.perf_counter()
+        self._blocks = 0
+        self._busy_time = 0.0
+        self._cpu_time = 0.0
+        self._audio_sec = 0.0
+        self._max_elapsed = 0.0
+        self._max_qsize = 0
+
+    def report_stats(self) -> None:
+        """前回出力以降のレイテンシ・CPU使用率の統計をログ出力する。
+
+        処理時間がブロック長を下回り、キューの最大長が増え続けなければ滞留は有界である。
+        """
+        if self._blocks > 0:
+            mean_ms = self._busy_time / self._blocks * 1000
+            wall = time.perf_counter() - self._stats_start
+            rtf = self._busy_time / self._audio_sec if self._audio_sec > 0 else 0.0
+            block_sec = self._audio_sec / self._blocks
+            # キューで待たされる時間の上限の目安（最大キュー長 × ブロック長 + 処理時間）
+            latency = self._max_qsize * block_sec + self._max_elapsed
+            self._metrics.set_gauge(f"{self.name}.rtf", rtf)
+            self._metrics.set_gauge(f"{self.name}.cpu", self._cpu_time / wall)
+            self._logger.info(
+                f"[{self.name}] cpu: {self._cpu_time / wall * 100:.1f}%, "
+                f"RTF: {rtf:.3f}, latency max: {latency * 1000:.0f}ms, "
+                f"blocks: {self._blocks}, recognize mean: {mean_ms:.1f}ms, "
+                f"max: {self._max_elapsed * 1000:.1f}ms, "
+                f"max queue depth: {self._max_qsize}, "
+                f"queue depth now: {self._audio.q.qsize()}, "
+                f"dropped blocks: {self._audio.q.dropped}"
+            )
+        gate = self._gate
+        if gate is not None:
+            self._logger.info(
+                f"[{self.name}] vad skipped ratio: {gate.skipped_ratio:.2f}"
+            )
+        self._reset_stats()